@@ -0,0 +1,257 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+# Throughput / memory / round-trip benchmark of the ETL stages, on synthetic sources.
+#
+#   BENCH_DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.bench_etl --sizes 1e4 1e5
+#
+# The database must have the healthai schema; its ETL tables are TRUNCATED before
+# each size, so never point BENCH_DATABASE_URL at a database holding real data.
+# Each stage runs in its own interpreter: peak RSS is that stage's alone.
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+BASELINE = BENCH_DIR / "baseline.json"
+
+STAGES = ["nutrition_ingest", "fitness_ingest", "export_data"]
+
+# Truncated between sizes (CASCADE also clears profiles, metrics and checkpoints)
+_TABLES = ["nutrition_log", "session_sport", "aliment", "utilisateur", "source_file", "qualite_donnees_run"]
+
+
+def _peak_rss_bytes() -> int:
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _count_round_trips(engine) -> list[int]:
+    """
+    Count statements sent by psycopg2 cursors: execute and copy_expert count 1,
+    executemany one per parameter set (psycopg2 sends them one by one).
+    """
+    import psycopg2.extensions
+    from sqlalchemy import event
+
+    counter = [0]
+
+    class CountingCursor(psycopg2.extensions.cursor):
+        def execute(self, query, vars=None):
+            counter[0] += 1
+            return super().execute(query, vars)
+
+        def executemany(self, query, vars_list):
+            vars_list = list(vars_list)
+            counter[0] += len(vars_list)
+            return super().executemany(query, vars_list)
+
+        def copy_expert(self, sql, file, size=8192):
+            counter[0] += 1
+            return super().copy_expert(sql, file, size)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _record):
+        dbapi_connection.cursor_factory = CountingCursor
+
+    return counter
+
+
+def _run_child(stage: str) -> None:
+    """In the child interpreter: run one stage, print its measures as JSON."""
+    from sqlalchemy import text
+    from healthai.db import engine
+
+    counter = _count_round_trips(engine)
+
+    if stage == "nutrition_ingest":
+        from healthai.etl.nutrition_ingest import run_nutrition_ingest as fn
+    elif stage == "fitness_ingest":
+        from healthai.etl.fitness_ingest import run_fitness_ingest as fn
+    else:
+        from healthai.etl.export_data import main as fn
+
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    round_trips = counter[0]
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT rows_read FROM qualite_donnees_run WHERE pipeline_name = :p ORDER BY id_run DESC LIMIT 1"),
+            {"p": stage},
+        ).scalar()
+
+    print(json.dumps({"seconds": seconds, "rows": rows or 0, "round_trips": round_trips, "peak_rss_bytes": _peak_rss_bytes()}))
+
+
+def _reset_tables() -> None:
+    from sqlalchemy import text
+    from healthai.db import engine
+
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(_TABLES)} RESTART IDENTITY CASCADE"))
+
+
+def _child_env(work: Path, size: int, data_dir: Path) -> dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        {
+            "DATABASE_URL": os.environ["BENCH_DATABASE_URL"],
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")])),
+            "FITNESS_CSV": str(data_dir / f"fitness_{size}.csv"),
+            "NUTRITION_CSV": str(data_dir / f"nutrition_{size}.csv"),
+            "EXPORT_DIR": str(work / "exports"),
+            "QUARANTINE_DIR": str(work / "quarantine"),
+            "METRICS_DIR": str(work / "metrics"),
+            "INGEST_INCREMENTAL": "0",
+            "ETL_WORKERS": "1",
+        }
+    )
+    return env
+
+
+def _generate(data_dir: Path, size: int, seed: int) -> None:
+    from healthai.etl.synthetic import write_source
+
+    for kind in ("fitness", "nutrition"):
+        path = data_dir / f"{kind}_{size}.csv"
+        if not path.exists():
+            write_source(kind, str(path), size, seed=seed)
+
+
+def _run_stage(stage: str, env: dict[str, str]) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_etl", "--child", stage],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stdout + proc.stderr)
+        raise SystemExit(f"[bench] {stage} failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run(sizes: list[int], seed: int, data_dir: Path, repeat: int = 1) -> dict:
+    """
+    Every size is run `repeat` times from empty tables; each stage keeps its best
+    pass (highest throughput, lowest RSS and round trips) to damp the noise.
+    """
+    data_dir.mkdir(parents=True, exist_ok=True)
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="healthai-bench-") as tmp:
+        for size in sizes:
+            _generate(data_dir, size, seed)
+            env = _child_env(Path(tmp), size, data_dir)
+            passes: dict[str, list[dict]] = {stage: [] for stage in STAGES}
+            for _ in range(repeat):
+                _reset_tables()
+                for stage in STAGES:
+                    passes[stage].append(_run_stage(stage, env))
+
+            for stage in STAGES:
+                best = min(passes[stage], key=lambda m: m["seconds"])
+                measure = {
+                    "stage": stage,
+                    "size": size,
+                    "rows": best["rows"],
+                    "seconds": best["seconds"],
+                    "rows_per_second": best["rows"] / best["seconds"] if best["seconds"] else 0.0,
+                    "peak_rss_bytes": min(m["peak_rss_bytes"] for m in passes[stage]),
+                    "round_trips": min(m["round_trips"] for m in passes[stage]),
+                }
+                results.append(measure)
+                print(
+                    f"[bench] {stage:<16} size={size:<9} {measure['rows_per_second']:>10.0f} rows/s "
+                    f"round_trips={measure['round_trips']:<7} peak_rss={measure['peak_rss_bytes'] / 2**20:.0f}MiB"
+                )
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Regressions against the baseline, same stage and size:
+    throughput below (1 - threshold) x baseline, peak RSS or round trips above (1 + threshold) x baseline.
+    """
+    base = {(r["stage"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for r in report["results"]:
+        b = base.get((r["stage"], r["size"]))
+        if b is None:
+            continue
+        label = f"{r['stage']} size={r['size']}"
+        if r["rows_per_second"] < b["rows_per_second"] * (1 - threshold):
+            regressions.append(f"{label}: {r['rows_per_second']:.0f} rows/s < baseline {b['rows_per_second']:.0f}")
+        if r["peak_rss_bytes"] > b["peak_rss_bytes"] * (1 + threshold):
+            regressions.append(f"{label}: peak RSS {r['peak_rss_bytes']} > baseline {b['peak_rss_bytes']}")
+        if r["round_trips"] > b["round_trips"] * (1 + threshold):
+            regressions.append(f"{label}: {r['round_trips']} round trips > baseline {b['round_trips']}")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_etl", description="Benchmark the ETL stages.")
+    parser.add_argument("--sizes", nargs="+", type=lambda v: int(float(v)), default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="passes per size, the best one is kept")
+    parser.add_argument("--data-dir", type=Path, default=BENCH_DIR / "data", help="cache of the generated sources")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "0.2")))
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--child", choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _run_child(args.child)
+        return
+
+    if not os.getenv("BENCH_DATABASE_URL"):
+        parser.error("BENCH_DATABASE_URL is not set (its ETL tables are truncated: use a dedicated database)")
+
+    report = run(args.sizes, args.seed, args.data_dir, args.repeat)
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    out.write_text(json.dumps(report, indent=2))
+    print(f"[bench] results -> {out}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"[bench] baseline -> {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print("[bench] no baseline yet (--save-baseline to create one)")
+        return
+    regressions = compare(report, json.loads(args.baseline.read_text()), args.threshold)
+    for line in regressions:
+        print(f"[bench] REGRESSION {line}")
+    if regressions:
+        raise SystemExit(1)
+    print(f"[bench] no regression beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,26 @@
 from typing import Generator
+from fastapi import HTTPException
 from ..db import SessionLocal
+from ..etl.shadow import ShadowWindowOpen, guard_live_write
 
 def get_db() -> Generator:
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_write_db() -> Generator:
+    """
+    Session des routes qui écrivent les tables chargées par l'ETL : 503 pendant
+    un chargement shadow (ETL_LOAD_TARGET=shadow), l'écriture serait perdue à la bascule.
+    """
+    db = SessionLocal()
+    try:
+        try:
+            guard_live_write(db)
+        except ShadowWindowOpen as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "60"}) from e
+        yield db
+    finally:
+        db.close()
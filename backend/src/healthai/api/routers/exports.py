@@ -62,6 +62,12 @@ def run_exports(db: Session = Depends(get_db)):
     Lance l’export côté serveur. Pratique pour une démo ou une automatisation.
     """
     from healthai.etl.export_data import main as export_main
-
-    export_main()
+    from healthai.etl.locks import LockTimeout
+
+    try:
+        # Jamais d'attente dans la requête HTTP : 409 tout de suite si un chargement est en cours
+        export_main(lock_wait=0)
+    except LockTimeout as e:
+        # Un chargement occupe les tables : à relancer plus tard
+        raise HTTPException(status_code=409, detail=str(e)) from e
     return {"status": "ok", "message": "Exports generated in data/cleaned"}
\ No newline at end of file
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from healthai.api.deps import get_db
+from healthai.api.deps import get_db, get_write_db
 from healthai.api.security import require_api_key
 from healthai.models.aliment import Aliment
 from healthai.api.schemas.food import FoodCreate, FoodUpdate, FoodOut
@@ -35,7 +35,7 @@ def get_food(food_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("", response_model=FoodOut)
-def create_food(data: FoodCreate, db: Session = Depends(get_db)):
+def create_food(data: FoodCreate, db: Session = Depends(get_write_db)):
     food = Aliment(**data.model_dump())
     db.add(food)
     db.commit()
@@ -44,7 +44,7 @@ def create_food(data: FoodCreate, db: Session = Depends(get_db)):
 
 
 @router.put("/{food_id}", response_model=FoodOut)
-def update_food(food_id: int, data: FoodUpdate, db: Session = Depends(get_db)):
+def update_food(food_id: int, data: FoodUpdate, db: Session = Depends(get_write_db)):
     food = db.get(Aliment, food_id)
     if not food:
         raise HTTPException(404, "Food not found")
@@ -58,7 +58,7 @@ def update_food(food_id: int, data: FoodUpdate, db: Session = Depends(get_db)):
 
 
 @router.delete("/{food_id}")
-def delete_food(food_id: int, db: Session = Depends(get_db)):
+def delete_food(food_id: int, db: Session = Depends(get_write_db)):
     food = db.get(Aliment, food_id)
     if not food:
         raise HTTPException(404, "Food not found")
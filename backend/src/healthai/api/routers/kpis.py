@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from healthai.etl.quarantine import read_page
 from ..deps import get_db
 from ..security import require_api_key
 
@@ -11,15 +12,40 @@ router = APIRouter(prefix="/kpis", tags=["KPIs"], dependencies=[Depends(require_
 def kpi_quality(db: Session = Depends(get_db)):
     q = text("""
         SELECT
-          id_run, pipeline_name, started_at, ended_at, status,
+          id_run, pipeline_name, started_at, ended_at, status, ingest_mode,
           rows_read, rows_inserted, rows_rejected,
-          missing_values_count, duplicates_count
+          missing_values_count, duplicates_count, rejections_by_rule
         FROM qualite_donnees_run
         ORDER BY id_run DESC
         LIMIT 20;
     """)
-    rows = db.execute(q).mappings().all()
-    return {"runs": list(rows)}
+    runs = [dict(r) for r in db.execute(q).mappings().all()]
+
+    # Profils de colonnes des runs affichés, en une requête
+    q_profiles = text("""
+        SELECT
+          id_run, column_name, row_count, null_count, distinct_estimate,
+          min_value, max_value, mean_value, histogram
+        FROM qualite_colonne_profil
+        WHERE id_run = ANY(:ids)
+        ORDER BY id_run, id_profil;
+    """)
+    profiles: dict[int, list] = {}
+    for p in db.execute(q_profiles, {"ids": [r["id_run"] for r in runs]}).mappings().all():
+        profiles.setdefault(p["id_run"], []).append({k: v for k, v in p.items() if k != "id_run"})
+    for r in runs:
+        r["column_profiles"] = profiles.get(r["id_run"], [])
+
+    return {"runs": runs}
+
+@router.get("/quality/{id_run}/quarantine")
+def kpi_quality_quarantine(
+    id_run: int,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+):
+    """Lignes rejetées par un run (raison + numéro de ligne source), paginées."""
+    return read_page(id_run, offset=offset, limit=limit)
 
 @router.get("/users")
 def kpi_users(db: Session = Depends(get_db)):
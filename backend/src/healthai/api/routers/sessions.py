@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from healthai.api.deps import get_db
+from healthai.api.deps import get_db, get_write_db
 from healthai.api.security import require_api_key
 from healthai.models.session_sport import SessionSport
 from healthai.models.utilisateur import Utilisateur
@@ -36,7 +36,7 @@ def get_session(session_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("", response_model=SessionOut)
-def create_session(data: SessionCreate, db: Session = Depends(get_db)):
+def create_session(data: SessionCreate, db: Session = Depends(get_write_db)):
     # check user exists
     u = db.get(Utilisateur, data.id_user)
     if not u:
@@ -58,7 +58,7 @@ def create_session(data: SessionCreate, db: Session = Depends(get_db)):
 
 
 @router.put("/{session_id}", response_model=SessionOut)
-def update_session(session_id: int, data: SessionUpdate, db: Session = Depends(get_db)):
+def update_session(session_id: int, data: SessionUpdate, db: Session = Depends(get_write_db)):
     s = db.get(SessionSport, session_id)
     if not s:
         raise HTTPException(404, "Session not found")
@@ -84,7 +84,7 @@ def update_session(session_id: int, data: SessionUpdate, db: Session = Depends(g
 
 
 @router.delete("/{session_id}")
-def delete_session(session_id: int, db: Session = Depends(get_db)):
+def delete_session(session_id: int, db: Session = Depends(get_write_db)):
     s = db.get(SessionSport, session_id)
     if not s:
         raise HTTPException(404, "Session not found")
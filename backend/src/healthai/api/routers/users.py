@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
-from healthai.api.deps import get_db
+from healthai.api.deps import get_db, get_write_db
 from healthai.api.security import require_api_key
 from healthai.models.utilisateur import Utilisateur
 from healthai.api.schemas.user import UserCreate, UserUpdate, UserOut
@@ -28,7 +28,7 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("", response_model=UserOut)
-def create_user(data: UserCreate, db: Session = Depends(get_db)):
+def create_user(data: UserCreate, db: Session = Depends(get_write_db)):
     user = Utilisateur(**data.model_dump())
     db.add(user)
     db.commit()
@@ -37,7 +37,7 @@ def create_user(data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.put("/{user_id}", response_model=UserOut)
-def update_user(user_id: int, data: UserUpdate, db: Session = Depends(get_db)):
+def update_user(user_id: int, data: UserUpdate, db: Session = Depends(get_write_db)):
     user = db.get(Utilisateur, user_id)
     if not user:
         raise HTTPException(404, "User not found")
@@ -51,7 +51,7 @@ def update_user(user_id: int, data: UserUpdate, db: Session = Depends(get_db)):
 
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db)):
+def delete_user(user_id: int, db: Session = Depends(get_write_db)):
     user = db.get(Utilisateur, user_id)
     if not user:
         raise HTTPException(404, "User not found")
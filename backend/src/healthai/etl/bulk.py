@@ -0,0 +1,105 @@
+from __future__ import annotations
+import os
+from typing import Callable, Iterable
+import pandas as pd
+import psycopg2
+from psycopg2 import errorcodes
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+# ETL_ROW_ERRORS, when the database refuses a batch (constraint, value out of range):
+# - bisect : split the batch until the refused rows are isolated and quarantined (default)
+# - fail   : fail the run, nothing of it is committed
+ROW_ERROR_POLICIES = ("bisect", "fail")
+
+# Errors caused by the rows themselves (a COPY on the raw cursor raises the psycopg2 ones);
+# connection errors are not retried row by row
+ROW_ERRORS = (IntegrityError, DataError, psycopg2.IntegrityError, psycopg2.DataError)
+
+
+def get_row_error_policy() -> str:
+    policy = os.getenv("ETL_ROW_ERRORS", "bisect").strip().lower()
+    if policy not in ROW_ERROR_POLICIES:
+        raise ValueError(f"Invalid ETL_ROW_ERRORS={policy!r}, expected one of {ROW_ERROR_POLICIES}")
+    return policy
+
+
+def frame_to_records(df: pd.DataFrame, columns: Iterable[str]) -> list[dict]:
+    """
+    Turn a frame into DB-API friendly dicts:
+    - only the requested columns
+    - numpy scalars become Python scalars
+    - NaN / NA become None
+    """
+    out = df[list(columns)].astype(object)
+    out = out.where(out.notna(), None)
+    return out.to_dict("records")
+
+
+def upsert_rows(
+    db: Session,
+    model,
+    records: list[dict],
+    *,
+    constraint: str,
+    update_columns: Iterable[str],
+) -> int:
+    """
+    Bulk INSERT ... ON CONFLICT ON CONSTRAINT ... DO UPDATE.
+    Executed as one executemany, batched by the driver.
+    """
+    if not records:
+        return 0
+
+    stmt = pg_insert(model)
+    stmt = stmt.on_conflict_do_update(
+        constraint=constraint,
+        set_={c: stmt.excluded[c] for c in update_columns},
+    )
+    db.execute(stmt, records)
+    return len(records)
+
+
+def describe_row_error(error: Exception) -> tuple[str, str]:
+    """
+    (reason, message) of a refused row: the violated constraint (named like the
+    validation rules) or the error code name, and the server's message.
+    """
+    orig = getattr(error, "orig", None) or error
+    diag = getattr(orig, "diag", None)
+    reason = getattr(diag, "constraint_name", None)
+    if not reason:
+        code = getattr(orig, "pgcode", None)
+        reason = (errorcodes.lookup(code) if code else "db_error").lower()
+    message = getattr(diag, "message_primary", None) or str(orig)
+    return reason, message.strip()
+
+
+def load_rows(
+    db: Session,
+    frame: pd.DataFrame,
+    load: Callable[[pd.DataFrame], int],
+    reject: Callable[[pd.DataFrame, str, str], None],
+    policy: str = "bisect",
+) -> int:
+    """
+    Run `load(frame)` in a SAVEPOINT and return its row count. If the database
+    refuses the batch, roll back to the savepoint and load each half the same
+    way, down to single rows: a row refused on its own goes to
+    reject(rows, reason, message), every other row stays loaded in the caller's
+    transaction. A clean batch costs one savepoint, k bad rows O(k log n) retries.
+    """
+    if policy == "fail":
+        return load(frame)
+    if frame.empty:
+        return 0
+    try:
+        with db.begin_nested():
+            return load(frame)
+    except ROW_ERRORS as e:
+        if len(frame) == 1:
+            reject(frame, *describe_row_error(e))
+            return 0
+    half = len(frame) // 2
+    return load_rows(db, frame.iloc[:half], load, reject) + load_rows(db, frame.iloc[half:], load, reject)
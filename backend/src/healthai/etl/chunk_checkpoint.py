@@ -0,0 +1,160 @@
+from __future__ import annotations
+import os
+import time
+from datetime import datetime
+from typing import Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from healthai.etl.quarantine import QuarantineWriter
+from healthai.etl.sources import IngestPlan
+from healthai.models.ingest_checkpoint import IngestCheckpoint
+from healthai.models.ingest_checkpoint_segment import IngestCheckpointSegment
+
+
+def get_checkpoint_seconds() -> float:
+    """INGEST_CHECKPOINT_SECONDS between two checkpoints of a chunked read (default 30; 0 = after every chunk)."""
+    return float(os.getenv("INGEST_CHECKPOINT_SECONDS", "30") or 0)
+
+
+def _to_ipc(df: pd.DataFrame) -> bytes:
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _from_ipc(data: bytes) -> pd.DataFrame:
+    return ipc.open_stream(data).read_all().to_pandas()
+
+
+class ChunkCheckpoint:
+    """
+    Crash-safe progress of the chunked read of one source. After a chunk
+    (at most every `every_seconds`) the caller's state is committed, which
+    also ends the read's transaction:
+    - a small JSON state (counters...), rewritten in ingest_checkpoint
+    - frames covering only the chunks since the previous checkpoint (seen
+      keys, partial aggregates...), appended to ingest_checkpoint_segment as
+      Arrow IPC, so each checkpoint writes what is new, not the whole state
+    A later run planning the same range (same content, start byte and chunk
+    size) gets both back and skips the chunks already done; a checkpoint of
+    another version of the file is dropped with its segments. Nothing is
+    unpickled from the database. The quarantined rows of the saved chunks are
+    flushed with each checkpoint and copied into the run that resumes.
+    Cleared in the transaction that records the finished ingest.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        plan: IngestPlan,
+        chunk_size: Optional[int],
+        id_run: int,
+        every_seconds: Optional[float] = None,
+    ):
+        self.db = db
+        self.plan = plan
+        self.chunk_size = chunk_size
+        self.id_run = id_run
+        self.every_seconds = get_checkpoint_seconds() if every_seconds is None else every_seconds
+        self._last = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        # A whole-file read is a single chunk; an unplanned (missing) file has no fingerprint
+        return self.chunk_size is not None and self.plan.fingerprint is not None
+
+    def _where(self):
+        return (IngestCheckpoint.pipeline_name == self.plan.pipeline_name, IngestCheckpoint.path == self.plan.path)
+
+    def _matches(self, row: IngestCheckpoint) -> bool:
+        fp = self.plan.fingerprint
+        return (row.size_bytes, row.content_hash, row.start_byte, row.chunk_size) == (
+            fp.size_bytes,
+            fp.content_hash,
+            self.plan.start_byte,
+            self.chunk_size,
+        )
+
+    def resume(self, quarantine: QuarantineWriter) -> Optional[tuple[int, dict, dict[str, list[pd.DataFrame]]]]:
+        """
+        (chunks done, saved state, saved segments per name in save order) of an
+        interrupted run of the same range, or None.
+        """
+        if not self.enabled:
+            return None
+        row = self.db.execute(select(IngestCheckpoint).where(*self._where())).scalar_one_or_none()
+        if row is None:
+            return None
+        saved = row.state if self._matches(row) and isinstance(row.state, dict) else None
+        if saved is None or "quarantine_parts" not in saved:
+            # Stale or written by another release of the code: removed with its segments,
+            # committed by the next checkpoint or the final commit
+            self.db.delete(row)
+            self.db.flush()
+            return None
+
+        segments: dict[str, list[pd.DataFrame]] = {}
+        for name, data in self.db.execute(
+            select(IngestCheckpointSegment.name, IngestCheckpointSegment.data)
+            .where(IngestCheckpointSegment.id_checkpoint == row.id_checkpoint)
+            .order_by(IngestCheckpointSegment.id_segment)
+        ).all():
+            segments.setdefault(name, []).append(_from_ipc(data))
+        if row.id_run is not None:
+            quarantine.adopt(row.id_run, saved["quarantine_parts"])
+        print(f"[checkpoint] {self.plan.path}: resuming after chunk {row.chunks_done} ({row.rows_done} rows, run {row.id_run})")
+        return row.chunks_done, saved["state"], segments
+
+    def due(self) -> bool:
+        return self.enabled and time.monotonic() - self._last >= self.every_seconds
+
+    def save(
+        self,
+        chunks_done: int,
+        rows_done: int,
+        state: dict,
+        segments: dict[str, pd.DataFrame],
+        quarantine: QuarantineWriter,
+    ) -> None:
+        """
+        Commit the result of the first `chunks_done` chunks: `state` (JSON,
+        replaces the saved one) and `segments`, the frames of the chunks done
+        since the previous save (appended to the saved ones).
+        """
+        quarantine.flush()
+        fp = self.plan.fingerprint
+        values = {
+            "size_bytes": fp.size_bytes,
+            "content_hash": fp.content_hash,
+            "start_byte": self.plan.start_byte,
+            "chunk_size": self.chunk_size,
+            "chunks_done": chunks_done,
+            "rows_done": rows_done,
+            "state": {"state": state, "quarantine_parts": list(quarantine.parts)},
+            "id_run": self.id_run,
+            "updated_at": datetime.utcnow(),
+        }
+        stmt = pg_insert(IngestCheckpoint).values(pipeline_name=self.plan.pipeline_name, path=self.plan.path, **values)
+        id_checkpoint = self.db.execute(
+            stmt.on_conflict_do_update(constraint="uq_ingest_checkpoint_pipeline_path", set_=values).returning(
+                IngestCheckpoint.id_checkpoint
+            )
+        ).scalar_one()
+        records = [
+            {"id_checkpoint": id_checkpoint, "name": name, "chunks_done": chunks_done, "data": _to_ipc(df)}
+            for name, df in segments.items()
+        ]
+        if records:
+            self.db.execute(insert(IngestCheckpointSegment), records)
+        self.db.commit()
+        self._last = time.monotonic()
+
+    def clear(self) -> None:
+        """Drop the checkpoint of the source, in the caller's transaction (with record_ingest)."""
+        self.db.execute(delete(IngestCheckpoint).where(*self._where()))
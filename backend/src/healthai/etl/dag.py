@@ -0,0 +1,284 @@
+from __future__ import annotations
+import multiprocessing
+import os
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Optional
+from sqlalchemy import select, update
+from sqlalchemy.exc import InterfaceError, OperationalError
+from healthai.db import SessionLocal
+from healthai.etl.parallel import StageError, StageResult, get_workers
+from healthai.models.pipeline_checkpoint import PipelineCheckpoint
+
+# Errors worth retrying: lost connection, server restart, timeouts.
+# Anything else (bad file, failed rule) fails the stage at once.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, ConnectionError, TimeoutError)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)) or default)
+
+
+@dataclass(frozen=True)
+class Task:
+    """
+    One stage of the DAG: picklable callable + the stages it waits for.
+    Transient errors are retried `retries` times, waiting
+    backoff_seconds, then twice as long after each new failure.
+    """
+
+    name: str
+    fn: Callable[[], Any]
+    deps: tuple[str, ...] = ()
+    retries: int = field(default_factory=lambda: _env_int("PIPELINE_RETRIES", 2))
+    backoff_seconds: float = field(default_factory=lambda: float(_env_int("PIPELINE_BACKOFF_SECONDS", 30)))
+
+
+def _run_task(task: Task) -> StageResult:
+    """Run a task with its retries; never raises (value = number of attempts)."""
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            task.fn()
+            return StageResult(task.name, True, time.perf_counter() - started, value=attempt)
+        except TRANSIENT_ERRORS as e:
+            if attempt > task.retries:
+                error = e
+                break
+            delay = task.backoff_seconds * 2 ** (attempt - 1)
+            print(f"[dag] {task.name}: attempt {attempt} failed ({type(e).__name__}), retrying in {delay:.0f}s")
+            time.sleep(delay)
+        except Exception as e:
+            error = e
+            break
+
+    traceback.print_exception(error)
+    return StageResult(
+        task.name,
+        False,
+        time.perf_counter() - started,
+        value=attempt,
+        error=f"{type(error).__name__}: {error}",
+    )
+
+
+class CheckpointStore:
+    """
+    pipeline_checkpoint rows, one per stage of a batch.
+    A batch whose stages did not all succeed is resumed by the next run of
+    the same stages within PIPELINE_RESUME_HOURS: its successful stages are skipped.
+    """
+
+    def __init__(self, resume_hours: Optional[float] = None):
+        self.resume_hours = resume_hours if resume_hours is not None else _env_int("PIPELINE_RESUME_HOURS", 12)
+
+    def resume(self, dag_name: str, stages: list[str]) -> Optional[tuple[str, set[str]]]:
+        """(batch_id, succeeded stages) of the last batch if it can be resumed, else None."""
+        db = SessionLocal()
+        try:
+            last = db.execute(
+                select(PipelineCheckpoint.batch_id, PipelineCheckpoint.created_at)
+                .where(PipelineCheckpoint.dag_name == dag_name)
+                .order_by(PipelineCheckpoint.created_at.desc())
+                .limit(1)
+            ).first()
+            if last is None or last.created_at < datetime.utcnow() - timedelta(hours=self.resume_hours):
+                return None
+
+            rows = db.execute(
+                select(PipelineCheckpoint.stage, PipelineCheckpoint.status).where(PipelineCheckpoint.batch_id == last.batch_id)
+            ).all()
+            done = {r.stage for r in rows if r.status == "SUCCESS"}
+            if {r.stage for r in rows} != set(stages) or done == set(stages):
+                return None
+            return last.batch_id, done
+        finally:
+            db.close()
+
+    def start(self, dag_name: str, stages: list[str]) -> str:
+        batch_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.add_all(
+                PipelineCheckpoint(batch_id=batch_id, dag_name=dag_name, stage=s, status="PENDING", attempts=0, created_at=now)
+                for s in stages
+            )
+            db.commit()
+        finally:
+            db.close()
+        return batch_id
+
+    def record(self, batch_id: str, result: StageResult, status: str) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(PipelineCheckpoint)
+                .where(PipelineCheckpoint.batch_id == batch_id, PipelineCheckpoint.stage == result.name)
+                .values(
+                    status=status,
+                    attempts=PipelineCheckpoint.attempts + (result.value or 0),
+                    seconds=result.seconds,
+                    error_message=result.error,
+                    updated_at=datetime.utcnow(),
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def discard(self, batch_id: str) -> None:
+        """Successful stages of the batch whose work was undone: run again on resume."""
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(PipelineCheckpoint)
+                .where(PipelineCheckpoint.batch_id == batch_id, PipelineCheckpoint.status == "SUCCESS")
+                .values(status="DISCARDED", updated_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+class _InlineExecutor:
+    """Executor running each task on submit(), for a single worker."""
+
+    def submit(self, fn: Callable, *args) -> Future:
+        future: Future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self) -> _InlineExecutor:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+class Dag:
+    """
+    Stages with dependencies, run as soon as their dependencies succeed
+    (up to ETL_WORKERS at a time). A failed stage blocks its downstream stages
+    only; the others still run.
+    on_failure runs once a run has failed; it returns True when it undid the
+    work of the batch, whose successful stages are then run again on resume.
+    """
+
+    def __init__(self, name: str, tasks: Iterable[Task], on_failure: Optional[Callable[[], bool]] = None):
+        self.name = name
+        self.on_failure = on_failure
+        self.tasks = {t.name: t for t in tasks}
+        for t in self.tasks.values():
+            unknown = [d for d in t.deps if d not in self.tasks]
+            if unknown:
+                raise ValueError(f"Stage {t.name} depends on unknown stages: {unknown}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> list[str]:
+        """Declaration order, each stage after its dependencies."""
+        order: list[str] = []
+        remaining = list(self.tasks)
+        while remaining:
+            ready = [n for n in remaining if all(d in order for d in self.tasks[n].deps)]
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages: {remaining}")
+            order.append(ready[0])
+            remaining.remove(ready[0])
+        return order
+
+    def select(self, names: Optional[Iterable[str]] = None, with_deps: bool = False) -> list[str]:
+        """
+        Stages to run, in topological order. Dependencies outside the subset
+        are assumed done, unless with_deps adds them.
+        """
+        if names is None:
+            return list(self.order)
+        wanted = set(names)
+        unknown = sorted(wanted - set(self.tasks))
+        if unknown:
+            raise ValueError(f"Unknown stages: {unknown} (available: {', '.join(self.order)})")
+        if with_deps:
+            stack = list(wanted)
+            while stack:
+                for d in self.tasks[stack.pop()].deps:
+                    if d not in wanted:
+                        wanted.add(d)
+                        stack.append(d)
+        return [n for n in self.order if n in wanted]
+
+    def run(
+        self,
+        names: Optional[Iterable[str]] = None,
+        *,
+        with_deps: bool = False,
+        resume: bool = True,
+        store: Optional[CheckpointStore] = None,
+        workers: Optional[int] = None,
+    ) -> list[StageResult]:
+        selected = self.select(names, with_deps)
+        store = store or CheckpointStore()
+
+        resumed = store.resume(self.name, selected) if resume else None
+        if resumed is not None:
+            batch_id, done = resumed
+            print(f"[dag] resuming batch {batch_id}, already done: {', '.join(n for n in selected if n in done)}")
+        else:
+            batch_id, done = store.start(self.name, selected), set()
+
+        pending = [n for n in selected if n not in done]
+        results: dict[str, StageResult] = {}
+        failed: set[str] = set()
+
+        workers = workers or get_workers(max(len(pending), 1))
+        if workers <= 1:
+            executor = _InlineExecutor()
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+        with executor:
+            running: dict[Future, str] = {}
+            while pending or running:
+                for name in list(pending):
+                    deps = [d for d in self.tasks[name].deps if d in selected]
+                    blockers = [d for d in deps if d in failed]
+                    if blockers:
+                        pending.remove(name)
+                        failed.add(name)
+                        results[name] = StageResult(name, False, 0.0, value=0, error=f"blocked by {', '.join(blockers)}")
+                        store.record(batch_id, results[name], "BLOCKED")
+                    elif all(d in done for d in deps):
+                        pending.remove(name)
+                        running[executor.submit(_run_task, self.tasks[name])] = name
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    del running[future]
+                    results[result.name] = result
+                    if result.ok:
+                        done.add(result.name)
+                    else:
+                        failed.add(result.name)
+                    store.record(batch_id, result, "SUCCESS" if result.ok else "FAILED")
+
+        ordered = [results[n] for n in selected if n in results]
+        for r in ordered:
+            print(f"[dag] {r} ({r.value} attempt(s))" if r.ok else f"[dag] {r}")
+
+        errors = [r for r in ordered if not r.ok]
+        if errors:
+            if self.on_failure is not None:
+                try:
+                    if self.on_failure():
+                        store.discard(batch_id)
+                except Exception as e:  # the stage errors are the ones to report
+                    print(f"[dag] on_failure of {self.name} failed: {type(e).__name__}: {e}")
+            raise StageError(errors)
+        return ordered
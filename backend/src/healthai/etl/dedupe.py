@@ -0,0 +1,108 @@
+from __future__ import annotations
+import hashlib
+from typing import Optional
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+
+def key_hashes(df: pd.DataFrame, subset: list[str]) -> np.ndarray:
+    """
+    64-bit hash of each row restricted to `subset`.
+    Numeric columns are hashed as float64 so 34 (int chunk) and 34.0
+    (float chunk) give the same key; strings hash the same whatever their dtype.
+    """
+    cols = {}
+    for c in subset:
+        s = df[c]
+        if is_numeric_dtype(s.dtype):
+            s = pd.Series(s.to_numpy(dtype="float64", na_value=np.nan), index=s.index)
+        cols[c] = s
+    return pd.util.hash_pandas_object(pd.DataFrame(cols), index=False).to_numpy()
+
+
+def content_hashes(df: pd.DataFrame, columns: list[str], decimals: int = 2) -> pd.Series:
+    """
+    sha256 of each row rendered as "v1|v2|...", to be stored in the database.
+    Unlike key_hashes it does not depend on the pandas version or on dtypes:
+    numbers are rounded to `decimals` (NUMERIC(x,2) precision), missing values are "".
+    The order of `columns` is part of the hash.
+    """
+    parts = []
+    for c in columns:
+        s = df[c]
+        if is_numeric_dtype(s.dtype):
+            v = pd.Series(s.to_numpy(dtype="float64", na_value=np.nan), index=s.index).round(decimals)
+            parts.append(v.astype(str).where(v.notna(), ""))
+        else:
+            parts.append(s.astype("string").fillna("").astype(str))
+
+    canon = parts[0].str.cat(parts[1:], sep="|") if len(parts) > 1 else parts[0]
+    return pd.Series(
+        [hashlib.sha256(c.encode("utf-8")).hexdigest() for c in canon],
+        index=df.index,
+        dtype=object,
+    )
+
+
+class KeyHashDeduper:
+    """
+    drop_duplicates() that remembers what it has already seen across chunks.
+    State is a few sorted uint64 runs: 8 bytes per distinct key, no rows kept.
+    Each run is more than twice as long as the next one, so a chunk's keys are
+    only merged into runs of similar size: O(N log N) in total over a file,
+    at most log2(N) runs to search, instead of a full re-sort per chunk.
+    """
+
+    def __init__(self, subset: list[str]) -> None:
+        self.subset = subset
+        self._runs: list[np.ndarray] = []
+        # Keys added since the last take_new(), once track_new() is called
+        self._new: Optional[list[np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    def _already_seen(self, h: np.ndarray) -> np.ndarray:
+        seen = np.zeros(len(h), dtype=bool)
+        for run in self._runs:
+            pos = np.searchsorted(run, h).clip(max=len(run) - 1)
+            seen |= run[pos] == h
+        return seen
+
+    def _add(self, h: np.ndarray) -> None:
+        run = np.sort(h)
+        while self._runs and len(self._runs[-1]) <= 2 * len(run):
+            # Two sorted runs: the stable sort (timsort) merges them in linear time
+            run = np.sort(np.concatenate([self._runs.pop(), run]), kind="stable")
+        self._runs.append(run)
+
+    def track_new(self) -> None:
+        """Keep the keys added from now on for take_new() (incremental checkpoints)."""
+        self._new = []
+
+    def take_new(self) -> np.ndarray:
+        """Keys added since track_new() or the previous take_new(), as uint64."""
+        new = np.concatenate(self._new) if self._new else np.empty(0, dtype=np.uint64)
+        self._new = []
+        return new
+
+    def restore(self, hashes: np.ndarray) -> None:
+        """Mark keys returned by take_new() as already seen."""
+        if len(hashes):
+            self._add(np.asarray(hashes, dtype=np.uint64))
+
+    def drop_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Keep the first occurrence of each key, in this chunk and all previous ones."""
+        if df.empty:
+            return df
+
+        h = key_hashes(df, self.subset)
+        first_in_chunk = ~pd.Series(h).duplicated().to_numpy()
+
+        keep = first_in_chunk & ~self._already_seen(h)
+        if keep.any():
+            self._add(h[keep])
+            if self._new is not None:
+                self._new.append(h[keep])
+        return df[keep]
@@ -0,0 +1,161 @@
+from __future__ import annotations
+import hashlib
+import pandas as pd
+from sqlalchemy import any_, bindparam, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from healthai.etl.bulk import frame_to_records
+from healthai.models.aliment import Aliment
+from healthai.models.utilisateur import Utilisateur
+
+USER_COLUMNS = ["age", "gender", "height_m", "experience_level"]
+
+
+def user_key_hashes(users: pd.DataFrame) -> pd.Series:
+    """
+    sha256 of the canonical natural key "age|gender|height_m|experience_level".
+    Height is rendered with 2 decimals like NUMERIC(4,2), missing parts as "".
+    """
+    height = pd.to_numeric(users["height_m"], errors="coerce").astype("float64")
+    canon = (
+        users["age"].astype("int64").astype(str)
+        + "|" + users["gender"].astype("string").str.strip().fillna("")
+        + "|" + height.map(lambda h: "" if pd.isna(h) else f"{h:.2f}")
+        + "|" + users["experience_level"].astype("string").str.strip().fillna("")
+    )
+    return pd.Series(
+        [hashlib.sha256(c.encode("utf-8")).hexdigest() for c in canon],
+        index=users.index,
+        dtype=object,
+    )
+
+
+def load_user_key_map(db: Session) -> dict[str, int]:
+    """
+    Load every user once and map key hash -> id_user.
+    Rows whose stored hash is missing or stale (e.g. edited through the API)
+    are fixed in two bulk UPDATEs so ON CONFLICT keeps working for them.
+    Called once per run, before the loads: resolve_user_ids and the COPY
+    merges then rely on the stored hashes and only look up their own keys.
+    """
+    rows = db.execute(
+        select(Utilisateur.id_user, Utilisateur.user_key_hash, *[getattr(Utilisateur, c) for c in USER_COLUMNS])
+        .order_by(Utilisateur.id_user)
+    ).all()
+    if not rows:
+        return {}
+
+    existing = pd.DataFrame(rows, columns=["id_user", "stored_hash", *USER_COLUMNS])
+    existing["key_hash"] = user_key_hashes(existing)
+
+    # Two users can share a key (API inserts): the oldest one owns the hash
+    owner = ~existing["key_hash"].duplicated(keep="first")
+    target = existing["key_hash"].where(owner, None)
+    stale = existing["stored_hash"].ne(target) & (existing["stored_hash"].notna() | target.notna())
+
+    if stale.any():
+        ids = existing.loc[stale, "id_user"].astype(int).tolist()
+        db.execute(update(Utilisateur), [{"id_user": i, "user_key_hash": None} for i in ids])
+        fixes = existing.loc[stale & owner, ["id_user", "key_hash"]]
+        if not fixes.empty:
+            db.execute(
+                update(Utilisateur),
+                [{"id_user": int(i), "user_key_hash": h} for i, h in fixes.itertuples(index=False)],
+            )
+
+    return dict(zip(existing.loc[owner, "key_hash"], existing.loc[owner, "id_user"].astype(int)))
+
+
+def resolve_user_ids(db: Session, users: pd.DataFrame) -> pd.Series:
+    """
+    Map each row of `users` (USER_COLUMNS) to an id_user, creating missing users.
+    Stored hashes must be up to date (load_user_key_map, once per run).
+
+    Constant number of queries per call:
+    - one SELECT ... WHERE user_key_hash = ANY(:hashes) for the existing users
+    - one bulk INSERT ... ON CONFLICT (user_key_hash) DO NOTHING RETURNING
+    - one SELECT for keys inserted meanwhile by a concurrent loader
+    """
+    hashes = user_key_hashes(users)
+    if hashes.empty:
+        return hashes.astype("int64")
+
+    known = dict(db.execute(
+        select(Utilisateur.user_key_hash, Utilisateur.id_user)
+        .where(Utilisateur.user_key_hash == any_(bindparam("hashes"))),
+        {"hashes": hashes.unique().tolist()},
+    ).tuples().all())
+
+    new_users = users.assign(user_key_hash=hashes)
+    new_users = new_users[~hashes.isin(known.keys())].drop_duplicates(subset=["user_key_hash"])
+
+    if not new_users.empty:
+        stmt = (
+            pg_insert(Utilisateur)
+            .on_conflict_do_nothing(index_elements=["user_key_hash"])
+            .returning(Utilisateur.user_key_hash, Utilisateur.id_user)
+        )
+        records = frame_to_records(new_users, [*USER_COLUMNS, "user_key_hash"])
+        known.update(dict(db.execute(stmt, records).tuples().all()))
+
+        raced = [h for h in new_users["user_key_hash"] if h not in known]
+        if raced:
+            known.update(dict(db.execute(
+                select(Utilisateur.user_key_hash, Utilisateur.id_user)
+                .where(Utilisateur.user_key_hash.in_(raced))
+            ).tuples().all()))
+
+    return hashes.map(known).astype("int64")
+
+
+FOOD_COLUMNS = [
+    "food_item",
+    "category",
+    "calories_kcal",
+    "protein_g",
+    "carbohydrates_g",
+    "fat_g",
+    "fiber_g",
+    "sugars_g",
+    "sodium_mg",
+    "cholesterol_mg",
+]
+
+
+def resolve_food_ids(db: Session, foods: pd.DataFrame, *, source: str) -> dict[str, int]:
+    """
+    Map every food_item of `foods` (FOOD_COLUMNS) to an id_food, creating missing foods
+    from their first row.
+
+    Constant number of queries per call:
+    - one SELECT ... WHERE food_item = ANY(:names) for the existing foods
+    - one bulk INSERT ... ON CONFLICT (food_item) DO NOTHING RETURNING
+    - one SELECT for names inserted meanwhile by a concurrent loader
+    """
+    first = foods.drop_duplicates(subset=["food_item"], keep="first")
+    names = first["food_item"].tolist()
+    if not names:
+        return {}
+
+    known = dict(db.execute(
+        select(Aliment.food_item, Aliment.id_food).where(Aliment.food_item == any_(bindparam("names"))),
+        {"names": names},
+    ).tuples().all())
+
+    new_foods = first[~first["food_item"].isin(known.keys())]
+    if not new_foods.empty:
+        stmt = (
+            pg_insert(Aliment)
+            .on_conflict_do_nothing(index_elements=["food_item"])
+            .returning(Aliment.food_item, Aliment.id_food)
+        )
+        records = frame_to_records(new_foods.assign(source=source), [*FOOD_COLUMNS, "source"])
+        known.update(dict(db.execute(stmt, records).tuples().all()))
+
+        raced = [n for n in new_foods["food_item"] if n not in known]
+        if raced:
+            known.update(dict(db.execute(
+                select(Aliment.food_item, Aliment.id_food).where(Aliment.food_item.in_(raced))
+            ).tuples().all()))
+
+    return known
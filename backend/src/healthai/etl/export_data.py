@@ -1,10 +1,16 @@
 from __future__ import annotations
 import os
 from datetime import datetime
+from functools import partial
+from typing import Optional
 import pandas as pd
 from sqlalchemy import text
 
-from healthai.db import engine
+from healthai.db import SessionLocal, engine
+from healthai.etl.locks import DatasetLocks
+from healthai.etl.metrics import RunMetrics
+from healthai.etl.parallel import run_stages
+from healthai.etl.quality import finish_run, start_run
 
 OUT_DIR = os.getenv("EXPORT_DIR", "/app/data/cleaned")
 
@@ -14,30 +20,45 @@ def _ensure_out_dir() -> None:
 def _stamp() -> str:
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
+def _write_atomic(path: str, write) -> None:
+    # Deux exports lancés dans la même seconde visent le même nom : chacun écrit son
+    # fichier temporaire puis le renomme, un lecteur ne voit jamais un fichier mélangé
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def export_table(query_sql: str, base_name: str) -> dict:
-    df = pd.read_sql_query(text(query_sql), con=engine)
+    # Mesures prises dans le worker, enregistrées par main() sous le run export_data
+    metrics = RunMetrics("export_data")
+    with metrics.stage(f"{base_name}:query") as step:
+        df = pd.read_sql_query(text(query_sql), con=engine)
+        step.rows_out = len(df)
 
     ts = _stamp()
     csv_path = os.path.join(OUT_DIR, f"{base_name}_{ts}.csv")
     json_path = os.path.join(OUT_DIR, f"{base_name}_{ts}.json")
 
-    df.to_csv(csv_path, index=False, encoding="utf-8")
-    df.to_json(json_path, orient="records", force_ascii=False)
+    with metrics.stage(f"{base_name}:write", len(df)):
+        _write_atomic(csv_path, lambda p: df.to_csv(p, index=False, encoding="utf-8"))
+        _write_atomic(json_path, lambda p: df.to_json(p, orient="records", force_ascii=False))
 
     return {
         "name": base_name,
         "rows": int(len(df)),
         "csv": csv_path,
         "json": json_path,
+        "metrics": list(metrics.stages.values()),
     }
 
-def main() -> None:
-    _ensure_out_dir()
-
-    exports: list[dict] = []
-
+# (nom, requête) : exports indépendants, lancés en parallèle (ETL_WORKERS)
+EXPORTS = [
     # Export 1 : Aliments (référentiel)
-    exports.append(export_table(
+    (
+        "foods",
         """
         SELECT
           id_food, food_item, category,
@@ -47,11 +68,10 @@ def main() -> None:
         FROM aliment
         ORDER BY id_food;
         """,
-        "foods"
-    ))
-
+    ),
     # Export 2 : Logs nutrition (nettoyés)
-    exports.append(export_table(
+    (
+        "nutrition_logs",
         """
         SELECT
           nl.id_nutrition_log,
@@ -67,11 +87,10 @@ def main() -> None:
         JOIN aliment a ON a.id_food = nl.id_food
         ORDER BY nl.id_nutrition_log;
         """,
-        "nutrition_logs"
-    ))
-
+    ),
     # Export 3 : Sessions sport (nettoyées)
-    exports.append(export_table(
+    (
+        "fitness_sessions",
         """
         SELECT
           s.id_session,
@@ -86,38 +105,93 @@ def main() -> None:
         JOIN utilisateur u ON u.id_user = s.id_user
         ORDER BY s.id_session;
         """,
-        "fitness_sessions"
-    ))
-
+    ),
     # Export 4 : KPIs (prêts PowerBI si besoin)
-    exports.append(export_table(
+    (
+        "kpi_quality_runs",
         """
         SELECT * FROM v_quality_runs ORDER BY id_run DESC;
         """,
-        "kpi_quality_runs"
-    ))
-    exports.append(export_table(
+    ),
+    (
+        "kpi_users_age_groups",
         """
         SELECT * FROM v_users_age_groups;
         """,
-        "kpi_users_age_groups"
-    ))
-    exports.append(export_table(
+    ),
+    (
+        "kpi_fitness_top_workouts",
         """
         SELECT * FROM v_fitness_top_workouts;
         """,
-        "kpi_fitness_top_workouts"
-    ))
-    exports.append(export_table(
+    ),
+    (
+        "kpi_nutrition_top_foods",
         """
         SELECT * FROM v_nutrition_top_foods;
         """,
-        "kpi_nutrition_top_foods"
-    ))
+    ),
+]
+
+def main(lock_wait: Optional[float] = None) -> None:
+    """lock_wait : secondes d'attente derrière un chargement (défaut ETL_LOCK_WAIT_SECONDS, 0 = échec immédiat)."""
+    _ensure_out_dir()
+
+    db = SessionLocal()
+    run = start_run(db, "export_data")
+    id_run = run.id_run
+    metrics = RunMetrics("export_data")
+    # Lecture seule : les exports tournent ensemble, mais jamais pendant un chargement
+    # (instantané cohérent de aliment / nutrition_log / utilisateur / session_sport)
+    locks = DatasetLocks("export_data", shared=["nutrition", "fitness"], wait_seconds=lock_wait)
+    try:
+        locks.acquire()
+        results = run_stages([(name, partial(export_table, sql, name)) for name, sql in EXPORTS])
+        exports: list[dict] = [r.value for r in results]
+        for e in exports:
+            for m in e["metrics"]:
+                metrics.add(m)
+
+        rows = sum(e["rows"] for e in exports)
+        metrics.save(db, id_run)
+        finish_run(
+            db,
+            run,
+            status="SUCCESS",
+            rows_read=rows,
+            rows_inserted=0,
+            rows_rejected=0,
+            missing_values_count=0,
+            duplicates_count=0,
+            lock_wait_seconds=locks.waited,
+        )
+    except Exception as e:
+        db.rollback()
+        finish_run(
+            db,
+            run,
+            status="FAILED",
+            rows_read=0,
+            rows_inserted=0,
+            rows_rejected=0,
+            missing_values_count=0,
+            duplicates_count=0,
+            error_message=str(e),
+            lock_wait_seconds=locks.waited,
+        )
+        raise
+    finally:
+        locks.release()
+        db.close()
 
     print("=== EXPORT DONE ===")
     for e in exports:
         print(f"- {e['name']}: rows={e['rows']}\n  csv={e['csv']}\n  json={e['json']}")
+    print(metrics.summary())
+    try:
+        metrics.write_textfile(id_run)
+    except OSError as e:  # exports déjà écrits et run validé : des métriques manquantes ne doivent pas le faire échouer
+        print(f"[export] fichier de métriques non écrit: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
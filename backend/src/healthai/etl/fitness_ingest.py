@@ -1,15 +1,37 @@
 from __future__ import annotations
 import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import date
+from functools import partial, reduce
 from typing import Optional
+import numpy as np
 import pandas as pd
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 from healthai.db import SessionLocal
+from healthai.etl.bulk import frame_to_records, get_row_error_policy, load_rows, upsert_rows
+from healthai.etl.chunk_checkpoint import ChunkCheckpoint
+from healthai.etl.dedupe import KeyHashDeduper
+from healthai.etl.dimensions import USER_COLUMNS, load_user_key_map, resolve_user_ids, user_key_hashes
+from healthai.etl.locks import DatasetLocks
+from healthai.etl.metrics import RunMetrics, StageMetrics
+from healthai.etl.parallel import run_stages
+from healthai.etl.partitions import FileOutcome, list_sources, read_partitions, run_outcome, save_file_outcomes
+from healthai.etl.profiling import FrameProfiler, save_profiles
 from healthai.etl.quality import finish_run, start_run
-from healthai.etl.validators import validate_columns
+from healthai.etl.quarantine import QuarantineWriter
+from healthai.etl.reader import CsvSchema, ReadStats, clean_str, get_chunk_size
+from healthai.etl.shadow import load_session
+from healthai.etl.shards import ShardSpill, get_shards, iter_spill, shard_ids
+from healthai.etl.sources import IngestPlan, plan_ingest, record_ingest
+from healthai.etl.staging import copy_frame, create_staging, get_load_mode, merge, prepare_staging
+from healthai.etl.validators import RuleReport, RuleSet, validate_columns
+from healthai.models.rules import SESSION_RULES, USER_RULES, Rule
 from healthai.models.session_sport import SessionSport
-from healthai.models.utilisateur import Utilisateur
+
+# Source when FITNESS_CSV is unset (also watched by healthai.etl.watch)
+DEFAULT_SOURCE = "/app/data/raw/fitness_tracker.csv"
 
 REQUIRED_COLS = [
     "Age",
@@ -29,6 +51,100 @@ REQUIRED_COLS = [
     "BMI",
 ]
 
+# Parse only the required columns.
+# float32 for integer-like values and the height (exact enough for the user key);
+# float64 for values summed or averaged into NUMERIC(x,2) columns, so rounding is unchanged.
+FITNESS_SCHEMA = CsvSchema(
+    columns=REQUIRED_COLS,
+    categorical=["Gender", "Workout_Type", "Experience_Level"],
+    numeric={
+        "Age": "float32",
+        "Weight (kg)": "float64",
+        "Height (m)": "float32",
+        "Max_BPM": "float32",
+        "Avg_BPM": "float32",
+        "Resting_BPM": "float32",
+        "Session_Duration (hours)": "float64",
+        "Calories_Burned": "float64",
+        "Fat_Percentage": "float64",
+        "Water_Intake (liters)": "float64",
+        "Workout_Frequency (days/week)": "float32",
+        "BMI": "float64",
+    },
+)
+
+# Natural key of a user: one aggregated session per key and import date
+USER_KEY_COLS = ["Age", "Gender", "Height (m)", "Experience_Level"]
+
+SESSION_COLUMNS = [
+    "weight_kg",
+    "max_bpm",
+    "avg_bpm",
+    "resting_bpm",
+    "session_duration_hours",
+    "calories_burned",
+    "workout_type",
+    "fat_percentage",
+    "water_intake_liters",
+    "workout_frequency_days_per_week",
+    "bmi",
+]
+
+# Database column -> CSV column, for the validation rules
+DB_COLS = {
+    "age": "Age",
+    "gender": "Gender",
+    "height_m": "Height (m)",
+    "weight_kg": "Weight (kg)",
+    "max_bpm": "Max_BPM",
+    "avg_bpm": "Avg_BPM",
+    "resting_bpm": "Resting_BPM",
+    "session_duration_hours": "Session_Duration (hours)",
+    "calories_burned": "Calories_Burned",
+    "fat_percentage": "Fat_Percentage",
+    "water_intake_liters": "Water_Intake (liters)",
+    "workout_frequency_days_per_week": "Workout_Frequency (days/week)",
+    "bmi": "BMI",
+}
+
+# Constraints of utilisateur and session_sport, checked on the raw rows
+# (a mean of in-range values stays in range), plus the key parts the ETL needs
+FITNESS_RULES = RuleSet(
+    [
+        *USER_RULES,
+        Rule("nn_user_gender", "gender", nullable=False),
+        Rule("nn_user_height", "height_m", nullable=False),
+        *SESSION_RULES,
+    ],
+    DB_COLS,
+)
+
+# Fixed histogram ranges for profiling: the rule bounds, or a plausible range when open-ended
+PROFILE_HISTOGRAMS = {
+    "Age": (10, 100),
+    "Weight (kg)": (30, 250),
+    "Height (m)": (1.0, 2.5),
+    "Max_BPM": (40, 220),
+    "Avg_BPM": (40, 220),
+    "Resting_BPM": (30, 150),
+    "Session_Duration (hours)": (0, 4),
+    "Calories_Burned": (0, 3000),
+    "Fat_Percentage": (0, 70),
+    "Water_Intake (liters)": (0, 6),
+    "Workout_Frequency (days/week)": (0, 7),
+    "BMI": (10, 60),
+}
+
+DEDUPE_COLS = [
+    "Age",
+    "Gender",
+    "Height (m)",
+    "Experience_Level",
+    "Workout_Type",
+    "Session_Duration (hours)",
+    "Calories_Burned",
+]
+
 # Helpers
 # ---------------------------
 def _to_num(series: pd.Series) -> pd.Series:
@@ -39,23 +155,17 @@ def _to_num(series: pd.Series) -> pd.Series:
 def _clean_str(series: pd.Series) -> pd.Series:
     """
     Normalize string-like columns:
-    - cast to string
+    - cast to string (categories only for categorical columns)
     - strip
     - replace empty / 'nan' / 'none' with NaN
     """
-    s = series.astype(str).str.strip()
-    s = s.replace(
-        {
-            "": pd.NA,
-            "nan": pd.NA,
-            "NaN": pd.NA,
-            "None": pd.NA,
-            "none": pd.NA,
-            "NULL": pd.NA,
-            "null": pd.NA,
-        }
-    )
-    return s
+    return clean_str(series)
+
+
+def _fill_unknown(series: pd.Series) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype) and "UNKNOWN" not in series.cat.categories:
+        series = series.cat.add_categories("UNKNOWN")
+    return series.fillna("UNKNOWN")
 
 
 def _mean_or_none(g: pd.DataFrame, col: str) -> Optional[float]:
@@ -70,197 +180,674 @@ def _mode_or_none(g: pd.DataFrame, col: str) -> Optional[str]:
     return None if vc.empty else str(vc.index[0])
 
 
-def run_fitness_ingest() -> None:
-    path = os.getenv("FITNESS_CSV", "/app/data/raw/fitness_tracker.csv")
-    import_date = date.today()
+# Partial aggregates: additive per user key, so chunks can be merged later
+_MEAN_COLS = {
+    "weight_kg": "Weight (kg)",
+    "avg_bpm": "Avg_BPM",
+    "resting_bpm": "Resting_BPM",
+    "fat_percentage": "Fat_Percentage",
+    "bmi": "BMI",
+}
+_SUM_COLS = {
+    "session_duration_hours": "Session_Duration (hours)",
+    "calories_burned": "Calories_Burned",
+    "water_intake_liters": "Water_Intake (liters)",
+}
+_MAX_COLS = {"max_bpm": "Max_BPM"}
+
+
+@dataclass
+class _SessionPartials:
+    """Mergeable per-user state: sums/counts/max + value counts for the modes."""
+
+    stats: pd.DataFrame
+    workout_counts: pd.DataFrame
+    freq_counts: pd.DataFrame
+
+    def merge(self, other: "_SessionPartials") -> "_SessionPartials":
+        stats = pd.concat([self.stats, other.stats], ignore_index=True)
+        how = {c: ("max" if c in _MAX_COLS else "sum") for c in stats.columns if c not in USER_KEY_COLS}
+        return _SessionPartials(
+            stats=stats.groupby(USER_KEY_COLS, sort=False, observed=True).agg(how).reset_index(),
+            workout_counts=_merge_counts(self.workout_counts, other.workout_counts),
+            freq_counts=_merge_counts(self.freq_counts, other.freq_counts),
+        )
 
-    db: Session = SessionLocal()
-    run = start_run(db, "fitness_ingest")
 
-    rows_read = 0
-    rows_inserted = 0
-    rows_rejected = 0
-    missing_values = 0
-    duplicates = 0
+def _mode_counts(df: pd.DataFrame, values: pd.Series) -> pd.DataFrame:
+    """Occurrences of each non-null value per user key: keys + "mode" + "n"."""
+    return (
+        df[USER_KEY_COLS]
+        .assign(mode=values)
+        .dropna(subset=["mode"])
+        .groupby(USER_KEY_COLS + ["mode"], sort=False, observed=True)
+        .size()
+        .reset_index(name="n")
+    )
 
-    try:
-        df = pd.read_csv(path)
-        rows_read = len(df)
-
-        vr = validate_columns(list(df.columns), REQUIRED_COLS)
-        if not vr.ok:
-            raise ValueError(f"Missing columns in fitness CSV: {vr.missing_columns}")
-
-        df["Gender"] = _clean_str(df["Gender"])
-        df["Workout_Type"] = _clean_str(df["Workout_Type"])
-        df["Experience_Level"] = _clean_str(df["Experience_Level"])
-
-        # If missing, use "UNKNOWN"
-        df["Experience_Level"] = df["Experience_Level"].fillna("UNKNOWN")
-
-        df["Age"] = _to_num(df["Age"])
-        df["Weight (kg)"] = _to_num(df["Weight (kg)"])
-        df["Height (m)"] = _to_num(df["Height (m)"])
-        df["Max_BPM"] = _to_num(df["Max_BPM"])
-        df["Avg_BPM"] = _to_num(df["Avg_BPM"])
-        df["Resting_BPM"] = _to_num(df["Resting_BPM"])
-        df["Session_Duration (hours)"] = _to_num(df["Session_Duration (hours)"])
-        df["Calories_Burned"] = _to_num(df["Calories_Burned"])
-        df["Fat_Percentage"] = _to_num(df["Fat_Percentage"])
-        df["Water_Intake (liters)"] = _to_num(df["Water_Intake (liters)"])
-        df["Workout_Frequency (days/week)"] = _to_num(df["Workout_Frequency (days/week)"])
-        df["BMI"] = _to_num(df["BMI"])
-
-        #  Fix incoherent values
-        # If duration > 15 minutes (0.25h) AND calories == 0, treat calories as missing (NULL)
-        bad_cal = (df["Session_Duration (hours)"] > 0.25) & (df["Calories_Burned"] == 0)
-        df.loc[bad_cal, "Calories_Burned"] = pd.NA
-
-        missing_values = int(df.isna().sum().sum())
 
-        before = len(df)
-        df = df.drop_duplicates(
-            subset=[
-                "Age",
-                "Gender",
-                "Height (m)",
-                "Experience_Level",
-                "Workout_Type",
-                "Session_Duration (hours)",
-                "Calories_Burned",
-            ]
+def _merge_counts(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    # sort=False keeps first-seen order, which decides ties in _pick_mode
+    return (
+        pd.concat([a, b], ignore_index=True)
+        .groupby(USER_KEY_COLS + ["mode"], sort=False, observed=True)["n"]
+        .sum()
+        .reset_index()
+    )
+
+
+def _pick_mode(counts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Most frequent value per user key, for all keys at once.
+    Ties keep the value seen first (same as value_counts()).
+    """
+    counts = counts.sort_values("n", ascending=False, kind="stable")
+    return counts.drop_duplicates(subset=USER_KEY_COLS)[USER_KEY_COLS + ["mode"]]
+
+
+def _partial_sessions(df_valid: pd.DataFrame) -> _SessionPartials:
+    """Partial aggregates of one chunk of valid rows, in a single groupby pass."""
+    # Safety: a user needs a gender (NOT NULL in utilisateur)
+    df_valid = df_valid[df_valid["Gender"].notna()]
+
+    spec = {}
+    for out, col in _MEAN_COLS.items():
+        spec[f"{out}_sum"] = (col, "sum")
+        spec[f"{out}_n"] = (col, "count")
+    for out, col in _SUM_COLS.items():
+        spec[out] = (col, "sum")
+    for out, col in _MAX_COLS.items():
+        spec[out] = (col, "max")
+
+    stats = df_valid.groupby(USER_KEY_COLS, sort=False, observed=True).agg(**spec).reset_index()
+
+    return _SessionPartials(
+        stats=stats,
+        workout_counts=_mode_counts(df_valid, df_valid["Workout_Type"]),
+        freq_counts=_mode_counts(df_valid, df_valid["Workout_Frequency (days/week)"].round()),
+    )
+
+
+def _finalize_sessions(partials: _SessionPartials) -> pd.DataFrame:
+    """
+    One session row per user natural key.
+    Output columns: USER_KEY_COLS + SESSION_COLUMNS.
+    """
+    stats = partials.stats
+    sessions = stats[USER_KEY_COLS].copy()
+    for out in _MEAN_COLS:
+        sessions[out] = stats[f"{out}_sum"] / stats[f"{out}_n"].where(stats[f"{out}_n"] > 0)
+    for out in (*_SUM_COLS, *_MAX_COLS):
+        sessions[out] = stats[out]
+
+    workout_mode = _pick_mode(partials.workout_counts).rename(columns={"mode": "workout_type"})
+    freq_mode = _pick_mode(partials.freq_counts).rename(columns={"mode": "workout_frequency_days_per_week"})
+    sessions = sessions.merge(workout_mode, on=USER_KEY_COLS, how="left")
+    sessions = sessions.merge(freq_mode, on=USER_KEY_COLS, how="left")
+
+    # Integer columns: truncate like int() did, keep missing values
+    for col in ("max_bpm", "avg_bpm", "resting_bpm", "workout_frequency_days_per_week"):
+        sessions[col] = np.trunc(sessions[col].astype("float64")).astype("Int64")
+
+    return sessions[USER_KEY_COLS + SESSION_COLUMNS]
+
+
+def _aggregate_sessions(df_valid: pd.DataFrame) -> pd.DataFrame:
+    """One session row per user natural key (whole frame in one go)."""
+    return _finalize_sessions(_partial_sessions(df_valid))
+
+
+def _check_columns(df: pd.DataFrame) -> None:
+    vr = validate_columns(list(df.columns), REQUIRED_COLS)
+    if not vr.ok:
+        raise ValueError(f"Missing columns in fitness CSV: {vr.missing_columns}")
+
+
+def _normalize_user_key(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Age and height as utilisateur stores them (integer age, height to the
+    centimetre), so one group of USER_KEY_COLS is always one database user.
+    """
+    df["Age"] = np.trunc(df["Age"])
+    df["Height (m)"] = df["Height (m)"].round(2)
+    return df
+
+
+def _clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Validate columns, normalize strings, coerce numbers and the user key, fix incoherent values."""
+    _check_columns(df)
+
+    for col in FITNESS_SCHEMA.categorical:
+        df[col] = _clean_str(df[col])
+
+    # If missing, use "UNKNOWN"
+    df["Experience_Level"] = _fill_unknown(df["Experience_Level"])
+
+    for col, dtype in FITNESS_SCHEMA.numeric.items():
+        df[col] = _to_num(df[col]).astype(dtype)
+    # Before dedupe and aggregation: rows of one user share the same key values
+    _normalize_user_key(df)
+
+    #  Fix incoherent values
+    # If duration > 15 minutes (0.25h) AND calories == 0, treat calories as missing (NULL)
+    bad_cal = (df["Session_Duration (hours)"] > 0.25) & (df["Calories_Burned"] == 0)
+    df.loc[bad_cal, "Calories_Burned"] = pd.NA
+
+    return df
+
+
+def _user_keys(sessions: pd.DataFrame) -> pd.DataFrame:
+    """Natural key columns of aggregated sessions, named like Utilisateur."""
+    users = sessions[USER_KEY_COLS].set_axis(USER_COLUMNS, axis=1)
+    users["age"] = users["age"].astype("int64")
+    users["gender"] = users["gender"].astype(str).str.strip()
+    users["experience_level"] = users["experience_level"].astype(str).str.strip()
+    return users
+
+
+def _shard_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    User key of raw rows, cleaned like _clean_frame and named like Utilisateur,
+    so rows of one database user share a key hash. Rows without a usable age
+    (rejected by the rules anyway) get -1.
+    """
+    age = _to_num(df["Age"]).astype("float32")
+    keys = pd.DataFrame(
+        {
+            "Age": age.where(np.isfinite(age) & (age.abs() < 1e6), -1),
+            "Gender": _clean_str(df["Gender"]),
+            "Height (m)": _to_num(df["Height (m)"]).astype("float32"),
+            "Experience_Level": _fill_unknown(_clean_str(df["Experience_Level"])),
+        },
+        index=df.index,
+    )
+    return _user_keys(_normalize_user_key(keys))
+
+
+def _load_sessions_batch(db: Session, sessions: pd.DataFrame, import_date: date) -> int:
+    sessions = sessions.assign(id_user=resolve_user_ids(db, _user_keys(sessions)), session_date=import_date)
+    return upsert_rows(
+        db,
+        SessionSport,
+        frame_to_records(sessions, ["id_user", "session_date", *SESSION_COLUMNS]),
+        constraint="uq_user_session_date",
+        update_columns=SESSION_COLUMNS,
+    )
+
+
+_MERGE_USERS_SQL = """
+    INSERT INTO utilisateur (age, gender, height_m, experience_level, user_key_hash)
+    SELECT DISTINCT ON (user_key_hash) age, gender, height_m, experience_level, user_key_hash
+    FROM stg_fitness_session
+    ORDER BY user_key_hash, stg_row
+    ON CONFLICT (user_key_hash) DO NOTHING
+"""
+
+# One staged row per user: the key is normalized in _clean_frame
+_MERGE_SESSIONS_SQL = f"""
+    INSERT INTO session_sport (id_user, session_date, {", ".join(SESSION_COLUMNS)})
+    SELECT
+      u.id_user, :session_date,
+      s.weight_kg, s.max_bpm::int, s.avg_bpm::int, s.resting_bpm::int,
+      s.session_duration_hours, s.calories_burned, s.workout_type,
+      s.fat_percentage, s.water_intake_liters,
+      s.workout_frequency_days_per_week::int, s.bmi
+    FROM stg_fitness_session s
+    JOIN utilisateur u ON u.user_key_hash = s.user_key_hash
+    ON CONFLICT ON CONSTRAINT uq_user_session_date DO UPDATE SET
+      {", ".join(f"{c} = EXCLUDED.{c}" for c in SESSION_COLUMNS)}
+"""
+
+
+def _load_sessions_copy(db: Session, sessions: pd.DataFrame, import_date: date, private: bool = False) -> int:
+    """
+    COPY the session rows into stg_fitness_session, then merge users and sessions in SQL.
+    private: a temporary staging table for this connection (concurrent shard loads).
+    """
+    users = _user_keys(sessions)
+    staged = pd.concat([users, sessions[SESSION_COLUMNS]], axis=1)
+    staged["user_key_hash"] = user_key_hashes(users)
+
+    prepare_staging(db, "stg_fitness_session", private=private)
+    result = copy_frame(db, "stg_fitness_session", staged, [*USER_COLUMNS, "user_key_hash", *SESSION_COLUMNS])
+    print(f"[fitness] {result}")
+
+    merge(db, _MERGE_USERS_SQL)
+    return merge(db, _MERGE_SESSIONS_SQL, session_date=import_date)
+
+
+@dataclass
+class _ChunkState:
+    """Running state of the per-chunk pipeline: one per run, or one per shard."""
+
+    deduper: KeyHashDeduper = field(default_factory=lambda: KeyHashDeduper(DEDUPE_COLS))
+    rules_report: RuleReport = field(default_factory=RuleReport)
+    profiler: FrameProfiler = field(default_factory=lambda: FrameProfiler(REQUIRED_COLS, PROFILE_HISTOGRAMS))
+    partials: Optional[_SessionPartials] = None
+    missing_values: int = 0
+    duplicates: int = 0
+    rows_rejected: int = 0
+    # Partial aggregates of the chunks since the last checkpoint, once track_changes() is called
+    new_partials: Optional[list[_SessionPartials]] = None
+
+    def track_changes(self) -> None:
+        """Keep what the next chunks add, for incremental checkpoints (see checkpoint())."""
+        self.deduper.track_new()
+        self.new_partials = []
+
+    def checkpoint(self) -> tuple[dict, dict[str, pd.DataFrame]]:
+        """
+        What ChunkCheckpoint.save() stores: the counters, rejections per rule and
+        profiles (bounded size) as JSON, and the frames of the chunks since the
+        previous call: keys seen and merged partial aggregates.
+        """
+        state = {
+            "missing_values": self.missing_values,
+            "duplicates": self.duplicates,
+            "rows_rejected": self.rows_rejected,
+            "rules_by_rule": dict(self.rules_report.by_rule),
+            "rules_rows_rejected": self.rules_report.rows_rejected,
+            "profiler": self.profiler.as_state(),
+        }
+        segments = {"seen": pd.DataFrame({"hash": self.deduper.take_new()})}
+        if self.new_partials:
+            new = reduce(_SessionPartials.merge, self.new_partials)
+            segments.update(stats=new.stats, workout_counts=new.workout_counts, freq_counts=new.freq_counts)
+        self.new_partials = []
+        return state, segments
+
+    @classmethod
+    def restore(cls, state: dict, segments: dict[str, list[pd.DataFrame]]) -> _ChunkState:
+        """The state saved by checkpoint() calls, segments in save order."""
+        restored = cls(
+            rules_report=RuleReport(by_rule=Counter(state["rules_by_rule"]), rows_rejected=state["rules_rows_rejected"]),
+            missing_values=state["missing_values"],
+            duplicates=state["duplicates"],
+            rows_rejected=state["rows_rejected"],
         )
+        restored.profiler.restore(state["profiler"])
+        for seen in segments.get("seen", []):
+            restored.deduper.restore(seen["hash"].to_numpy(dtype=np.uint64))
+        parts = [
+            _SessionPartials(stats, workouts, freqs)
+            for stats, workouts, freqs in zip(
+                segments.get("stats", []), segments.get("workout_counts", []), segments.get("freq_counts", [])
+            )
+        ]
+        restored.partials = reduce(_SessionPartials.merge, parts) if parts else None
+        return restored
+
+
+def _consume_chunk(
+    state: _ChunkState,
+    df: pd.DataFrame,
+    stats: ReadStats,
+    metrics: RunMetrics,
+    quarantine: QuarantineWriter,
+    path: Optional[str],
+) -> tuple[int, int]:
+    """
+    Pipeline per clean chunk: dedupe (hashes carried over, across files) -> filter -> partial aggregates.
+    Returns the duplicates and rejected rows of the chunk.
+    """
+    with metrics.stage("profile", len(df)):
+        state.profiler.update(df)
+        state.missing_values += int(df.isna().sum().sum())
+
+    with metrics.stage("dedupe", len(df)) as step:
+        before = len(df)
+        df = state.deduper.drop_duplicates(df)
         duplicates = before - len(df)
+        state.duplicates += duplicates
+        step.rows_out = len(df)
+
+    with metrics.stage("validate", len(df)) as step:
+        df_valid, report = FITNESS_RULES.evaluate(df)
+        state.rules_report.add(report)
+        state.rows_rejected += report.rows_rejected
+        quarantine.add(df.loc[report.reasons.index], report.reasons, stats, source=path)
+        step.rows_out = len(df_valid)
+
+    with metrics.stage("aggregate", len(df_valid)) as step:
+        part = _partial_sessions(df_valid)
+        state.partials = part if state.partials is None else state.partials.merge(part)
+        if state.new_partials is not None:
+            state.new_partials.append(part)
+        step.rows_out = len(part.stats)
+
+    return duplicates, report.rows_rejected
+
+
+def _finalize_and_load(
+    db: Session,
+    state: _ChunkState,
+    import_date: date,
+    load_mode: str,
+    row_errors: str,
+    metrics: RunMetrics,
+    quarantine: QuarantineWriter,
+    private_staging: bool = False,
+) -> int:
+    """
+    One session per user key, upserted (a rerun the same day updates instead of failing).
+    Sessions refused by the database (ETL_ROW_ERRORS=bisect) are quarantined without
+    a source line, each counted as one rejected row; the others are loaded.
+    """
+    partials = state.partials
+    if partials is None:
+        partials = _partial_sessions(pd.DataFrame(columns=REQUIRED_COLS))
+
+    with metrics.stage("finalize") as step:
+        sessions = _finalize_sessions(partials)
+        step.rows_out = len(sessions)
+
+    def reject(rows: pd.DataFrame, reason: str, message: str) -> None:
+        state.rows_rejected += len(rows)
+        state.rules_report.by_rule[reason] += len(rows)
+        quarantine.add(rows, pd.Series(reason, index=rows.index), None, message=message)
+
+    if load_mode == "copy":
+        load = partial(_load_sessions_copy, db, import_date=import_date, private=private_staging)
+    else:
+        load = partial(_load_sessions_batch, db, import_date=import_date)
+    with metrics.stage("load", len(sessions)) as step:
+        inserted = load_rows(db, sessions, load, reject, row_errors)
+        step.rows_out = inserted
+    return inserted
+
+
+@dataclass
+class _ShardResult:
+    """What a shard worker sends back: its totals, profiles and stage metrics."""
+
+    rules_report: RuleReport
+    profiler: FrameProfiler
+    missing_values: int
+    duplicates: int
+    rows_rejected: int
+    sessions_loaded: int
+    metrics: list[StageMetrics]
+
+
+def _ingest_shard(path: str, id_run: int, import_date: date, load_mode: str, row_errors: str) -> _ShardResult:
+    """
+    One shard of a sharded ingest, in its own process and over its own connection:
+    clean -> per-chunk pipeline -> finalize -> load, committed on its own.
+    Row labels already are file lines (see _ingest_sharded).
+    """
+    metrics = RunMetrics("fitness_ingest")
+    state = _ChunkState()
+    stats = ReadStats(first_line=0)
+    db: Session = load_session(SessionLocal)
+    try:
+        with QuarantineWriter(id_run) as quarantine:
+            for df in metrics.iter("shard_read", iter_spill(path)):
+                with metrics.stage("clean", len(df)):
+                    df = _clean_frame(df)
+                _consume_chunk(state, df, stats, metrics, quarantine, None)
+
+            loaded = _finalize_and_load(db, state, import_date, load_mode, row_errors, metrics, quarantine, private_staging=True)
+        with metrics.stage("commit"):
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    state.rules_report.reasons = state.rules_report.reasons.iloc[:0]
+    return _ShardResult(
+        rules_report=state.rules_report,
+        profiler=state.profiler,
+        missing_values=state.missing_values,
+        duplicates=state.duplicates,
+        rows_rejected=state.rows_rejected,
+        sessions_loaded=loaded,
+        metrics=list(metrics.stages.values()),
+    )
 
-        df_valid = df[
-            df["Age"].between(10, 100, inclusive="both")
-            & df["Height (m)"].between(1.0, 2.5, inclusive="both")
-        ].copy()
 
-        rows_rejected = len(df) - len(df_valid)
+def _ingest_sharded(
+    db: Session,
+    id_run: int,
+    plan: IngestPlan,
+    stats: ReadStats,
+    n_shards: int,
+    import_date: date,
+    load_mode: str,
+    row_errors: str,
+    metrics: RunMetrics,
+) -> list[_ShardResult]:
+    """
+    Read the file here and route every row to a shard by its user key; the
+    shards then clean, dedupe, aggregate and load in parallel. A user's rows
+    (hence its duplicates and its session) all land in one shard, so the
+    shards never touch the same rows. Each shard commits its own load: if one
+    fails, the run fails and the next run reloads the file (upserts, same result).
+    """
+    # Shards find the user key hashes up to date (see run_fitness_ingest) and the staging table created
+    if load_mode == "copy":
+        create_staging(db, "stg_fitness_session")
+    db.commit()
+
+    with ShardSpill(n_shards) as spill:
+        for df in metrics.iter("read", plan.frames(FITNESS_SCHEMA, get_chunk_size(), stats)):
+            with metrics.stage("shard", len(df)):
+                _check_columns(df)
+                # Labels become file lines: shards quarantine rows without the read stats
+                df.index = stats.line_numbers(df.index)
+                spill.add(df, shard_ids(user_key_hashes(_shard_keys(df)), n_shards))
+        spill.close()
+
+        results = run_stages(
+            [
+                (f"fitness_shard_{i}", partial(_ingest_shard, path, id_run, import_date, load_mode, row_errors))
+                for i, path in enumerate(spill.paths)
+            ],
+            workers=n_shards,
+        )
+    return [r.value for r in results]
 
 
-        groups = df_valid.groupby(
-            ["Age", "Gender", "Height (m)", "Experience_Level"],
-            dropna=False,
-        )
+def _same_day_plans(plans: list[IngestPlan], import_date: date) -> list[IngestPlan]:
+    """
+    Sessions are upserted per user and day from the rows of the run: a tail or
+    a new file read alone would overwrite the day's sessions with partial
+    aggregates. When anything is read, every file already loaded today is read
+    again from the first byte read today, so the day's sessions aggregate all
+    of the day's rows, and only those (rows of earlier days are not re-read).
+    """
+    if all(p.mode == "skip" for p in plans):
+        return plans
+    return [p.from_day_start() if p.previous_date == import_date else p for p in plans]
+
+
+def _finish_skipped(db: Session, run, plans: list[IngestPlan], import_date: date, lock_wait_seconds: float) -> None:
+    """Unchanged sources: nothing is read, the run is still recorded."""
+    for plan in plans:
+        record_ingest(db, plan, run, 0, import_date)
+    save_file_outcomes(db, run.id_run, [FileOutcome(p.path, "SKIPPED", p.mode) for p in plans])
+    db.commit()
+    finish_run(
+        db,
+        run,
+        status="SKIPPED",
+        rows_read=0,
+        rows_inserted=0,
+        rows_rejected=0,
+        missing_values_count=0,
+        duplicates_count=0,
+        ingest_mode="skip",
+        lock_wait_seconds=lock_wait_seconds,
+    )
+    for plan in plans:
+        print(f"[fitness] SKIPPED {plan.path} unchanged since run {plan.previous.id_run}")
 
-        inserted_sessions = 0
-
-        for (age, gender, height, exp), g in groups:
-            age_i = int(age) if pd.notna(age) else None
-            gender_s = str(gender).strip() if pd.notna(gender) else None
-            height_f = float(height) if pd.notna(height) else None
-            exp_s = str(exp).strip() if pd.notna(exp) and str(exp).strip() else "UNKNOWN"
-
-            # Safety: should not happen due to df_valid, but keep robust
-            if age_i is None or gender_s is None or height_f is None:
-                continue
-
-            user_id = db.execute(
-                select(Utilisateur.id_user).where(
-                    Utilisateur.age == age_i,
-                    Utilisateur.gender == gender_s,
-                    Utilisateur.height_m == height_f,
-                    Utilisateur.experience_level == exp_s,
-                )
-            ).scalar_one_or_none()
-
-            if user_id is None:
-                user = Utilisateur(
-                    age=age_i,
-                    gender=gender_s,
-                    height_m=height_f,
-                    experience_level=exp_s,
-                )
-                db.add(user)
-                db.flush()
-                user_id = user.id_user
-
-            calories_sum = g["Calories_Burned"].sum(skipna=True)
-            calories_sum = None if pd.isna(calories_sum) else float(calories_sum)
-
-            duration_sum = g["Session_Duration (hours)"].sum(skipna=True)
-            duration_sum = None if pd.isna(duration_sum) else float(duration_sum)
-
-            water_sum = g["Water_Intake (liters)"].sum(skipna=True)
-            water_sum = None if pd.isna(water_sum) else float(water_sum)
-
-            workout_mode = _mode_or_none(g, "Workout_Type")
-
-            freq_mode = None
-            if "Workout_Frequency (days/week)" in g.columns:
-                vc2 = g["Workout_Frequency (days/week)"].dropna()
-                if not vc2.empty:
-                    vc2_int = vc2.round().astype(int).value_counts()
-                    freq_mode = None if vc2_int.empty else int(vc2_int.index[0])
-
-            session = SessionSport(
-                id_user=user_id,
-                session_date=import_date,
-                weight_kg=_mean_or_none(g, "Weight (kg)"),
-                max_bpm=int(g["Max_BPM"].max(skipna=True)) if g["Max_BPM"].notna().any() else None,
-                avg_bpm=int(_mean_or_none(g, "Avg_BPM")) if _mean_or_none(g, "Avg_BPM") is not None else None,
-                resting_bpm=int(_mean_or_none(g, "Resting_BPM")) if _mean_or_none(g, "Resting_BPM") is not None else None,
-                session_duration_hours=duration_sum,
-                calories_burned=calories_sum,
-                workout_type=workout_mode,
-                fat_percentage=_mean_or_none(g, "Fat_Percentage"),
-                water_intake_liters=water_sum,
-                workout_frequency_days_per_week=freq_mode,
-                bmi=_mean_or_none(g, "BMI"),
-            )
 
-            # Upsert behavior: rerun same day updates instead of failing
-            existing_id = db.execute(
-                select(SessionSport.id_session).where(
-                    SessionSport.id_user == user_id,
-                    SessionSport.session_date == import_date,
-                )
-            ).scalar_one_or_none()
+def run_fitness_ingest() -> None:
+    # One file, a directory of daily partitions or a glob
+    source = os.getenv("FITNESS_CSV", DEFAULT_SOURCE)
+    import_date = date.today()
 
-            if existing_id is None:
-                db.add(session)
-            else:
-                db.query(SessionSport).filter(
-                    SessionSport.id_user == user_id,
-                    SessionSport.session_date == import_date,
-                ).update(
-                    {
-                        "weight_kg": session.weight_kg,
-                        "max_bpm": session.max_bpm,
-                        "avg_bpm": session.avg_bpm,
-                        "resting_bpm": session.resting_bpm,
-                        "session_duration_hours": session.session_duration_hours,
-                        "calories_burned": session.calories_burned,
-                        "workout_type": session.workout_type,
-                        "fat_percentage": session.fat_percentage,
-                        "water_intake_liters": session.water_intake_liters,
-                        "workout_frequency_days_per_week": session.workout_frequency_days_per_week,
-                        "bmi": session.bmi,
-                    }
-                )
-
-            inserted_sessions += 1
+    db: Session = load_session(SessionLocal)
+    run = start_run(db, "fitness_ingest")
+    id_run = run.id_run
+    quarantine = QuarantineWriter(run.id_run)
+    metrics = RunMetrics("fitness_ingest")
+    # Sessions are upserted per user and day: one writer at a time, exports wait for it
+    locks = DatasetLocks("fitness_ingest", exclusive=["fitness"])
+
+    rows_read = 0
+    rows_inserted = 0
+    state = _ChunkState()
+    checkpoint: Optional[ChunkCheckpoint] = None
+
+    try:
+        locks.acquire()
+        load_mode = get_load_mode()
+        row_errors = get_row_error_policy()
+
+        paths = list_sources(source)
+        if not paths:
+            raise FileNotFoundError(f"No fitness source matches {source}")
 
+        plans = _same_day_plans([plan_ingest(db, "fitness_ingest", path) for path in paths], import_date)
+
+        to_read = [p for p in plans if p.mode != "skip"]
+        if not to_read:
+            _finish_skipped(db, run, plans, import_date, locks.waited)
+            return
+
+        # Users created or edited through the API get their key hash once per run:
+        # the loads (every bisect split, every shard) then only look up their own keys
+        load_user_key_map(db)
         db.commit()
+
+        outcomes = [FileOutcome(p.path, "SKIPPED", p.mode) for p in plans if p.mode == "skip"]
+        # Plans to record in the registry with their rows read (failed files stay out: read again next run)
+        loaded = [(p, 0) for p in plans if p.mode == "skip"]
+
+        def consume(df: pd.DataFrame, stats: ReadStats, outcome: FileOutcome, path: Optional[str]) -> None:
+            duplicates, rejected = _consume_chunk(state, df, stats, metrics, quarantine, path)
+            outcome.duplicates_count += duplicates
+            outcome.rows_rejected += rejected
+
+        def close_file(plan: IngestPlan, stats: ReadStats, outcome: FileOutcome, path: Optional[str]) -> None:
+            # Malformed lines skipped by the parser
+            nonlocal rows_read
+            rows_read += stats.rows_read
+            state.rows_rejected += stats.rows_malformed
+            state.rules_report.by_rule["malformed_line"] += stats.rows_malformed
+            quarantine.add_bad_lines(stats.bad_lines, source=path)
+            outcome.rows_read = stats.rows_read
+            outcome.rows_rejected += stats.rows_malformed
+            outcomes.append(outcome)
+            loaded.append((plan, stats.rows_read))
+
+        n_shards = get_shards()
+        if len(plans) == 1 and n_shards > 1:
+            # Single large file: cleaned, aggregated and loaded by FITNESS_SHARDS processes
+            plan = to_read[0]
+            outcome = FileOutcome(plan.path, "SUCCESS", plan.mode)
+            started = time.perf_counter()
+            stats = ReadStats(line_offset=plan.line_offset, first_line=plan.first_line)
+            inserted_sessions = 0
+            for shard in _ingest_sharded(db, run.id_run, plan, stats, n_shards, import_date, load_mode, row_errors, metrics):
+                state.rules_report.add(shard.rules_report)
+                state.profiler.merge(shard.profiler)
+                state.missing_values += shard.missing_values
+                state.duplicates += shard.duplicates
+                state.rows_rejected += shard.rows_rejected
+                outcome.duplicates_count += shard.duplicates
+                outcome.rows_rejected += shard.rows_rejected
+                inserted_sessions += shard.sessions_loaded
+                for m in shard.metrics:
+                    metrics.add(m)
+            outcome.seconds = time.perf_counter() - started
+            close_file(plan, stats, outcome, None)
+        else:
+            if len(plans) == 1:
+                # Single file: streamed chunk by chunk, only the planned byte range is read
+                plan = to_read[0]
+                outcome = FileOutcome(plan.path, "SUCCESS", plan.mode)
+                started = time.perf_counter()
+                stats = ReadStats(line_offset=plan.line_offset, first_line=plan.first_line)
+                chunk_size = get_chunk_size()
+                # State committed every INGEST_CHECKPOINT_SECONDS: a run restarted after a crash
+                # picks it up and only parses the chunks already done (read counters, bad lines)
+                checkpoint = ChunkCheckpoint(db, plan, chunk_size, run.id_run)
+                chunks_done = rows_done = 0
+                resumed = checkpoint.resume(quarantine)
+                if resumed is not None:
+                    chunks_done, saved, segments = resumed
+                    state = _ChunkState.restore(saved, segments)
+                    outcome.duplicates_count = state.duplicates
+                    outcome.rows_rejected = state.rows_rejected
+                if checkpoint.enabled:
+                    state.track_changes()
+                for i, df in enumerate(metrics.iter("read", plan.frames(FITNESS_SCHEMA, chunk_size, stats))):
+                    rows_done += len(df)
+                    if i < chunks_done:
+                        continue
+                    with metrics.stage("clean", len(df)):
+                        df = _clean_frame(df)
+                    consume(df, stats, outcome, None)
+                    if checkpoint.due():
+                        with metrics.stage("checkpoint"):
+                            checkpoint.save(i + 1, rows_done, *state.checkpoint(), quarantine)
+                outcome.seconds = time.perf_counter() - started
+                close_file(plan, stats, outcome, None)
+            else:
+                # Several files: parsed and cleaned in worker processes, merged here in file order
+                for plan, part in zip(to_read, read_partitions(to_read, _clean_frame, FITNESS_SCHEMA)):
+                    for m in part.metrics:
+                        metrics.add(m)
+                    if part.error is not None:
+                        outcomes.append(FileOutcome(plan.path, "FAILED", plan.mode, seconds=part.seconds, error_message=part.error))
+                        print(f"[fitness] FAILED {plan.path}: {part.error}")
+                        continue
+                    outcome = FileOutcome(plan.path, "SUCCESS", plan.mode, seconds=part.seconds)
+                    for df in part.frames():
+                        consume(df, part.stats, outcome, plan.path)
+                    close_file(plan, part.stats, outcome, plan.path)
+                failed = [o for o in outcomes if o.status == "FAILED"]
+                if len(failed) == len(plans):
+                    raise RuntimeError(f"All {len(plans)} fitness files failed, first error: {failed[0].error_message}")
+
+            inserted_sessions = _finalize_and_load(db, state, import_date, load_mode, row_errors, metrics, quarantine)
+
+        with metrics.stage("commit"):
+            for plan, n_rows in loaded:
+                record_ingest(db, plan, run, n_rows, import_date)
+            if checkpoint is not None:
+                checkpoint.clear()
+            save_file_outcomes(db, run.id_run, outcomes)
+            save_profiles(db, run.id_run, state.profiler)
+            metrics.save(db, run.id_run)
+            db.commit()
         rows_inserted = inserted_sessions
+        status, ingest_mode = run_outcome(outcomes, plans)
 
         finish_run(
             db,
             run,
-            status="SUCCESS",
+            status=status,
             rows_read=rows_read,
             rows_inserted=rows_inserted,
-            rows_rejected=rows_rejected,
-            missing_values_count=missing_values,
-            duplicates_count=duplicates,
+            rows_rejected=state.rows_rejected,
+            missing_values_count=state.missing_values,
+            duplicates_count=state.duplicates,
+            ingest_mode=ingest_mode,
+            rejections_by_rule=state.rules_report.as_dict(),
+            lock_wait_seconds=locks.waited,
         )
 
+        files_ok = sum(o.status == "SUCCESS" for o in outcomes)
         print(
-            f"[fitness] OK rows_read={rows_read} inserted_sessions={rows_inserted} "
-            f"rejected={rows_rejected}"
+            f"[fitness] {'OK' if status == 'SUCCESS' else status} mode={ingest_mode} files={files_ok}/{len(to_read)} "
+            f"rows_read={rows_read} inserted_sessions={rows_inserted} rejected={state.rows_rejected}"
         )
+        print(metrics.summary())
 
     except Exception as e:
         db.rollback()
@@ -270,11 +857,20 @@ def run_fitness_ingest() -> None:
             status="FAILED",
             rows_read=rows_read,
             rows_inserted=rows_inserted,
-            rows_rejected=rows_rejected,
-            missing_values_count=missing_values,
-            duplicates_count=duplicates,
+            rows_rejected=state.rows_rejected,
+            missing_values_count=state.missing_values,
+            duplicates_count=state.duplicates,
             error_message=str(e),
+            lock_wait_seconds=locks.waited,
         )
+        print(metrics.summary())
         raise
     finally:
-        db.close()
\ No newline at end of file
+        locks.release()
+        quarantine.close()
+        db.close()
+
+    try:
+        metrics.write_textfile(id_run)
+    except OSError as e:  # the run is committed: missing gauges must not fail it
+        print(f"[fitness] metrics textfile not written: {e}")
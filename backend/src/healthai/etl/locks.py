@@ -0,0 +1,115 @@
+from __future__ import annotations
+import hashlib
+import os
+import time
+from typing import Iterable, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from healthai.db import engine
+
+# Datasets guarded by the locks: tables written together by one stage
+# - nutrition : aliment, nutrition_log
+# - fitness   : utilisateur, session_sport
+DATASETS = ("nutrition", "fitness")
+
+_LOCK_NOT_AVAILABLE = "55P03"
+
+
+def get_lock_wait() -> float:
+    """ETL_LOCK_WAIT_SECONDS a stage queues behind a conflicting run (default 600); 0 fails at once."""
+    return float(os.getenv("ETL_LOCK_WAIT_SECONDS", "600") or 0)
+
+
+def lock_key(dataset: str) -> int:
+    """Stable signed 64-bit advisory lock key of a dataset (same on every host and release)."""
+    digest = hashlib.sha256(f"healthai.etl:{dataset}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class LockTimeout(TimeoutError):
+    """A conflicting run held a dataset longer than the allowed wait (a TimeoutError: the DAG retries it)."""
+
+
+class DatasetLocks:
+    """
+    PostgreSQL session advisory locks held by one stage for its whole run, on a
+    dedicated autocommit connection, so they outlive the stage's own commits
+    and are released by the server if the process dies:
+    - exclusive: datasets the stage writes (one writer, no reader)
+    - shared: datasets the stage only reads (readers run together)
+    Locks are taken in key order, so two stages never deadlock on each other.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        *,
+        exclusive: Iterable[str] = (),
+        shared: Iterable[str] = (),
+        wait_seconds: Optional[float] = None,
+    ):
+        unknown = sorted({*exclusive, *shared} - set(DATASETS))
+        if unknown:
+            raise ValueError(f"Unknown datasets: {unknown} (known: {', '.join(DATASETS)})")
+        self.stage = stage
+        self.modes = {name: "shared" for name in shared}
+        self.modes.update({name: "exclusive" for name in exclusive})
+        self.wait_seconds = get_lock_wait() if wait_seconds is None else wait_seconds
+        self.waited = 0.0
+        self._conn: Optional[Connection] = None
+
+    def __enter__(self) -> DatasetLocks:
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def _lock(self, conn: Connection, dataset: str, mode: str, wait: bool) -> bool:
+        suffix = "_shared" if mode == "shared" else ""
+        if not wait:
+            return bool(conn.execute(text(f"SELECT pg_try_advisory_lock{suffix}(:k)"), {"k": lock_key(dataset)}).scalar())
+        conn.execute(text(f"SELECT pg_advisory_lock{suffix}(:k)"), {"k": lock_key(dataset)})
+        return True
+
+    def acquire(self) -> float:
+        """Take every lock, queueing up to wait_seconds in total; returns the seconds waited."""
+        conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        self._conn = conn
+        started = time.perf_counter()
+        try:
+            for dataset in sorted(self.modes, key=lock_key):
+                mode = self.modes[dataset]
+                if self._lock(conn, dataset, mode, wait=False):
+                    continue
+                left = self.wait_seconds - (time.perf_counter() - started)
+                if left <= 0:
+                    raise LockTimeout(f"{self.stage}: {dataset} is locked by another run")
+                print(f"[locks] {self.stage} waiting for {dataset} ({mode}), up to {left:.0f}s")
+                conn.execute(text(f"SET lock_timeout = '{int(left * 1000)}ms'"))
+                try:
+                    self._lock(conn, dataset, mode, wait=True)
+                except OperationalError as e:
+                    if getattr(e.orig, "pgcode", None) != _LOCK_NOT_AVAILABLE:
+                        raise
+                    raise LockTimeout(
+                        f"{self.stage}: {dataset} still locked by another run after {self.wait_seconds:.0f}s"
+                    ) from None
+        except BaseException:
+            self.release()
+            raise
+        finally:
+            self.waited = time.perf_counter() - started
+        return self.waited
+
+    def release(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            # The connection goes back to the pool: drop its locks and settings first
+            conn.execute(text("SELECT pg_advisory_unlock_all()"))
+            conn.execute(text("RESET lock_timeout"))
+        finally:
+            conn.close()
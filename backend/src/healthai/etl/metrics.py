@@ -0,0 +1,177 @@
+from __future__ import annotations
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from healthai.models.qualite_metrique import QualiteEtapeMetrique
+
+# Prometheus textfile collector directory (node_exporter --collector.textfile.directory)
+METRICS_DIR = os.getenv("METRICS_DIR", "/app/data/metrics")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (Linux /proc), 0 when unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _max_rss_bytes() -> int:
+    """High-water mark of the process RSS (ru_maxrss is in KiB on Linux, bytes on macOS)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+@dataclass
+class StageMetrics:
+    """Totals of one stage over all its calls (one call per chunk)."""
+
+    stage: str
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    peak_rss_bytes: int = 0
+
+
+class _Call:
+    """Handle yielded by RunMetrics.stage(): set rows_out before leaving the block."""
+
+    def __init__(self, rows_in: int):
+        self.rows_in = rows_in
+        self.rows_out = rows_in
+
+
+class RunMetrics:
+    """
+    Wall time, CPU time (whole process), rows in/out and peak RSS per stage of a run.
+    Peak RSS is sampled at the stage boundaries; a stage that raises the
+    process high-water mark gets that mark.
+    """
+
+    def __init__(self, pipeline_name: str):
+        self.pipeline_name = pipeline_name
+        self.stages: dict[str, StageMetrics] = {}
+
+    def _record(self, stage: str, wall: float, cpu: float, rows_in: int, rows_out: int, peak: int) -> None:
+        m = self.stages.setdefault(stage, StageMetrics(stage))
+        m.calls += 1
+        m.wall_seconds += wall
+        m.cpu_seconds += cpu
+        m.rows_in += rows_in
+        m.rows_out += rows_out
+        m.peak_rss_bytes = max(m.peak_rss_bytes, peak)
+
+    @contextmanager
+    def stage(self, stage: str, rows_in: int = 0) -> Iterator[_Call]:
+        call = _Call(rows_in)
+        rss_before, maxrss_before = _rss_bytes(), _max_rss_bytes()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield call
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            maxrss_after = _max_rss_bytes()
+            peak = max(rss_before, _rss_bytes())
+            if maxrss_after > maxrss_before:
+                peak = max(peak, maxrss_after)
+            self._record(stage, wall, cpu, call.rows_in, call.rows_out, peak)
+
+    def iter(self, stage: str, frames: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Time spent waiting for each frame of `frames` (e.g. the CSV reader)."""
+        it = iter(frames)
+        while True:
+            with self.stage(stage) as call:
+                try:
+                    df = next(it)
+                except StopIteration:
+                    call.rows_out = 0
+                    return
+                call.rows_out = len(df)
+            yield df
+
+    def add(self, metrics: StageMetrics) -> None:
+        """Stage measured elsewhere (e.g. in a worker process)."""
+        self._record(
+            metrics.stage,
+            metrics.wall_seconds,
+            metrics.cpu_seconds,
+            metrics.rows_in,
+            metrics.rows_out,
+            metrics.peak_rss_bytes,
+        )
+
+    def summary(self) -> str:
+        """One line per stage, slowest first, for the run log."""
+        total = sum(m.wall_seconds for m in self.stages.values()) or 1.0
+        width = max((len(m.stage) for m in self.stages.values()), default=0)
+        lines = [f"[{self.pipeline_name}] stages (wall {total:.3f}s):"]
+        for m in sorted(self.stages.values(), key=lambda m: m.wall_seconds, reverse=True):
+            lines.append(
+                f"[{self.pipeline_name}]   {m.stage:<{width}} {m.wall_seconds:8.3f}s ({m.wall_seconds / total:5.1%})"
+                f" cpu={m.cpu_seconds:.3f}s rows={m.rows_in}->{m.rows_out} calls={m.calls}"
+                f" peak_rss={m.peak_rss_bytes / 2**20:.0f}MiB"
+            )
+        return "\n".join(lines)
+
+    def save(self, db: Session, id_run: int) -> None:
+        """One qualite_etape_metrique row per stage, in the caller's transaction."""
+        records = [
+            {
+                "id_run": id_run,
+                "stage": m.stage,
+                "calls": m.calls,
+                "wall_seconds": m.wall_seconds,
+                "cpu_seconds": m.cpu_seconds,
+                "rows_in": m.rows_in,
+                "rows_out": m.rows_out,
+                "peak_rss_bytes": m.peak_rss_bytes,
+            }
+            for m in self.stages.values()
+        ]
+        if records:
+            db.execute(insert(QualiteEtapeMetrique), records)
+
+    def write_textfile(self, id_run: int, directory: Optional[str] = None) -> str:
+        """
+        Write the stages in Prometheus text format to <dir>/healthai_etl_<pipeline>.prom,
+        through a temporary file so the collector never reads half a file.
+        """
+        directory = directory or METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"healthai_etl_{self.pipeline_name}.prom")
+
+        gauges = {
+            "healthai_etl_stage_wall_seconds": ("Wall time of the stage in the last run", "wall_seconds"),
+            "healthai_etl_stage_cpu_seconds": ("Process CPU time during the stage in the last run", "cpu_seconds"),
+            "healthai_etl_stage_rows_in": ("Rows entering the stage in the last run", "rows_in"),
+            "healthai_etl_stage_rows_out": ("Rows leaving the stage in the last run", "rows_out"),
+            "healthai_etl_stage_peak_rss_bytes": ("Peak RSS sampled during the stage in the last run", "peak_rss_bytes"),
+        }
+        lines = [
+            "# HELP healthai_etl_last_run_id id_run of the last run of the pipeline",
+            "# TYPE healthai_etl_last_run_id gauge",
+            f'healthai_etl_last_run_id{{pipeline="{self.pipeline_name}"}} {id_run}',
+        ]
+        for name, (help_text, attr) in gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for m in self.stages.values():
+                lines.append(f'{name}{{pipeline="{self.pipeline_name}",stage="{m.stage}"}} {getattr(m, attr)}')
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+        return path
@@ -1,16 +1,35 @@
 from __future__ import annotations
 
 import os
+import time
 from datetime import date
+from typing import Optional
+import numpy as np
 import pandas as pd
-from sqlalchemy import select
+from sqlalchemy import any_, bindparam, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from healthai.db import SessionLocal
-from healthai.models.aliment import Aliment
 from healthai.models.nutrition_log import NutritionLog
-from healthai.etl.validators import validate_columns
+from healthai.etl.bulk import frame_to_records, get_row_error_policy, load_rows
+from healthai.etl.dimensions import FOOD_COLUMNS, resolve_food_ids
+from healthai.etl.dedupe import KeyHashDeduper, content_hashes
+from healthai.etl.locks import DatasetLocks
+from healthai.etl.reader import CsvSchema, ReadStats, clean_str, get_chunk_size
+from healthai.etl.sources import IngestPlan, plan_ingest, record_ingest
+from healthai.etl.shadow import load_session
+from healthai.etl.staging import copy_frame, get_load_mode, merge, prepare_staging
+from healthai.etl.validators import RuleReport, RuleSet, validate_columns
+from healthai.models.rules import FOOD_RULES, NUTRITION_LOG_RULES, Rule
+from healthai.etl.profiling import FrameProfiler, save_profiles
 from healthai.etl.quality import start_run, finish_run
+from healthai.etl.quarantine import QuarantineWriter
+from healthai.etl.metrics import RunMetrics
+from healthai.etl.partitions import FileOutcome, list_sources, read_partitions, run_outcome, save_file_outcomes
+
+# Source si NUTRITION_CSV est absent (aussi surveillée par healthai.etl.watch)
+DEFAULT_SOURCE = "/app/data/raw/daily_food_nutrition.csv"
 
 REQUIRED_COLS = [
     "Food_Item",
@@ -27,118 +46,341 @@ REQUIRED_COLS = [
     "Water_Intake (ml)",
 ]
 
+DEDUPE_COLS = ["Food_Item", "Category", "Meal_Type", "Water_Intake (ml)"]
+
+FOOD_SOURCE = "Daily Food & Nutrition Dataset"
+
+# Colonnes lues, typées dès le parsing ; valeurs stockées telles quelles en NUMERIC(8,2) : float32 suffit
+NUTRITION_SCHEMA = CsvSchema(
+    columns=REQUIRED_COLS,
+    categorical=["Category", "Meal_Type"],
+    numeric={
+        "Calories (kcal)": "float32",
+        "Protein (g)": "float32",
+        "Carbohydrates (g)": "float32",
+        "Fat (g)": "float32",
+        "Fiber (g)": "float32",
+        "Sugars (g)": "float32",
+        "Sodium (mg)": "float32",
+        "Cholesterol (mg)": "float32",
+        "Water_Intake (ml)": "float32",
+    },
+)
+
+# Bornes fixes des histogrammes de profilage (comparables d'un run à l'autre)
+PROFILE_HISTOGRAMS = {
+    "Calories (kcal)": (0, 1000),
+    "Protein (g)": (0, 100),
+    "Carbohydrates (g)": (0, 150),
+    "Fat (g)": (0, 100),
+    "Fiber (g)": (0, 30),
+    "Sugars (g)": (0, 100),
+    "Sodium (mg)": (0, 3000),
+    "Cholesterol (mg)": (0, 1000),
+    "Water_Intake (ml)": (0, 1000),
+}
+
+# colonnes CSV -> colonnes base (aliment / nutrition_log / stg_nutrition)
+DB_COLS = {
+    "Food_Item": "food_item",
+    "Category": "category",
+    "Calories (kcal)": "calories_kcal",
+    "Protein (g)": "protein_g",
+    "Carbohydrates (g)": "carbohydrates_g",
+    "Fat (g)": "fat_g",
+    "Fiber (g)": "fiber_g",
+    "Sugars (g)": "sugars_g",
+    "Sodium (mg)": "sodium_mg",
+    "Cholesterol (mg)": "cholesterol_mg",
+    "Meal_Type": "meal_type",
+    "Water_Intake (ml)": "water_intake_ml",
+}
+
+# Contraintes d'aliment et nutrition_log vérifiées en mémoire, Food_Item obligatoire
+NUTRITION_RULES = RuleSet(
+    [Rule("nn_food_item", "food_item", nullable=False), *FOOD_RULES, *NUTRITION_LOG_RULES],
+    {db: csv for csv, db in DB_COLS.items()},
+)
+
 def _to_num(series: pd.Series) -> pd.Series:
     return pd.to_numeric(series, errors="coerce")
 
+def _clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Valide les colonnes, nettoie les chaînes, convertit les colonnes numériques."""
+    vr = validate_columns(list(df.columns), REQUIRED_COLS)
+    if not vr.ok:
+        raise ValueError(f"Missing columns in nutrition CSV: {vr.missing_columns}")
+
+    # nettoyage de base (Category / Meal_Type : sur les catégories seulement)
+    df["Food_Item"] = clean_str(df["Food_Item"])
+    df["Category"] = clean_str(df["Category"])
+    df["Meal_Type"] = clean_str(df["Meal_Type"])
+
+    # conversions numériques
+    for col, dtype in NUTRITION_SCHEMA.numeric.items():
+        df[col] = _to_num(df[col]).astype(dtype)
+    return df
+
+def _row_hashes(df_valid: pd.DataFrame, import_date: date) -> pd.Series:
+    """
+    Hash de contenu de chaque ligne, date du log comprise : une ligne identique
+    à celle d'un autre jour est un nouveau log ; relue le même jour, un doublon.
+    """
+    keyed = df_valid[REQUIRED_COLS].assign(log_date=import_date.isoformat())
+    return content_hashes(keyed, [*REQUIRED_COLS, "log_date"])
+
+def _drop_loaded(db: Session, df_valid: pd.DataFrame) -> pd.DataFrame:
+    """Écarte les lignes déjà chargées par un run précédent : un seul SELECT ... = ANY(:hashes) par chunk."""
+    hashes = df_valid["row_hash"].tolist()
+    if not hashes:
+        return df_valid
+
+    loaded = set(db.execute(
+        select(NutritionLog.row_hash).where(NutritionLog.row_hash == any_(bindparam("hashes"))),
+        {"hashes": hashes},
+    ).scalars())
+    return df_valid[~df_valid["row_hash"].isin(loaded)]
+
+def _load_logs(db: Session, df_valid: pd.DataFrame, import_date: date) -> int:
+    """Résolution des aliments en bulk puis insertion des logs en un seul executemany."""
+    rows = df_valid[list(DB_COLS)].rename(columns=DB_COLS)
+
+    food_ids = resolve_food_ids(db, rows[FOOD_COLUMNS], source=FOOD_SOURCE)
+
+    logs = pd.DataFrame(
+        {
+            "id_user": None,
+            "id_food": rows["food_item"].map(food_ids),
+            "log_date": import_date,
+            "meal_type": rows["meal_type"].astype("string"),
+            "water_intake_ml": np.trunc(rows["water_intake_ml"].astype("float64")).astype("Int64"),
+            "row_hash": df_valid["row_hash"],
+        }
+    )
+    records = frame_to_records(logs, logs.columns)
+    if not records:
+        return 0
+
+    # ON CONFLICT : ligne chargée entre-temps par un autre run
+    stmt = (
+        pg_insert(NutritionLog)
+        .on_conflict_do_nothing(index_elements=["row_hash"])
+        .returning(NutritionLog.id_nutrition_log)
+    )
+    return len(db.execute(stmt, records).all())
+
+_MERGE_FOODS_SQL = """
+    INSERT INTO aliment (
+      food_item, category, calories_kcal, protein_g, carbohydrates_g, fat_g,
+      fiber_g, sugars_g, sodium_mg, cholesterol_mg, source
+    )
+    SELECT DISTINCT ON (food_item)
+      food_item, category, calories_kcal, protein_g, carbohydrates_g, fat_g,
+      fiber_g, sugars_g, sodium_mg, cholesterol_mg, :source
+    FROM stg_nutrition
+    ORDER BY food_item, stg_row
+    ON CONFLICT (food_item) DO NOTHING
+"""
+
+_MERGE_LOGS_SQL = """
+    INSERT INTO nutrition_log (id_user, id_food, log_date, meal_type, water_intake_ml, row_hash)
+    SELECT NULL, a.id_food, :log_date, s.meal_type, trunc(s.water_intake_ml)::int, s.row_hash
+    FROM stg_nutrition s
+    JOIN aliment a ON a.food_item = s.food_item
+    ORDER BY s.stg_row
+    ON CONFLICT (row_hash) DO NOTHING
+"""
+
+def _load_logs_copy(db: Session, df_valid: pd.DataFrame, import_date: date) -> int:
+    """COPY le chunk dans stg_nutrition puis merge ensembliste vers aliment et nutrition_log."""
+    if df_valid.empty:
+        return 0
+
+    staged = df_valid[[*DB_COLS, "row_hash"]].rename(columns=DB_COLS)
+
+    prepare_staging(db, "stg_nutrition")
+    result = copy_frame(db, "stg_nutrition", staged, [*DB_COLS.values(), "row_hash"])
+    print(f"[nutrition] {result}")
+
+    merge(db, _MERGE_FOODS_SQL, source=FOOD_SOURCE)
+    return merge(db, _MERGE_LOGS_SQL, log_date=import_date)
+
 def run_nutrition_ingest() -> None:
-    path = os.getenv("NUTRITION_CSV", "/app/data/raw/daily_food_nutrition.csv")
+    # Un fichier, un dossier de partitions journalières ou un glob
+    source = os.getenv("NUTRITION_CSV", DEFAULT_SOURCE)
     import_date = date.today()
 
-    db: Session = SessionLocal()
+    db: Session = load_session(SessionLocal)
     run = start_run(db, "nutrition_ingest")
+    id_run = run.id_run
+    quarantine = QuarantineWriter(run.id_run)
+    metrics = RunMetrics("nutrition_ingest")
+    # aliment et nutrition_log : un seul écrivain à la fois, les exports attendent la fin du chargement
+    locks = DatasetLocks("nutrition_ingest", exclusive=["nutrition"])
 
     rows_read = rows_inserted = rows_rejected = missing_values = duplicates = 0
 
     try:
-        df = pd.read_csv(
-            path,
-            engine="python",        
-            sep=",",
-            on_bad_lines="skip"        
-        )
-        # Lecture pour compter le total de lignes fichier 
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            total_lines = sum(1 for _ in f) - 1 
+        locks.acquire()
+        load_mode = get_load_mode()
+        row_errors = get_row_error_policy()
 
-        rows_read = total_lines
-        rows_parsed = len(df)
+        paths = list_sources(source)
+        if not paths:
+            raise FileNotFoundError(f"Aucune source nutrition pour {source}")
 
-        # lignes rejetées au parsing
-        rows_rejected += max(0, rows_read - rows_parsed)
-
-        # validation colonnes
-        vr = validate_columns(list(df.columns), REQUIRED_COLS)
-        if not vr.ok:
-            raise ValueError(f"Missing columns in nutrition CSV: {vr.missing_columns}")
-
-        # nettoyage de base
-        df["Food_Item"] = df["Food_Item"].astype(str).str.strip()
-        df["Category"] = df["Category"].astype(str).str.strip()
-
-        # conversions numériques
-        df["Calories (kcal)"] = _to_num(df["Calories (kcal)"])
-        df["Protein (g)"] = _to_num(df["Protein (g)"])
-        df["Carbohydrates (g)"] = _to_num(df["Carbohydrates (g)"])
-        df["Fat (g)"] = _to_num(df["Fat (g)"])
-        df["Fiber (g)"] = _to_num(df["Fiber (g)"])
-        df["Sugars (g)"] = _to_num(df["Sugars (g)"])
-        df["Sodium (mg)"] = _to_num(df["Sodium (mg)"])
-        df["Cholesterol (mg)"] = _to_num(df["Cholesterol (mg)"])
-        df["Water_Intake (ml)"] = pd.to_numeric(df["Water_Intake (ml)"], errors="coerce")
-
-        missing_values = int(df.isna().sum().sum())
-
-        before = len(df)
-        df = df.drop_duplicates(subset=["Food_Item", "Category", "Meal_Type", "Water_Intake (ml)"])
-        duplicates = before - len(df)
-
-        # Food_Item obligatoire
-        df_valid = df[df["Food_Item"].notna() & (df["Food_Item"].str.len() > 0)].copy()
-        rows_rejected = len(df) - len(df_valid)
+        # Fichiers inchangés depuis le dernier run : rien à relire
+        plans = [plan_ingest(db, "nutrition_ingest", path) for path in paths]
+        to_read = [p for p in plans if p.mode != "skip"]
+        if not to_read:
+            for plan in plans:
+                record_ingest(db, plan, run, 0, import_date)
+            save_file_outcomes(db, run.id_run, [FileOutcome(p.path, "SKIPPED", p.mode) for p in plans])
+            db.commit()
+            finish_run(
+                db,
+                run,
+                status="SKIPPED",
+                rows_read=0,
+                rows_inserted=0,
+                rows_rejected=0,
+                missing_values_count=0,
+                duplicates_count=0,
+                ingest_mode="skip",
+                lock_wait_seconds=locks.waited,
+            )
+            for plan in plans:
+                print(f"[nutrition] SKIPPED {plan.path} inchangé depuis le run {plan.previous.id_run}")
+            return
 
+        deduper = KeyHashDeduper(DEDUPE_COLS)
+        rules_report = RuleReport()
+        profiler = FrameProfiler(REQUIRED_COLS, PROFILE_HISTOGRAMS)
         inserted_logs = 0
+        outcomes = [FileOutcome(p.path, "SKIPPED", p.mode) for p in plans if p.mode == "skip"]
+        # Plans à enregistrer dans le registre (un fichier en échec n'y est pas : relu au prochain run)
+        loaded = [(p, 0) for p in plans if p.mode == "skip"]
 
-        for _, r in df_valid.iterrows():
-            food_item = str(r["Food_Item"]).strip()
-
-            existing_food_id = db.execute(
-                select(Aliment.id_food).where(Aliment.food_item == food_item)
-            ).scalar_one_or_none()
-
-            if existing_food_id is None:
-                food = Aliment(
-                    food_item=food_item,
-                    category=str(r["Category"]) if pd.notna(r["Category"]) else None,
-                    calories_kcal=r["Calories (kcal)"],
-                    protein_g=r["Protein (g)"],
-                    carbohydrates_g=r["Carbohydrates (g)"],
-                    fat_g=r["Fat (g)"],
-                    fiber_g=r["Fiber (g)"],
-                    sugars_g=r["Sugars (g)"],
-                    sodium_mg=r["Sodium (mg)"],
-                    cholesterol_mg=r["Cholesterol (mg)"],
-                    source="Daily Food & Nutrition Dataset",
-                )
-                db.add(food)
-                db.flush()  
-                food_id = food.id_food
-            else:
-                food_id = existing_food_id
-
-            log = NutritionLog(
-                id_user=None,
-                id_food=food_id,
-                log_date=import_date,
-                meal_type=str(r["Meal_Type"]) if pd.notna(r["Meal_Type"]) else None,
-                water_intake_ml=int(r["Water_Intake (ml)"]) if pd.notna(r["Water_Intake (ml)"]) else None,
-            )
-            db.add(log)
-            inserted_logs += 1
+        # Pipeline par chunk : dédoublonnage (hashes conservés, entre fichiers aussi) -> validation -> chargement
+        def consume(df: pd.DataFrame, stats: ReadStats, outcome: FileOutcome, path: Optional[str]) -> None:
+            nonlocal missing_values, duplicates, rows_rejected, inserted_logs
+            with metrics.stage("profile", len(df)):
+                profiler.update(df)
+                missing_values += int(df.isna().sum().sum())
+
+            with metrics.stage("dedupe", len(df)) as step:
+                before = len(df)
+                df = deduper.drop_duplicates(df)
+                duplicates += before - len(df)
+                outcome.duplicates_count += before - len(df)
+                step.rows_out = len(df)
+
+            # Règles de validation (une passe vectorisée, rejets comptés par règle)
+            with metrics.stage("validate", len(df)) as step:
+                df_valid, report = NUTRITION_RULES.evaluate(df)
+                rules_report.add(report)
+                rows_rejected += report.rows_rejected
+                outcome.rows_rejected += report.rows_rejected
+                quarantine.add(df.loc[report.reasons.index], report.reasons, stats, source=path)
+                step.rows_out = len(df_valid)
+
+            # Hash de contenu stable : une ligne déjà chargée pour cette date n'est pas rechargée (comptée en doublon)
+            with metrics.stage("dedupe_db", len(df_valid)) as step:
+                df_valid = df_valid.assign(row_hash=_row_hashes(df_valid, import_date))
+                df_new = _drop_loaded(db, df_valid)
+                step.rows_out = len(df_new)
 
-        db.commit()
+            # Lignes refusées par la base (ETL_ROW_ERRORS=bisect) : isolées par dichotomie, mises en quarantaine
+            # avec le message de l'erreur, le reste du chunk est chargé
+            refused = 0
+
+            def reject(rows: pd.DataFrame, reason: str, message: str) -> None:
+                nonlocal rows_rejected, refused
+                refused += len(rows)
+                rows_rejected += len(rows)
+                outcome.rows_rejected += len(rows)
+                rules_report.by_rule[reason] += len(rows)
+                quarantine.add(rows.drop(columns="row_hash"), pd.Series(reason, index=rows.index), stats, source=path, message=message)
+
+            loader = _load_logs_copy if load_mode == "copy" else _load_logs
+            with metrics.stage("load", len(df_new)) as step:
+                loaded_rows = load_rows(db, df_new, lambda part: loader(db, part, import_date), reject, row_errors)
+                step.rows_out = loaded_rows
+            inserted_logs += loaded_rows
+            duplicates += len(df_valid) - loaded_rows - refused
+            outcome.duplicates_count += len(df_valid) - loaded_rows - refused
+
+        # lignes rejetées au parsing
+        def close_file(plan: IngestPlan, stats: ReadStats, outcome: FileOutcome, path: Optional[str]) -> None:
+            nonlocal rows_read, rows_rejected
+            rows_read += stats.rows_read
+            rows_rejected += stats.rows_malformed
+            rules_report.by_rule["malformed_line"] += stats.rows_malformed
+            quarantine.add_bad_lines(stats.bad_lines, source=path)
+            outcome.rows_read = stats.rows_read
+            outcome.rows_rejected += stats.rows_malformed
+            outcomes.append(outcome)
+            loaded.append((plan, stats.rows_read))
+
+        if len(plans) == 1:
+            # Fichier unique, lu par chunks (CSV, éventuellement compressé, ou Parquet / Arrow) : lignes malformées comptées dans stats
+            # Seule la plage d'octets planifiée est lue (fichier entier ou fin ajoutée)
+            plan = to_read[0]
+            outcome = FileOutcome(plan.path, "SUCCESS", plan.mode)
+            started = time.perf_counter()
+            stats = ReadStats(line_offset=plan.line_offset, first_line=plan.first_line)
+            for df in metrics.iter("read", plan.frames(NUTRITION_SCHEMA, get_chunk_size(), stats, sep=",")):
+                with metrics.stage("clean", len(df)):
+                    df = _clean_frame(df)
+                consume(df, stats, outcome, None)
+            outcome.seconds = time.perf_counter() - started
+            close_file(plan, stats, outcome, None)
+        else:
+            # Plusieurs fichiers : lus et nettoyés par des processus, fusionnés ici dans l'ordre des fichiers
+            for plan, part in zip(to_read, read_partitions(to_read, _clean_frame, NUTRITION_SCHEMA, sep=",")):
+                for m in part.metrics:
+                    metrics.add(m)
+                if part.error is not None:
+                    outcomes.append(FileOutcome(plan.path, "FAILED", plan.mode, seconds=part.seconds, error_message=part.error))
+                    print(f"[nutrition] FAILED {plan.path}: {part.error}")
+                    continue
+                outcome = FileOutcome(plan.path, "SUCCESS", plan.mode, seconds=part.seconds)
+                for df in part.frames():
+                    consume(df, part.stats, outcome, plan.path)
+                close_file(plan, part.stats, outcome, plan.path)
+            failed = [o for o in outcomes if o.status == "FAILED"]
+            if len(failed) == len(plans):
+                raise RuntimeError(f"Les {len(plans)} fichiers nutrition sont en échec, première erreur : {failed[0].error_message}")
+
+        with metrics.stage("commit"):
+            for plan, n_rows in loaded:
+                record_ingest(db, plan, run, n_rows, import_date)
+            save_file_outcomes(db, run.id_run, outcomes)
+            save_profiles(db, run.id_run, profiler)
+            metrics.save(db, run.id_run)
+            db.commit()
         rows_inserted = inserted_logs
+        status, ingest_mode = run_outcome(outcomes, plans)
 
         finish_run(
             db,
             run,
-            status="SUCCESS",
+            status=status,
             rows_read=rows_read,
             rows_inserted=rows_inserted,
             rows_rejected=rows_rejected,
             missing_values_count=missing_values,
             duplicates_count=duplicates,
+            ingest_mode=ingest_mode,
+            rejections_by_rule=rules_report.as_dict(),
+            lock_wait_seconds=locks.waited,
+        )
+        files_ok = sum(o.status == "SUCCESS" for o in outcomes)
+        print(
+            f"[nutrition] {'OK' if status == 'SUCCESS' else status} mode={ingest_mode} files={files_ok}/{len(to_read)} "
+            f"rows_read={rows_read} inserted_logs={rows_inserted} rejected={rows_rejected}"
         )
-        print(f"[nutrition] OK rows_read={rows_read} inserted_logs={rows_inserted} rejected={rows_rejected}")
+        print(metrics.summary())
 
     except Exception as e:
         db.rollback()
@@ -152,7 +394,16 @@ def run_nutrition_ingest() -> None:
             missing_values_count=missing_values,
             duplicates_count=duplicates,
             error_message=str(e),
+            lock_wait_seconds=locks.waited,
         )
+        print(metrics.summary())
         raise
     finally:
-        db.close()
\ No newline at end of file
+        locks.release()
+        quarantine.close()
+        db.close()
+
+    try:
+        metrics.write_textfile(id_run)
+    except OSError as e:  # run déjà validé : des métriques manquantes ne doivent pas le faire échouer
+        print(f"[nutrition] fichier de métriques non écrit: {e}")
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+# A stage: display name + picklable callable (module-level function or functools.partial)
+Stage = tuple[str, Callable[[], Any]]
+
+
+def get_workers(n_stages: int) -> int:
+    """
+    ETL_WORKERS processes, never more than the stages (default: one per stage,
+    the stages mostly wait on PostgreSQL). 1 runs everything in-process.
+    """
+    value = int(os.getenv("ETL_WORKERS", "0") or 0)
+    if value <= 0:
+        value = n_stages
+    return max(1, min(value, n_stages))
+
+
+@dataclass(frozen=True)
+class StageResult:
+    name: str
+    ok: bool
+    seconds: float
+    value: Any = None
+    error: Optional[str] = None
+
+    def __str__(self) -> str:
+        status = "OK" if self.ok else f"FAILED ({self.error})"
+        return f"{self.name}: {status} in {self.seconds:.2f}s"
+
+
+class StageError(RuntimeError):
+    def __init__(self, failed: list[StageResult]):
+        self.failed = failed
+        super().__init__("ETL stages failed: " + ", ".join(r.name for r in failed))
+
+
+def _run_stage(name: str, fn: Callable[[], Any]) -> StageResult:
+    started = time.perf_counter()
+    try:
+        value = fn()
+    except Exception as e:  # reported with the other results, raised by run_stages
+        traceback.print_exc()
+        return StageResult(name, False, time.perf_counter() - started, error=f"{type(e).__name__}: {e}")
+    return StageResult(name, True, time.perf_counter() - started, value=value)
+
+
+def run_stages(stages: list[Stage], workers: Optional[int] = None) -> list[StageResult]:
+    """
+    Run independent stages concurrently and return their results in the order given.
+
+    Workers are spawned, not forked: each one imports healthai.db and gets its
+    own engine and SessionLocal, no connection is shared with the parent.
+    Results are printed in that order once all stages are done. Every stage
+    runs even if another one fails; StageError is raised at the end.
+    """
+    workers = workers or get_workers(len(stages))
+
+    if workers <= 1:
+        results = [_run_stage(name, fn) for name, fn in stages]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [pool.submit(_run_stage, name, fn) for name, fn in stages]
+            results = [f.result() for f in futures]
+
+    for r in results:
+        print(f"[etl] {r}")
+
+    failed = [r for r in results if not r.ok]
+    if failed:
+        raise StageError(failed)
+    return results
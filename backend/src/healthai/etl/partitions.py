@@ -0,0 +1,174 @@
+from __future__ import annotations
+import glob
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import partial
+from typing import Callable, Iterable, Iterator, Optional
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from healthai.etl.metrics import RunMetrics, StageMetrics
+from healthai.etl.reader import SOURCE_PATTERNS, CsvSchema, ReadStats, get_chunk_size
+from healthai.etl.shards import iter_spill
+from healthai.etl.sources import IngestPlan
+from healthai.models.qualite_fichier import QualiteRunFichier
+
+_GLOB_CHARS = "*?["
+
+
+def list_sources(spec: str, patterns: Iterable[str] = SOURCE_PATTERNS) -> list[str]:
+    """
+    Files named by a source setting: a file, a directory (its files matching
+    `patterns`) or a glob. Sorted, so files are merged in the same order on every run.
+    """
+    if any(c in spec for c in _GLOB_CHARS):
+        return sorted(p for p in glob.glob(spec) if os.path.isfile(p))
+    if os.path.isdir(spec):
+        found = {p for pattern in patterns for p in glob.glob(os.path.join(spec, pattern))}
+        return sorted(p for p in found if os.path.isfile(p))
+    return [spec]
+
+
+def get_file_workers(n_files: int) -> int:
+    """INGEST_FILE_WORKERS processes parsing files (default: one per core), never more than the files."""
+    value = int(os.getenv("INGEST_FILE_WORKERS", "0") or 0)
+    if value <= 0:
+        value = os.cpu_count() or 1
+    return max(1, min(value, n_files))
+
+
+@dataclass
+class Partition:
+    """
+    One source file parsed and cleaned by a worker. Its chunks wait in a
+    spill file (none if error is set): the parent reads them back one at a
+    time with frames(), so its memory follows INGEST_CHUNK_SIZE, not the file size.
+    """
+
+    path: str
+    stats: ReadStats
+    seconds: float
+    metrics: list[StageMetrics] = field(default_factory=list)
+    error: Optional[str] = None
+    spill: Optional[str] = None
+
+    def frames(self) -> Iterator[pd.DataFrame]:
+        """The cleaned chunks, in file order; the spill file is removed once read (or abandoned)."""
+        if self.spill is None:
+            return
+        try:
+            yield from iter_spill(self.spill)
+        finally:
+            self.discard()
+
+    def discard(self) -> None:
+        if self.spill is not None:
+            try:
+                os.remove(self.spill)
+            except FileNotFoundError:
+                pass
+            self.spill = None
+
+
+@dataclass
+class FileOutcome:
+    """Child row of the quality run for one source file."""
+
+    path: str
+    status: str
+    ingest_mode: Optional[str] = None
+    rows_read: int = 0
+    rows_rejected: int = 0
+    duplicates_count: int = 0
+    seconds: Optional[float] = None
+    error_message: Optional[str] = None
+
+
+def read_partition(plan: IngestPlan, clean: Callable[[pd.DataFrame], pd.DataFrame], schema: CsvSchema, read_kwargs: dict) -> Partition:
+    """
+    Parse and clean the planned range of one file into a spill file (pickle
+    stream, as ShardSpill); errors are returned, not raised.
+    """
+    metrics = RunMetrics(plan.pipeline_name)
+    stats = ReadStats(line_offset=plan.line_offset, first_line=plan.first_line)
+    started = time.perf_counter()
+    fd, spill = tempfile.mkstemp(prefix="healthai-partition-", suffix=".pkl")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for df in metrics.iter("read", plan.frames(schema, get_chunk_size(), stats, **read_kwargs)):
+                with metrics.stage("clean", len(df)):
+                    df = clean(df)
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:  # one corrupt file must not stop the others
+        traceback.print_exc()
+        os.remove(spill)
+        return Partition(
+            plan.path,
+            stats,
+            time.perf_counter() - started,
+            list(metrics.stages.values()),
+            error=f"{type(e).__name__}: {e}",
+        )
+    return Partition(plan.path, stats, time.perf_counter() - started, list(metrics.stages.values()), spill=spill)
+
+
+def read_partitions(
+    plans: list[IngestPlan],
+    clean: Callable[[pd.DataFrame], pd.DataFrame],
+    schema: CsvSchema,
+    workers: Optional[int] = None,
+    **read_kwargs,
+) -> Iterator[Partition]:
+    """
+    Parse files in worker processes and yield them in the order of `plans`.
+    At most 2 x workers files are in flight, so a slow file holds back the merge,
+    not the parsing of the next ones. Workers send back a spill file, not the
+    frames: in flight files wait on disk, and the parent holds one chunk at a time.
+    """
+    read = partial(read_partition, clean=clean, schema=schema, read_kwargs=read_kwargs)
+    # Registry rows belong to the parent's session: workers get the byte range only
+    plans = [replace(p, previous=None) for p in plans]
+    workers = workers or get_file_workers(len(plans))
+
+    if workers <= 1:
+        for plan in plans:
+            yield read(plan)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    in_flight: deque[Future] = deque()
+    try:
+        todo = iter(plans)
+        in_flight.extend(pool.submit(read, p) for p, _ in zip(todo, range(2 * workers)))
+        while in_flight:
+            part = in_flight.popleft().result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                in_flight.append(pool.submit(read, nxt))
+            yield part
+    finally:
+        pool.shutdown(cancel_futures=True)
+        # Merge stopped early: files parsed but never read leave no spill behind
+        for future in in_flight:
+            if not future.cancelled() and future.exception() is None:
+                future.result().discard()
+
+
+def run_outcome(outcomes: list[FileOutcome], plans: list[IngestPlan]) -> tuple[str, str]:
+    """(status, ingest_mode) of the run: PARTIAL if a file failed, "mixed" if files had different modes."""
+    status = "PARTIAL" if any(o.status == "FAILED" for o in outcomes) else "SUCCESS"
+    modes = {p.mode for p in plans}
+    return status, modes.pop() if len(modes) == 1 else "mixed"
+
+
+def save_file_outcomes(db: Session, id_run: int, outcomes: list[FileOutcome]) -> None:
+    """One qualite_run_fichier row per file, in the caller's transaction."""
+    if outcomes:
+        db.execute(insert(QualiteRunFichier), [{"id_run": id_run, **vars(o)} for o in outcomes])
@@ -0,0 +1,187 @@
+from __future__ import annotations
+import base64
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from healthai.etl.dedupe import key_hashes
+from healthai.models.qualite_profil import QualiteColonneProfil
+
+# HyperLogLog with 2^12 registers: ~1.6% standard error on the distinct count
+_HLL_P = 12
+_HLL_M = 1 << _HLL_P
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / _HLL_M)
+
+HISTOGRAM_BINS = 20
+
+
+def _hll_update(registers: np.ndarray, hashes: np.ndarray) -> None:
+    """Fold 64-bit hashes into the registers: max rank of the first set bit per bucket."""
+    if not len(hashes):
+        return
+    bucket = (hashes >> np.uint64(64 - _HLL_P)).astype(np.int64)
+    rest = hashes << np.uint64(_HLL_P)
+    # rank = leading zeros of the remaining bits + 1 (all-zero remainder: max rank)
+    nonzero = rest > 0
+    highest = np.zeros(len(rest), dtype=np.int64)
+    highest[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64)
+    rank = np.where(nonzero, 64 - highest, 64 - _HLL_P + 1).astype(np.uint8)
+    np.maximum.at(registers, bucket, rank)
+
+
+def _hll_estimate(registers: np.ndarray) -> int:
+    estimate = _HLL_ALPHA * _HLL_M * _HLL_M / np.sum(np.power(2.0, -registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * _HLL_M and zeros:
+        # small cardinalities: linear counting is more accurate
+        estimate = _HLL_M * np.log(_HLL_M / zeros)
+    return int(round(estimate))
+
+
+@dataclass
+class ColumnProfile:
+    """Mergeable statistics of one column (chunk after chunk)."""
+
+    name: str
+    numeric: bool
+    histogram_range: Optional[tuple[float, float]] = None
+    row_count: int = 0
+    null_count: int = 0
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    total: float = 0.0
+    registers: np.ndarray = field(default_factory=lambda: np.zeros(_HLL_M, dtype=np.uint8))
+    # HISTOGRAM_BINS equal bins over histogram_range, plus values below / above it
+    counts: np.ndarray = field(default_factory=lambda: np.zeros(HISTOGRAM_BINS, dtype=np.int64))
+    under: int = 0
+    over: int = 0
+
+    def update(self, s: pd.Series) -> None:
+        missing = s.isna().to_numpy()
+        self.row_count += len(s)
+        self.null_count += int(missing.sum())
+        _hll_update(self.registers, key_hashes(s.to_frame(), [s.name])[~missing])
+
+        if not self.numeric:
+            return
+        values = s.to_numpy(dtype="float64", na_value=np.nan)[~missing]
+        if not len(values):
+            return
+        lo, hi = float(values.min()), float(values.max())
+        self.min_value = lo if self.min_value is None else min(self.min_value, lo)
+        self.max_value = hi if self.max_value is None else max(self.max_value, hi)
+        self.total += float(values.sum())
+
+        if self.histogram_range is not None:
+            h_lo, h_hi = self.histogram_range
+            self.under += int((values < h_lo).sum())
+            self.over += int((values > h_hi).sum())
+            self.counts += np.histogram(values, bins=HISTOGRAM_BINS, range=(h_lo, h_hi))[0]
+
+    def merge(self, other: ColumnProfile) -> None:
+        """Add the statistics of the same column profiled elsewhere (e.g. another shard)."""
+        self.row_count += other.row_count
+        self.null_count += other.null_count
+        np.maximum(self.registers, other.registers, out=self.registers)
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+            self.max_value = other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+        self.total += other.total
+        self.counts += other.counts
+        self.under += other.under
+        self.over += other.over
+
+    def as_state(self) -> dict:
+        """JSON-serializable copy of the statistics (see from_state)."""
+        state = asdict(self)
+        state["registers"] = base64.b64encode(self.registers.tobytes()).decode("ascii")
+        state["counts"] = self.counts.tolist()
+        return state
+
+    @classmethod
+    def from_state(cls, state: dict) -> ColumnProfile:
+        histogram_range = state["histogram_range"]
+        return cls(
+            **{
+                **state,
+                "histogram_range": tuple(histogram_range) if histogram_range is not None else None,
+                "registers": np.frombuffer(base64.b64decode(state["registers"]), dtype=np.uint8).copy(),
+                "counts": np.array(state["counts"], dtype=np.int64),
+            }
+        )
+
+    def record(self) -> dict:
+        non_null = self.row_count - self.null_count
+        histogram = None
+        if self.numeric and self.histogram_range is not None:
+            histogram = {
+                "lo": self.histogram_range[0],
+                "hi": self.histogram_range[1],
+                "counts": self.counts.tolist(),
+                "under": self.under,
+                "over": self.over,
+            }
+        return {
+            "column_name": self.name,
+            "row_count": self.row_count,
+            "null_count": self.null_count,
+            "distinct_estimate": _hll_estimate(self.registers) if non_null else 0,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "mean_value": self.total / non_null if self.numeric and non_null else None,
+            "histogram": histogram,
+        }
+
+
+class FrameProfiler:
+    """
+    Profiles the given columns of every frame passed to update(), in one
+    vectorized pass per column. Numeric columns listed in `histogram_ranges`
+    also get a fixed-bin histogram, comparable from one run to the next.
+    """
+
+    def __init__(self, columns: list[str], histogram_ranges: Optional[dict[str, tuple[float, float]]] = None):
+        self.columns = columns
+        self.histogram_ranges = histogram_ranges or {}
+        self._profiles: dict[str, ColumnProfile] = {}
+
+    def update(self, df: pd.DataFrame) -> None:
+        for col in self.columns:
+            s = df[col]
+            if col not in self._profiles:
+                self._profiles[col] = ColumnProfile(
+                    name=col,
+                    numeric=is_numeric_dtype(s.dtype),
+                    histogram_range=self.histogram_ranges.get(col),
+                )
+            self._profiles[col].update(s)
+
+    def merge(self, other: FrameProfiler) -> None:
+        """Fold in a profiler of the same columns that saw other rows."""
+        for col, profile in other._profiles.items():
+            if col in self._profiles:
+                self._profiles[col].merge(profile)
+            else:
+                self._profiles[col] = profile
+
+    def as_state(self) -> dict:
+        """JSON-serializable statistics of the columns seen so far, e.g. for a checkpoint."""
+        return {col: profile.as_state() for col, profile in self._profiles.items()}
+
+    def restore(self, state: dict) -> None:
+        """Continue from statistics saved by as_state()."""
+        self._profiles = {col: ColumnProfile.from_state(profile) for col, profile in state.items()}
+
+    def records(self) -> list[dict]:
+        return [self._profiles[c].record() for c in self.columns if c in self._profiles]
+
+
+def save_profiles(db: Session, id_run: int, profiler: FrameProfiler) -> int:
+    """Insert one qualite_colonne_profil row per column, in the caller's transaction."""
+    records = [{"id_run": id_run, **r} for r in profiler.records()]
+    if records:
+        db.execute(insert(QualiteColonneProfil), records)
+    return len(records)
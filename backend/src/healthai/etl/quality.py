@@ -30,6 +30,9 @@ def finish_run(
     missing_values_count: int,
     duplicates_count: int,
     error_message: str | None = None,
+    ingest_mode: str | None = None,
+    rejections_by_rule: dict[str, int] | None = None,
+    lock_wait_seconds: float | None = None,
 ) -> None:
     run.ended_at = datetime.utcnow()
     run.status = status
@@ -39,4 +42,7 @@ def finish_run(
     run.missing_values_count = missing_values_count
     run.duplicates_count = duplicates_count
     run.error_message = error_message
+    run.ingest_mode = ingest_mode
+    run.rejections_by_rule = rejections_by_rule
+    run.lock_wait_seconds = lock_wait_seconds
     db.commit()
\ No newline at end of file
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from healthai.etl.reader import BadLine, ReadStats
+
+# One directory per run: <QUARANTINE_DIR>/run_<id_run>/part-<flushed_ns>-<writer>-<n>.parquet
+# (<writer> unique per QuarantineWriter: several writers of a process share the directory).
+# The 20-digit flush time leads the name: read_page pages through the writers' parts in flush order.
+QUARANTINE_DIR = os.getenv("QUARANTINE_DIR", "/app/data/quarantine")
+
+# Leading columns of every quarantined row, followed by the CSV columns (as text)
+META_COLUMNS = ["line_number", "reason", "message"]
+
+
+def run_dir(id_run: int, base_dir: Optional[str] = None) -> Path:
+    return Path(base_dir or QUARANTINE_DIR) / f"run_{int(id_run)}"
+
+
+class QuarantineWriter:
+    """
+    Append-only store of the rows rejected by one run.
+    Rows are buffered in memory and written as zstd Parquet parts every
+    `buffer_rows` rows and on close(); existing parts are never rewritten.
+    Nothing touches the disk until the first flush, so a clean run leaves no files.
+    """
+
+    def __init__(self, id_run: int, base_dir: Optional[str] = None, buffer_rows: int = 50_000):
+        self.id_run = id_run
+        self.base_dir = base_dir
+        self.buffer_rows = buffer_rows
+        self.rows_written = 0
+        self._buffer: list[pd.DataFrame] = []
+        self._buffered = 0
+        self._parts = 0
+        self._flushed_ns = 0
+        self._writer = uuid.uuid4().hex
+        # File names of the parts written (or adopted), in write order
+        self.parts: list[str] = []
+
+    def __enter__(self) -> QuarantineWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(
+        self,
+        rows: pd.DataFrame,
+        reasons: pd.Series,
+        stats: Optional[ReadStats],
+        source: Optional[str] = None,
+        message: Optional[str] = None,
+    ) -> None:
+        """
+        Quarantine `rows` (index = position in the parsed source) with one reason each.
+        `source` (file of a multi-file ingest) goes into a source_file column.
+        Rows without a source line (aggregates refused by the database) have no stats.
+        """
+        if rows.empty:
+            return
+        frame = rows.astype("string")
+        frame.insert(0, "message", pd.Series(message, index=rows.index, dtype="string"))
+        frame.insert(0, "reason", reasons.reindex(rows.index).astype("string"))
+        if source is not None:
+            frame.insert(0, "source_file", pd.Series(source, index=rows.index, dtype="string"))
+        lines = stats.line_numbers(rows.index) if stats is not None else pd.array([pd.NA] * len(rows), dtype="Int64")
+        frame.insert(0, "line_number", lines)
+        self._append(frame)
+
+    def add_bad_lines(self, bad_lines: Iterable[BadLine], source: Optional[str] = None) -> None:
+        """Malformed lines only have the parser message, not their fields."""
+        bad_lines = list(bad_lines)
+        if not bad_lines:
+            return
+        frame = pd.DataFrame(
+            {
+                "line_number": [b.line_number for b in bad_lines],
+                "reason": "malformed_line",
+                "message": [b.message for b in bad_lines],
+            }
+        ).astype({"reason": "string", "message": "string"})
+        if source is not None:
+            frame.insert(1, "source_file", pd.Series(source, index=frame.index, dtype="string"))
+        self._append(frame)
+
+    def _append(self, frame: pd.DataFrame) -> None:
+        self._buffer.append(frame.reset_index(drop=True))
+        self._buffered += len(frame)
+        if self._buffered >= self.buffer_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        frame = pd.concat(self._buffer, ignore_index=True)
+        frame["line_number"] = frame["line_number"].astype("Int64")
+
+        directory = run_dir(self.id_run, self.base_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        # Never earlier than this writer's previous part, even if the clock steps back
+        self._flushed_ns = max(time.time_ns(), self._flushed_ns + 1)
+        path = directory / f"part-{self._flushed_ns:020d}-{self._writer}-{self._parts:05d}.parquet"
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path, compression="zstd")
+
+        self._parts += 1
+        self.parts.append(path.name)
+        self.rows_written += len(frame)
+        self._buffer = []
+        self._buffered = 0
+
+    def adopt(self, id_run: int, parts: list[str]) -> None:
+        """
+        Copy parts written by an earlier run (a resumed ingest) into this run,
+        ahead of its own parts: "part-0-..." sorts before every flush time.
+        """
+        directory = run_dir(self.id_run, self.base_dir)
+        for name in parts:
+            directory.mkdir(parents=True, exist_ok=True)
+            target = f"part-0-{len(self.parts):05d}.parquet"
+            shutil.copyfile(run_dir(id_run, self.base_dir) / name, directory / target)
+            self.parts.append(target)
+            self.rows_written += pq.ParquetFile(directory / target).metadata.num_rows
+
+    def close(self) -> None:
+        self.flush()
+
+
+def read_page(id_run: int, offset: int = 0, limit: int = 100, base_dir: Optional[str] = None) -> dict:
+    """
+    One page of the quarantined rows of a run, in write order.
+    Part sizes come from the Parquet footers: only the parts overlapping
+    the page are read.
+    """
+    directory = run_dir(id_run, base_dir)
+    parts = sorted(directory.glob("part-*.parquet")) if directory.exists() else []
+    sizes = [pq.ParquetFile(p).metadata.num_rows for p in parts]
+
+    frames = []
+    start = 0
+    for path, size in zip(parts, sizes):
+        end = start + size
+        if end > offset and start < offset + limit:
+            df = pq.read_table(path).to_pandas()
+            frames.append(df.iloc[max(offset - start, 0):offset + limit - start])
+        start = end
+
+    rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=META_COLUMNS)
+    rows = rows.astype(object).where(rows.notna(), None)
+    return {
+        "id_run": id_run,
+        "total": sum(sizes),
+        "offset": offset,
+        "limit": limit,
+        "rows": rows.to_dict(orient="records"),
+    }
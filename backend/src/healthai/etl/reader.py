@@ -0,0 +1,395 @@
+from __future__ import annotations
+import io
+import os
+import queue
+import re
+import threading
+import warnings
+from dataclasses import dataclass, field
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from typing import IO, Callable, Iterator, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from pandas.errors import ParserWarning
+
+# Message of the C parser for on_bad_lines="warn", one line per skipped record
+_BAD_LINE_RE = re.compile(r"Skipping line (\d+): (.*)")
+
+
+@dataclass(frozen=True)
+class BadLine:
+    line_number: int  # 1-based line in the file, header included
+    message: str
+
+
+@dataclass
+class ReadStats:
+    """Filled while iterating: raw records seen, records parsed, malformed lines."""
+
+    rows_parsed: int = 0
+    bad_lines: list[BadLine] = field(default_factory=list)
+    # Lines of the file before the parsed range (reading a tail)
+    line_offset: int = 0
+    # File line of the first record (2 after the header, later for a tail)
+    first_line: int = 2
+
+    @property
+    def rows_read(self) -> int:
+        return self.rows_parsed + len(self.bad_lines)
+
+    @property
+    def rows_malformed(self) -> int:
+        return len(self.bad_lines)
+
+    def line_numbers(self, positions) -> np.ndarray:
+        """
+        File line of parsed records, from their 0-based position among parsed
+        records (the default index of the chunks). Skipped bad lines are
+        accounted for; assumes one record per line.
+        """
+        pos = np.asarray(positions, dtype="int64")
+        bad = np.sort(np.array([b.line_number for b in self.bad_lines], dtype="int64"))
+        # number of parsed records before each bad line
+        before_bad = bad - self.first_line - np.arange(len(bad))
+        return self.first_line + pos + np.searchsorted(before_bad, pos, side="right")
+
+
+# Leading bytes of each format; checked before the extension, so a misnamed file is still read right
+_MAGIC = [
+    (b"\x1f\x8b", "csv", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "csv", "zstd"),
+    (b"PAR1", "parquet", None),
+    (b"ARROW1", "arrow", None),
+    (b"\xff\xff\xff\xff", "arrow_stream", None),
+]
+_EXTENSIONS = [
+    (".csv.gz", "csv", "gzip"),
+    (".gz", "csv", "gzip"),
+    (".csv.zst", "csv", "zstd"),
+    (".zst", "csv", "zstd"),
+    (".parquet", "parquet", None),
+    (".pq", "parquet", None),
+    (".arrow", "arrow", None),
+    (".feather", "arrow", None),
+    (".arrows", "arrow_stream", None),
+]
+# Files picked from a source directory
+SOURCE_PATTERNS = ["*.csv", "*.csv.gz", "*.csv.zst", "*.parquet", "*.arrow", "*.feather", "*.arrows"]
+
+
+@dataclass(frozen=True)
+class SourceFormat:
+    """
+    How a source file is stored:
+    - kind: csv, parquet, arrow (IPC file) or arrow_stream (IPC stream)
+    - compression: gzip or zstd for a compressed CSV
+    """
+
+    kind: str = "csv"
+    compression: Optional[str] = None
+
+    @property
+    def plain_csv(self) -> bool:
+        """Byte offsets are row boundaries: the only format that can be read from an offset."""
+        return self.kind == "csv" and self.compression is None
+
+
+def detect_format(path: str) -> SourceFormat:
+    """Format of a source from its magic bytes, else its extension (plain CSV by default)."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(8)
+    except OSError:
+        head = b""
+    for magic, kind, compression in _MAGIC:
+        if head.startswith(magic):
+            return SourceFormat(kind, compression)
+    name = path.lower()
+    for ext, kind, compression in _EXTENSIONS:
+        if name.endswith(ext):
+            return SourceFormat(kind, compression)
+    return SourceFormat()
+
+
+@contextmanager
+def open_csv(source: str | IO[bytes], fmt: SourceFormat = SourceFormat()) -> Iterator[str | IO[bytes]]:
+    """The CSV text to give to pandas: `source` itself, or a streaming decompressor over it."""
+    if fmt.compression is None:
+        yield source
+        return
+    stream = pa.CompressedInputStream(pa.OSFile(source) if isinstance(source, str) else source, fmt.compression)
+    try:
+        yield stream
+    finally:
+        stream.close()
+
+
+# Tokens read as missing values (pandas defaults cover "", "nan", "NaN", "None", "NULL", "null")
+NULL_TOKENS = ["none"]
+
+
+@dataclass(frozen=True)
+class CsvSchema:
+    """
+    Declared shape of a CSV source:
+    - columns: the only columns parsed (others are skipped by the reader)
+    - categorical: low-cardinality strings, parsed straight into category dtype
+    - numeric: column -> dtype applied after coercion (float32 unless values are summed)
+    """
+
+    columns: list[str]
+    categorical: list[str] = field(default_factory=list)
+    numeric: dict[str, str] = field(default_factory=dict)
+
+    def read_kwargs(self, path: str, fmt: SourceFormat = SourceFormat()) -> dict:
+        kwargs = {
+            "dtype": {c: "category" for c in self.categorical},
+            "na_values": NULL_TOKENS,
+            "keep_default_na": True,
+        }
+        # With usecols the C parser silently accepts rows with too many fields,
+        # so only project when the file really has extra columns.
+        with open_csv(path, fmt) as f:
+            header = pd.read_csv(f, nrows=0).columns
+        wanted = set(self.columns)
+        if any(c not in wanted for c in header):
+            kwargs["usecols"] = lambda c: c in wanted
+        return kwargs
+
+
+def clean_str(series: pd.Series) -> pd.Series:
+    """
+    Strip strings and turn null-like tokens into NA.
+    Categorical columns are cleaned on their categories only (no per-row string copy).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        cleaned = clean_str(pd.Series(series.cat.categories.astype(str), dtype=object))
+        new_categories = pd.unique(cleaned.dropna())
+        position = {c: i for i, c in enumerate(new_categories)}
+        lookup = cleaned.map(position).fillna(-1).astype("int64").to_numpy()
+
+        # code -1 (missing) picks the trailing -1
+        new_codes = np.append(lookup, -1)[series.cat.codes.to_numpy()]
+        return pd.Series(
+            pd.Categorical.from_codes(new_codes, categories=new_categories),
+            index=series.index,
+            name=series.name,
+        )
+
+    s = series.astype(str).str.strip()
+    s = s.replace(
+        {
+            "": pd.NA,
+            "nan": pd.NA,
+            "NaN": pd.NA,
+            "None": pd.NA,
+            "none": pd.NA,
+            "NULL": pd.NA,
+            "null": pd.NA,
+        }
+    )
+    return s
+
+
+def get_chunk_size() -> int | None:
+    """INGEST_CHUNK_SIZE rows per chunk; unset or 0 reads the whole file at once."""
+    value = int(os.getenv("INGEST_CHUNK_SIZE", "0") or 0)
+    return value if value > 0 else None
+
+
+def _prefetch(chunks: Iterator[pd.DataFrame], depth: int = 1) -> Iterator[pd.DataFrame]:
+    """
+    Parse the next chunk in a background thread while the caller
+    processes the current one. At most `depth` chunks wait in memory.
+    """
+    q: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> None:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce() -> None:
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    return
+                put(chunk)
+        except BaseException as e:  # re-raised in the consumer
+            put(e)
+        put(done)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Consumer stopped early (error, break): let the producer exit, and wait for
+        # the chunk it may be parsing, so the caller does not close the reader under it
+        stop.set()
+        producer.join()
+
+
+# Raw bytes read ahead of the CSV parser
+_READ_AHEAD_BYTES = 1 << 20
+
+
+class _ReadAhead(io.RawIOBase):
+    """
+    Binary stream over `source` whose blocks are read (and decompressed) by a
+    background thread while the caller parses. Only I/O runs in that thread:
+    the parse, and the bad-line warnings captured around it, stay in the
+    caller's thread, the only one touching the warnings state.
+    """
+
+    def __init__(self, source: IO[bytes], block_size: int = _READ_AHEAD_BYTES, depth: int = 4):
+        self._blocks = _prefetch(iter(partial(source.read, block_size), b""), depth)
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            block = next(self._blocks, None)
+            if block is None:
+                return 0
+            self._pending = memoryview(block)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            # stops and joins the reading thread
+            self._blocks.close()
+        super().close()
+
+
+def _capture_bad_lines(parse: Callable[[], pd.DataFrame], stats: ReadStats) -> pd.DataFrame:
+    """
+    Run one C-engine parse call with on_bad_lines="warn" and move the
+    "Skipping line N: ..." warnings into `stats` instead of stderr.
+    Unrelated warnings are re-emitted untouched. catch_warnings swaps
+    process-wide state: call it from the consuming thread only, never
+    from a prefetch thread.
+    """
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ParserWarning)
+        df = parse()
+
+    for w in caught:
+        found = _BAD_LINE_RE.findall(str(w.message)) if issubclass(w.category, ParserWarning) else []
+        if not found:
+            warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+            continue
+        stats.bad_lines.extend(BadLine(int(n) + stats.line_offset, msg.strip()) for n, msg in found)
+
+    stats.rows_parsed += len(df)
+    return df
+
+
+def iter_csv(
+    path: str | IO[bytes],
+    chunk_size: int | None = None,
+    stats: ReadStats | None = None,
+    **read_kwargs,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the CSV as DataFrames, in a single pass over the file.
+    `path` may also be an open binary handle (e.g. a byte range of the file).
+    - chunk_size None: one frame with the whole file
+    - otherwise frames of `chunk_size` rows, the raw bytes read ahead in a background thread
+    - malformed lines are skipped and recorded in `stats` (C engine, no second read)
+    """
+    stats = stats if stats is not None else ReadStats()
+    read_kwargs.setdefault("on_bad_lines", "warn")
+
+    if chunk_size is None:
+        yield _capture_bad_lines(lambda: pd.read_csv(path, **read_kwargs), stats)
+        return
+
+    with ExitStack() as stack:
+        raw = stack.enter_context(open(path, "rb")) if isinstance(path, str) else path
+        source = stack.enter_context(io.BufferedReader(_ReadAhead(raw)))
+        reader = stack.enter_context(pd.read_csv(source, chunksize=chunk_size, **read_kwargs))
+        while True:
+            try:
+                df = _capture_bad_lines(lambda: next(reader), stats)
+            except StopIteration:
+                return
+            yield df
+
+
+def _arrow_batches(path: str, fmt: SourceFormat, columns: list[str], schema: CsvSchema, chunk_size: int | None) -> Iterator[pa.RecordBatch | pa.Table]:
+    """Record batches of a Parquet or Arrow IPC file, reading only `columns`."""
+    if fmt.kind == "parquet":
+        pf = pq.ParquetFile(path, read_dictionary=[c for c in schema.categorical if c in columns])
+        if chunk_size is None:
+            yield pf.read(columns=columns)
+        else:
+            yield from pf.iter_batches(batch_size=chunk_size, columns=columns)
+        return
+
+    with pa.memory_map(path) as source:
+        reader = ipc.open_file(source) if fmt.kind == "arrow" else ipc.open_stream(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches)) if fmt.kind == "arrow" else reader
+        if chunk_size is None:
+            yield pa.Table.from_batches(list(batches), schema=reader.schema).select(columns)
+            return
+        for batch in batches:
+            batch = batch.select(columns)
+            for start in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(start, chunk_size)
+
+
+def iter_columnar(
+    path: str,
+    fmt: SourceFormat,
+    schema: CsvSchema,
+    chunk_size: int | None = None,
+    stats: ReadStats | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield a Parquet / Arrow IPC source as DataFrames, like iter_csv: only the
+    schema columns present in the file are read, categorical columns come as
+    category dtype. There are no malformed lines in a columnar file.
+    """
+    stats = stats if stats is not None else ReadStats()
+    if fmt.kind == "parquet":
+        names = pq.read_schema(path).names
+    else:
+        with pa.memory_map(path) as source:
+            names = (ipc.open_file(source) if fmt.kind == "arrow" else ipc.open_stream(source)).schema.names
+    # Missing columns are left to the cleaner, which reports them like for a CSV
+    columns = [c for c in schema.columns if c in names]
+
+    def frames() -> Iterator[pd.DataFrame]:
+        for batch in _arrow_batches(path, fmt, columns, schema, chunk_size):
+            df = batch.to_pandas()
+            # Position among the records read, across chunks, like the CSV reader's index
+            df.index = pd.RangeIndex(stats.rows_parsed, stats.rows_parsed + len(df))
+            for c in schema.categorical:
+                if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+                    df[c] = df[c].astype("category")
+            stats.rows_parsed += len(df)
+            yield df
+
+    # pyarrow decodes without the GIL: the next batch is read while the caller works
+    yield from (frames() if chunk_size is None else _prefetch(frames()))
@@ -1,9 +1,15 @@
 from healthai.etl.nutrition_ingest import run_nutrition_ingest
 from healthai.etl.fitness_ingest import run_fitness_ingest
+from healthai.etl.parallel import run_stages
+
+# Disjoint tables: the two ingests run concurrently (ETL_WORKERS)
+STAGES = [
+    ("nutrition_ingest", run_nutrition_ingest),
+    ("fitness_ingest", run_fitness_ingest),
+]
 
 def main() -> None:
-    run_nutrition_ingest()
-    run_fitness_ingest()
+    run_stages(STAGES)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
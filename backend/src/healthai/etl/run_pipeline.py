@@ -1,9 +1,63 @@
-from healthai.etl.run_all import main as run_ingest
+from __future__ import annotations
+import argparse
+from typing import Optional
+from healthai.etl.dag import Dag, Task
 from healthai.etl.export_data import main as run_export
+from healthai.etl.fitness_ingest import run_fitness_ingest
+from healthai.etl.nutrition_ingest import run_nutrition_ingest
+from healthai.etl.shadow import get_load_target, run_shadow_abandon, run_shadow_prepare, run_shadow_swap
 
-def main():
-    run_ingest()
-    run_export()
+def build_pipeline(load_target: str = "live") -> Dag:
+    if load_target == "shadow":
+        # Ingestions dans les copies de healthai_shadow, publiées d'un bloc avant les exports.
+        # Un lot en échec avant la bascule supprime ses copies (l'API peut de nouveau écrire)
+        # et repart de shadow_prepare au run suivant.
+        return Dag(
+            "pipeline",
+            [
+                Task("shadow_prepare", run_shadow_prepare),
+                Task("nutrition_ingest", run_nutrition_ingest, deps=("shadow_prepare",)),
+                Task("fitness_ingest", run_fitness_ingest, deps=("shadow_prepare",)),
+                Task("shadow_swap", run_shadow_swap, deps=("nutrition_ingest", "fitness_ingest")),
+                Task("export", run_export, deps=("shadow_swap",)),
+            ],
+            on_failure=run_shadow_abandon,
+        )
+    # Ingestions indépendantes (tables disjointes), exports une fois les deux chargées
+    return Dag(
+        "pipeline",
+        [
+            Task("nutrition_ingest", run_nutrition_ingest),
+            Task("fitness_ingest", run_fitness_ingest),
+            Task("export", run_export, deps=("nutrition_ingest", "fitness_ingest")),
+        ],
+    )
+
+PIPELINE = build_pipeline(get_load_target())
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m healthai.etl.run_pipeline",
+        description="Run the ETL stages; a failed batch is resumed from its last completed stage.",
+    )
+    parser.add_argument("stages", nargs="*", help=f"stages to run (default: all). Stages: {', '.join(PIPELINE.order)}")
+    parser.add_argument("--with-deps", action="store_true", help="also run the upstream stages of the given ones")
+    parser.add_argument("--fresh", action="store_true", help="start a new batch instead of resuming a failed one")
+    parser.add_argument("--list", action="store_true", help="print the stages and their dependencies, then exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in PIPELINE.order:
+            deps = PIPELINE.tasks[name].deps
+            print(f"{name}" + (f" <- {', '.join(deps)}" if deps else ""))
+        return
+
+    try:
+        PIPELINE.select(args.stages or None, args.with_deps)
+    except ValueError as e:
+        parser.error(str(e))
+
+    PIPELINE.run(args.stages or None, with_deps=args.with_deps, resume=not args.fresh)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,325 @@
+from __future__ import annotations
+import os
+import time
+from typing import Optional
+from sqlalchemy import MetaData, Table, create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
+from healthai.config import DATABASE_URL
+from healthai.db import Base, SessionLocal
+from healthai.etl.locks import DATASETS, DatasetLocks, lock_key
+
+# ETL_LOAD_TARGET:
+# - live   : the ingests write the healthai tables in place (default)
+# - shadow : run_pipeline copies them to healthai_shadow, the ingests load the copies,
+#            then one short transaction swaps the copies in (blue/green)
+LOAD_TARGETS = ("live", "shadow")
+
+LIVE_SCHEMA = "healthai"
+SHADOW_SCHEMA = "healthai_shadow"
+OLD_SCHEMA = "healthai_old"
+
+# Swapped together, parents first: the tables the API reads, and the file registry
+# and chunk checkpoints, which must describe the data they are published with
+SHADOW_TABLES = (
+    "utilisateur",
+    "aliment",
+    "session_sport",
+    "nutrition_log",
+    "source_file",
+    "ingest_checkpoint",
+    "ingest_checkpoint_segment",
+)
+
+
+# Transaction advisory lock taken shared by API writes to the live tables and
+# exclusively by prepare_shadow while it opens the shadow window
+SHADOW_WINDOW_LOCK = lock_key("shadow_window")
+
+
+class ShadowWindowOpen(RuntimeError):
+    """A write to the live tables while shadow copies are loaded: the swap would drop it."""
+
+
+def get_load_target() -> str:
+    target = os.getenv("ETL_LOAD_TARGET", "live").strip().lower()
+    if target not in LOAD_TARGETS:
+        raise ValueError(f"Invalid ETL_LOAD_TARGET={target!r}, expected one of {LOAD_TARGETS}")
+    return target
+
+
+def get_swap_lock_timeout() -> float:
+    """ETL_SWAP_LOCK_TIMEOUT_SECONDS the swap waits for running queries (default 2); new queries queue behind it meanwhile."""
+    return float(os.getenv("ETL_SWAP_LOCK_TIMEOUT_SECONDS", "2") or 2)
+
+
+_shadow_sessions: Optional[sessionmaker] = None
+
+
+def load_session(live_sessions: sessionmaker = SessionLocal) -> Session:
+    """
+    Session of an ingest: from `live_sessions`, or with ETL_LOAD_TARGET=shadow
+    one whose search_path puts the shadow schema first: the same SQL fills the
+    shadow copies (staging tables included) while the other tables (runs,
+    metrics) stay the live ones.
+    """
+    if get_load_target() == "live":
+        return live_sessions()
+
+    global _shadow_sessions
+    if _shadow_sessions is None:
+        shadow_engine = create_engine(
+            DATABASE_URL,
+            pool_pre_ping=True,
+            connect_args={"options": f"-csearch_path={SHADOW_SCHEMA},{LIVE_SCHEMA}"},
+        )
+        _shadow_sessions = sessionmaker(bind=shadow_engine, autoflush=False, autocommit=False)
+
+    db = _shadow_sessions()
+    # Without the copies, the search_path would silently fall back to the live tables
+    if _shadow_tables_found(db) != len(SHADOW_TABLES):
+        db.close()
+        raise RuntimeError(f"ETL_LOAD_TARGET=shadow but {SHADOW_SCHEMA} is not prepared (run the shadow_prepare stage)")
+    return db
+
+
+def _shadow_tables_found(db: Session) -> int:
+    return db.execute(
+        text("SELECT count(*) FROM pg_tables WHERE schemaname = :schema AND tablename = ANY(:tables)"),
+        {"schema": SHADOW_SCHEMA, "tables": list(SHADOW_TABLES)},
+    ).scalar()
+
+
+def guard_live_write(db: Session) -> None:
+    """
+    First statement of an API transaction writing the live tables: raises
+    ShadowWindowOpen from prepare_shadow to the swap, when the write would be
+    lost with the old tables. The shared lock, held until the write commits,
+    makes prepare_shadow wait for the writes already let through.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock_shared(:key)"), {"key": SHADOW_WINDOW_LOCK})
+    if _shadow_tables_found(db):
+        raise ShadowWindowOpen(f"{SHADOW_SCHEMA} is being loaded by the ETL: writes are refused until the swap")
+
+
+def shadow_tables() -> list[Table]:
+    """
+    SHADOW_TABLES as declared by the models, moved to the shadow schema
+    (parents first). Foreign keys between them stay in the shadow, the others
+    (qualite_donnees_run) point to the live schema.
+    """
+    import healthai.models  # noqa: F401  (registers every table on Base.metadata)
+
+    def referred_schema(table, to_schema, constraint, referred_schema):
+        parent = constraint.elements[0].target_fullname.split(".")[0]
+        return SHADOW_SCHEMA if parent in SHADOW_TABLES else LIVE_SCHEMA
+
+    metadata = MetaData()
+    tables = []
+    for table in Base.metadata.sorted_tables:
+        schema = SHADOW_SCHEMA if table.name in SHADOW_TABLES else LIVE_SCHEMA
+        copy = table.to_metadata(metadata, schema=schema, referred_schema_fn=referred_schema)
+        if table.name in SHADOW_TABLES:
+            tables.append(copy)
+    return tables
+
+
+def prepare_shadow(db: Session) -> dict[str, int]:
+    """
+    (Re)create the shadow schema and copy the live rows into it, ids and
+    sequences included: the ingests then upsert into the copies exactly as into
+    the live tables. Secondary indexes are left to finish_shadow. Returns the
+    rows copied per table. Readers are not blocked (plain SELECT on the live side).
+    The empty copies are committed first: from then on API writes to the live
+    tables are refused (see guard_live_write), those already running are
+    waited for, so none is missing from the copy.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SHADOW_WINDOW_LOCK})
+    db.execute(text(f"DROP SCHEMA IF EXISTS {OLD_SCHEMA} CASCADE"))
+    db.execute(text(f"DROP SCHEMA IF EXISTS {SHADOW_SCHEMA} CASCADE"))
+    db.execute(text(f"CREATE SCHEMA {SHADOW_SCHEMA}"))
+    tables = shadow_tables()
+    for table in tables:
+        # Primary key, unique (ON CONFLICT targets), check and foreign key constraints
+        db.execute(CreateTable(table))
+    db.commit()
+
+    copied = {}
+    for table in tables:
+        columns = ", ".join(c.name for c in table.columns)
+        copied[table.name] = db.execute(
+            text(f"INSERT INTO {SHADOW_SCHEMA}.{table.name} ({columns}) SELECT {columns} FROM {LIVE_SCHEMA}.{table.name}")
+        ).rowcount
+
+        # Same next ids as the live table: ids of deleted rows are not handed out again
+        for column in table.primary_key.columns:
+            live_seq = db.execute(
+                text("SELECT pg_get_serial_sequence(:t, :c)"), {"t": f"{LIVE_SCHEMA}.{table.name}", "c": column.name}
+            ).scalar()
+            if live_seq is None:
+                continue
+            last_value, is_called = db.execute(text(f"SELECT last_value, is_called FROM {live_seq}")).one()
+            db.execute(
+                text("SELECT setval(pg_get_serial_sequence(:t, :c), :v, :called)"),
+                {"t": f"{SHADOW_SCHEMA}.{table.name}", "c": column.name, "v": last_value, "called": is_called},
+            )
+        # Statistics for the ingest's key lookups and merges
+        db.execute(text(f"ANALYZE {SHADOW_SCHEMA}.{table.name}"))
+    return copied
+
+
+def finish_shadow(db: Session) -> None:
+    """Build the secondary indexes of the loaded copies and refresh their statistics (outside the swap)."""
+    for table in shadow_tables():
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            db.execute(CreateIndex(index, if_not_exists=True))
+        db.execute(text(f"ANALYZE {SHADOW_SCHEMA}.{table.name}"))
+
+
+# Views reading a swapped table: they follow the table they were created on,
+# so they are recreated on the new one. pg_get_viewdef leaves the live schema
+# unqualified (search_path=healthai): the same text names the swapped-in tables.
+_DEPENDENT_VIEWS_SQL = """
+    SELECT DISTINCT v.relkind, format('%I.%I', n.nspname, v.relname) AS name, pg_get_viewdef(v.oid) AS definition
+    FROM pg_depend d
+    JOIN pg_rewrite r ON r.oid = d.objid
+    JOIN pg_class v ON v.oid = r.ev_class
+    JOIN pg_namespace n ON n.oid = v.relnamespace
+    WHERE d.classid = 'pg_rewrite'::regclass
+      AND d.refclassid = 'pg_class'::regclass
+      AND d.refobjid = ANY(CAST(:tables AS regclass[]))
+      AND v.oid <> ALL(CAST(:tables AS regclass[]))
+    ORDER BY name
+"""
+
+# Foreign keys from tables outside the swap would keep pointing to the old tables
+_OUTSIDE_FKS_SQL = """
+    SELECT format('%s.%I', conrelid::regclass, conname)
+    FROM pg_constraint
+    WHERE contype = 'f'
+      AND confrelid = ANY(CAST(:tables AS regclass[]))
+      AND conrelid <> ALL(CAST(:tables AS regclass[]))
+"""
+
+
+def swap_shadow(db: Session, lock_timeout: Optional[float] = None) -> float:
+    """
+    Publish the shadow copies in one transaction: the live tables move to the
+    old schema, the copies take their place (with their indexes, constraints
+    and sequences) and the dependent views are recreated on them. Readers see
+    either the old or the new dataset. The ACCESS EXCLUSIVE locks wait at most
+    lock_timeout for running queries (lock_not_available otherwise, retried by
+    the DAG). Commits; returns the seconds the tables were locked.
+    """
+    lock_timeout = get_swap_lock_timeout() if lock_timeout is None else lock_timeout
+    live = [f"{LIVE_SCHEMA}.{name}" for name in SHADOW_TABLES]
+
+    db.execute(text(f"SET LOCAL lock_timeout = '{int(lock_timeout * 1000)}ms'"))
+    db.execute(text(f"LOCK TABLE {', '.join(live)} IN ACCESS EXCLUSIVE MODE"))
+    locked = time.perf_counter()
+
+    outside = db.execute(text(_OUTSIDE_FKS_SQL), {"tables": live}).scalars().all()
+    views = db.execute(text(_DEPENDENT_VIEWS_SQL), {"tables": live}).all()
+    materialized = [v.name for v in views if v.relkind != "v"]
+    if outside or materialized:
+        raise RuntimeError(
+            f"Cannot swap {SHADOW_SCHEMA}: foreign keys {outside} and materialized views {materialized} "
+            "would stay on the old tables"
+        )
+
+    db.execute(text(f"CREATE SCHEMA {OLD_SCHEMA}"))
+    for name in SHADOW_TABLES:
+        db.execute(text(f"ALTER TABLE {LIVE_SCHEMA}.{name} SET SCHEMA {OLD_SCHEMA}"))
+        db.execute(text(f"ALTER TABLE {SHADOW_SCHEMA}.{name} SET SCHEMA {LIVE_SCHEMA}"))
+    for view in views:
+        db.execute(text(f"CREATE OR REPLACE VIEW {view.name} AS {view.definition}"))
+    db.commit()
+    return time.perf_counter() - locked
+
+
+def drop_old(db: Session) -> None:
+    """Drop the swapped-out tables and what is left of the shadow schema (its staging tables)."""
+    db.execute(text(f"DROP SCHEMA IF EXISTS {OLD_SCHEMA} CASCADE"))
+    db.execute(text(f"DROP SCHEMA IF EXISTS {SHADOW_SCHEMA} CASCADE"))
+    db.commit()
+
+
+def abandon_shadow(db: Session) -> bool:
+    """
+    Close the shadow window of a load that will not be swapped: drop the
+    copies, so API writes to the live tables are accepted again. Commits;
+    returns True if copies were dropped (False once swapped, nothing to undo).
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SHADOW_WINDOW_LOCK})
+    found = _shadow_tables_found(db)
+    db.execute(text(f"DROP SCHEMA IF EXISTS {SHADOW_SCHEMA} CASCADE"))
+    db.commit()
+    return found > 0
+
+
+def run_shadow_prepare() -> None:
+    db = SessionLocal()
+    # No ingest may commit to the live tables while they are copied
+    locks = DatasetLocks("shadow_prepare", exclusive=DATASETS)
+    try:
+        locks.acquire()
+        started = time.perf_counter()
+        copied = prepare_shadow(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        locks.release()
+        db.close()
+
+    print(f"[shadow] {SHADOW_SCHEMA} prepared in {time.perf_counter() - started:.1f}s")
+    for name, rows in copied.items():
+        print(f"- {name}: {rows} rows copied")
+
+
+def run_shadow_swap() -> None:
+    db = SessionLocal()
+    # No ingest or export running while the tables change schema
+    locks = DatasetLocks("shadow_swap", exclusive=DATASETS)
+    try:
+        locks.acquire()
+        started = time.perf_counter()
+        finish_shadow(db)
+        db.commit()
+        built = time.perf_counter() - started
+
+        locked = swap_shadow(db)
+        try:
+            drop_old(db)
+        except Exception as e:  # published already: the next shadow_prepare drops them
+            db.rollback()
+            print(f"[shadow] old tables left in {OLD_SCHEMA}: {type(e).__name__}: {e}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        locks.release()
+        db.close()
+
+    print(f"[shadow] indexes and statistics built in {built:.1f}s, tables swapped in (locked {locked * 1000:.0f} ms)")
+
+
+def run_shadow_abandon() -> bool:
+    """on_failure of the shadow pipeline: a failed batch drops its copies and starts over next run."""
+    db = SessionLocal()
+    # No ingest may still be writing the copies
+    locks = DatasetLocks("shadow_abandon", exclusive=DATASETS)
+    try:
+        locks.acquire()
+        dropped = abandon_shadow(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        locks.release()
+        db.close()
+
+    if dropped:
+        print(f"[shadow] load failed: {SHADOW_SCHEMA} dropped, API writes accepted again; the next run starts over")
+    return dropped
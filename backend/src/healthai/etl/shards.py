@@ -0,0 +1,63 @@
+from __future__ import annotations
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Iterator, Optional
+import numpy as np
+import pandas as pd
+
+
+def get_shards() -> int:
+    """FITNESS_SHARDS worker processes for a single source file; 0 or 1 keeps the in-process path."""
+    value = int(os.getenv("FITNESS_SHARDS", "0") or 0)
+    return max(value, 1)
+
+
+def shard_ids(key_hashes: pd.Series, n_shards: int) -> np.ndarray:
+    """Shard of each row from the hex digest of its key: same key, same shard, on every run."""
+    head = key_hashes.str.slice(0, 15).map(lambda h: int(h, 16)).to_numpy(dtype="int64")
+    return head % n_shards
+
+
+class ShardSpill:
+    """
+    Rows routed to their shard, appended to one pickle stream per shard in a
+    temporary directory, so the parent holds one chunk at a time and the
+    shard workers read their rows back in file order.
+    """
+
+    def __init__(self, n_shards: int, directory: Optional[str] = None):
+        self.directory = tempfile.mkdtemp(prefix="healthai-shards-", dir=directory)
+        self.paths = [os.path.join(self.directory, f"shard-{i:03d}.pkl") for i in range(n_shards)]
+        self.rows = [0] * n_shards
+        self._files = [open(p, "wb") for p in self.paths]
+
+    def __enter__(self) -> ShardSpill:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cleanup()
+
+    def add(self, df: pd.DataFrame, shards: np.ndarray) -> None:
+        for shard, part in df.groupby(shards, sort=False):
+            pickle.dump(part, self._files[shard], protocol=pickle.HIGHEST_PROTOCOL)
+            self.rows[shard] += len(part)
+
+    def close(self) -> None:
+        for f in self._files:
+            f.close()
+
+    def cleanup(self) -> None:
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def iter_spill(path: str) -> Iterator[pd.DataFrame]:
+    """Frames written by ShardSpill for one shard, in the order they were added."""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
@@ -0,0 +1,273 @@
+from __future__ import annotations
+import hashlib
+import io
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import cached_property
+from typing import IO, Iterator, Optional
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from healthai.etl.reader import CsvSchema, ReadStats, SourceFormat, detect_format, iter_columnar, iter_csv, open_csv
+from healthai.models.qualite_run import QualiteDonneesRun
+from healthai.models.source_file import SourceFile
+
+_HASH_BLOCK = 1 << 20
+
+
+def incremental_enabled() -> bool:
+    """INGEST_INCREMENTAL=0 forces a full reload of every source (default: incremental)."""
+    return os.getenv("INGEST_INCREMENTAL", "1").strip().lower() not in ("0", "false", "no")
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    size_bytes: int
+    mtime_ns: int
+    content_hash: str
+    # sha256 of the first N bytes, for each N asked to fingerprint()
+    prefix_hashes: dict[int, str] = field(default_factory=dict)
+
+
+def fingerprint(path: str, prefixes: tuple[int, ...] = ()) -> Fingerprint:
+    """
+    Hash the file in one sequential pass.
+    The hash state is snapshotted at every offset in `prefixes`, so checking
+    that an old version is a prefix of the current file costs no extra read.
+    """
+    st = os.stat(path)
+    marks = sorted({p for p in prefixes if 0 <= p <= st.st_size})
+    h = hashlib.sha256()
+    prefix_hashes: dict[int, str] = {}
+    pos = 0
+
+    with open(path, "rb") as f:
+        for mark in [*marks, st.st_size]:
+            while pos < mark:
+                block = f.read(min(_HASH_BLOCK, mark - pos))
+                if not block:
+                    break
+                h.update(block)
+                pos += len(block)
+            if mark in marks:
+                prefix_hashes[mark] = h.hexdigest()
+
+    return Fingerprint(
+        size_bytes=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        content_hash=h.hexdigest(),
+        prefix_hashes=prefix_hashes,
+    )
+
+
+class _FileSlice(io.RawIOBase):
+    """Read-only view of bytes [start, stop) of a file."""
+
+    def __init__(self, path: str, start: int, stop: int):
+        self._f = open(path, "rb")
+        self._f.seek(start)
+        self._left = stop - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), self._left)
+        if n <= 0:
+            return 0
+        read = self._f.readinto(memoryview(b)[:n])
+        self._left -= read
+        return read
+
+    def close(self) -> None:
+        self._f.close()
+        super().close()
+
+
+@dataclass(frozen=True)
+class IngestPlan:
+    """
+    What to read from a source:
+    - full : the whole file (first ingest, rewritten file, or incremental disabled)
+    - tail : only bytes appended since the last ingest
+    - skip : nothing changed
+    The byte range is frozen when planned, so a file still growing is
+    picked up by the next run instead of being half-recorded.
+    Only plain CSV is read from an offset: compressed and columnar files
+    are reloaded in full when they change.
+    """
+
+    mode: str
+    pipeline_name: str
+    path: str
+    fingerprint: Optional[Fingerprint] = None
+    start_byte: int = 0
+    start_row: int = 0
+    previous: Optional[SourceFile] = None
+
+    @property
+    def previous_date(self) -> Optional[date]:
+        """Import date (local, as given by the ingest) of the last ingest of the file."""
+        if self.previous is None:
+            return None
+        return self.previous.ingest_date
+
+    @cached_property
+    def source_format(self) -> SourceFormat:
+        return detect_format(self.path)
+
+    def from_day_start(self) -> IngestPlan:
+        """
+        Plan re-reading what was ingested on previous_date, plus what changed
+        since: from the first byte read that day if the file only grew
+        (tail or skip), else the whole file.
+        """
+        previous = self.previous
+        # skip plans of an untouched file are not fingerprinted: the registry one still holds
+        fp = self.fingerprint or Fingerprint(previous.size_bytes, previous.mtime_ns, previous.content_hash)
+        if self.mode == "full" or not previous.day_start_byte:
+            return IngestPlan("full", self.pipeline_name, self.path, fp, previous=previous)
+        return IngestPlan(
+            "tail",
+            self.pipeline_name,
+            self.path,
+            fp,
+            start_byte=previous.day_start_byte,
+            start_row=previous.day_start_row,
+            previous=previous,
+        )
+
+    @property
+    def line_offset(self) -> int:
+        """Lines before the first parsed record: header + rows already ingested."""
+        return 1 + self.start_row if self.mode == "tail" else 0
+
+    @property
+    def first_line(self) -> int:
+        """File line of the first record read (row number for a columnar file, which has no header line)."""
+        if self.source_format.kind != "csv":
+            return 1
+        return 2 + self.start_row if self.mode == "tail" else 2
+
+    def read_kwargs(self) -> dict:
+        """Extra read_csv kwargs: the tail has no header line, reuse the file's one."""
+        if self.mode != "tail":
+            return {}
+        header = pd.read_csv(self.path, nrows=0).columns
+        return {"header": None, "names": list(header)}
+
+    @contextmanager
+    def open(self) -> Iterator[str | IO[bytes]]:
+        """The source to give to the reader: a bounded byte range, or the path if not fingerprinted."""
+        if self.fingerprint is None:
+            yield self.path
+            return
+        with io.BufferedReader(_FileSlice(self.path, self.start_byte, self.fingerprint.size_bytes)) as f:
+            yield f
+
+    def frames(
+        self,
+        schema: CsvSchema,
+        chunk_size: int | None = None,
+        stats: ReadStats | None = None,
+        **read_kwargs,
+    ) -> Iterator[pd.DataFrame]:
+        """The planned range as DataFrames, whatever the format of the file (see detect_format)."""
+        fmt = self.source_format
+        if fmt.kind != "csv":
+            yield from iter_columnar(self.path, fmt, schema, chunk_size, stats)
+            return
+        kwargs = {**schema.read_kwargs(self.path, fmt), **read_kwargs, **self.read_kwargs()}
+        with self.open() as raw, open_csv(raw, fmt) as source:
+            yield from iter_csv(source, chunk_size, stats, **kwargs)
+
+
+def plan_ingest(db: Session, pipeline_name: str, path: str) -> IngestPlan:
+    """Look up the registry entry of `path` and plan what to read (see compare_with_registry)."""
+    if not os.path.exists(path):
+        # Missing file: left to the reader, which raises its usual error
+        return IngestPlan("full", pipeline_name, path)
+
+    previous = db.execute(
+        select(SourceFile).where(SourceFile.pipeline_name == pipeline_name, SourceFile.path == path)
+    ).scalar_one_or_none()
+    return compare_with_registry(pipeline_name, path, previous)
+
+
+def compare_with_registry(pipeline_name: str, path: str, previous: Optional[SourceFile]) -> IngestPlan:
+    """
+    Compare the file with its registry entry:
+    - same size and mtime: skip without reading the file
+    - same content hash (touched only): skip
+    - old content is a prefix of a plain CSV: tail from the old end
+    - anything else: full reload
+    """
+    if not incremental_enabled() or previous is None:
+        return IngestPlan("full", pipeline_name, path, fingerprint(path), previous=previous)
+
+    st = os.stat(path)
+    if st.st_size == previous.size_bytes and st.st_mtime_ns == previous.mtime_ns:
+        return IngestPlan("skip", pipeline_name, path, previous=previous)
+
+    fp = fingerprint(path, prefixes=(previous.ingested_bytes,))
+    if fp.content_hash == previous.content_hash:
+        return IngestPlan("skip", pipeline_name, path, fp, previous=previous)
+
+    if (
+        detect_format(path).plain_csv
+        and fp.size_bytes > previous.ingested_bytes
+        and fp.prefix_hashes.get(previous.ingested_bytes) == previous.content_hash
+    ):
+        return IngestPlan(
+            "tail",
+            pipeline_name,
+            path,
+            fp,
+            start_byte=previous.ingested_bytes,
+            start_row=previous.ingested_rows,
+            previous=previous,
+        )
+
+    return IngestPlan("full", pipeline_name, path, fp, previous=previous)
+
+
+def registry_values(plan: IngestPlan, rows_read: int, import_date: date) -> dict:
+    """
+    source_file columns after reading `plan`: new fingerprint and ingested range,
+    and where the reading of `import_date` started (kept by the day's later
+    tails, which start from it or after it).
+    """
+    fp = plan.fingerprint
+    tail = plan.mode == "tail"
+    return {
+        "size_bytes": fp.size_bytes,
+        "mtime_ns": fp.mtime_ns,
+        "content_hash": fp.content_hash,
+        "ingested_bytes": fp.size_bytes,
+        "ingested_rows": rows_read + (plan.start_row if tail else 0),
+        "ingest_date": import_date,
+        "day_start_byte": plan.start_byte if tail else 0,
+        "day_start_row": plan.start_row if tail else 0,
+    }
+
+
+def record_ingest(db: Session, plan: IngestPlan, run: QualiteDonneesRun, rows_read: int, import_date: date) -> None:
+    """
+    Store the new fingerprint and ingested range, in the caller's transaction
+    so the registry never gets ahead of the loaded data.
+    A file only touched (same content) just gets its new mtime.
+    """
+    fp = plan.fingerprint
+    if fp is None:
+        return
+
+    if plan.mode == "skip":
+        plan.previous.mtime_ns = fp.mtime_ns
+        return
+
+    values = {**registry_values(plan, rows_read, import_date), "id_run": run.id_run, "updated_at": datetime.utcnow()}
+    stmt = pg_insert(SourceFile).values(pipeline_name=plan.pipeline_name, path=plan.path, **values)
+    db.execute(stmt.on_conflict_do_update(constraint="uq_source_pipeline_path", set_=values))
@@ -0,0 +1,129 @@
+from __future__ import annotations
+import io
+import os
+import time
+from dataclasses import dataclass
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# ETL_LOAD_MODE:
+# - batch : executemany INSERT ... ON CONFLICT from Python (default)
+# - copy  : COPY FROM STDIN into an unlogged staging table, then set-based merge
+LOAD_MODES = ("batch", "copy")
+
+
+def get_load_mode() -> str:
+    mode = os.getenv("ETL_LOAD_MODE", "batch").strip().lower()
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Invalid ETL_LOAD_MODE={mode!r}, expected one of {LOAD_MODES}")
+    return mode
+
+
+# Staging tables: unlogged (no WAL), loose types, truncated before every load.
+# stg_row keeps the file order for "first row wins" merges.
+STAGING_DDL = {
+    "stg_fitness_session": """
+        CREATE UNLOGGED TABLE IF NOT EXISTS stg_fitness_session (
+          stg_row bigserial,
+          age integer,
+          gender text,
+          height_m numeric,
+          experience_level text,
+          user_key_hash text,
+          weight_kg numeric,
+          max_bpm numeric,
+          avg_bpm numeric,
+          resting_bpm numeric,
+          session_duration_hours numeric,
+          calories_burned numeric,
+          workout_type text,
+          fat_percentage numeric,
+          water_intake_liters numeric,
+          workout_frequency_days_per_week numeric,
+          bmi numeric
+        )
+    """,
+    "stg_nutrition": """
+        CREATE UNLOGGED TABLE IF NOT EXISTS stg_nutrition (
+          stg_row bigserial,
+          food_item text,
+          category text,
+          calories_kcal numeric,
+          protein_g numeric,
+          carbohydrates_g numeric,
+          fat_g numeric,
+          fiber_g numeric,
+          sugars_g numeric,
+          sodium_mg numeric,
+          cholesterol_mg numeric,
+          meal_type text,
+          water_intake_ml numeric,
+          row_hash text
+        )
+    """,
+}
+
+
+@dataclass(frozen=True)
+class CopyResult:
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return f"COPY {self.table} rows={self.rows} in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s)"
+
+
+def prepare_staging(db: Session, table: str, private: bool = False) -> None:
+    """
+    Create the staging table if needed and empty it (inside the current transaction).
+    private: concurrent loaders each get a temporary copy instead, visible to their
+    connection only and dropped at commit; it shadows the shared table in the
+    search_path, so the same COPY and merge SQL apply. The shared table must
+    already exist (see create_staging).
+    """
+    if private:
+        # Emptied when prepared again in the same transaction (a batch split after a refused load)
+        db.execute(text(f"CREATE TEMP TABLE IF NOT EXISTS {table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"))
+    else:
+        db.execute(text(STAGING_DDL[table]))
+    db.execute(text(f"TRUNCATE {table}"))
+
+
+def create_staging(db: Session, table: str) -> None:
+    """Create the shared staging table if needed, without the TRUNCATE lock."""
+    db.execute(text(STAGING_DDL[table]))
+
+
+def copy_frame(db: Session, table: str, df: pd.DataFrame, columns: list[str]) -> CopyResult:
+    """
+    Stream `df[columns]` into `table` with COPY FROM STDIN (CSV format),
+    on the session's own connection so it shares the ETL transaction.
+    Missing values are written as unquoted empty fields, i.e. NULL.
+    """
+    started = time.perf_counter()
+
+    buf = io.StringIO()
+    df[columns].to_csv(buf, index=False, header=False, na_rep="")
+    buf.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    finally:
+        cursor.close()
+
+    return CopyResult(table=table, rows=len(df), seconds=time.perf_counter() - started)
+
+
+def merge(db: Session, sql: str, **params) -> int:
+    """Run one set-based INSERT ... SELECT ... ON CONFLICT and return its rowcount."""
+    return db.execute(text(sql), params).rowcount
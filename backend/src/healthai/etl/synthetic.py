@@ -0,0 +1,344 @@
+from __future__ import annotations
+import argparse
+import gzip
+import os
+from dataclasses import dataclass, fields
+from typing import Iterator, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+FORMATS = ("csv", "csv.gz", "parquet")
+
+FITNESS_COLUMNS = [
+    "Age",
+    "Gender",
+    "Weight (kg)",
+    "Height (m)",
+    "Max_BPM",
+    "Avg_BPM",
+    "Resting_BPM",
+    "Session_Duration (hours)",
+    "Calories_Burned",
+    "Workout_Type",
+    "Fat_Percentage",
+    "Water_Intake (liters)",
+    "Workout_Frequency (days/week)",
+    "Experience_Level",
+    "BMI",
+]
+
+NUTRITION_COLUMNS = [
+    "Food_Item",
+    "Category",
+    "Calories (kcal)",
+    "Protein (g)",
+    "Carbohydrates (g)",
+    "Fat (g)",
+    "Fiber (g)",
+    "Sugars (g)",
+    "Sodium (mg)",
+    "Cholesterol (mg)",
+    "Meal_Type",
+    "Water_Intake (ml)",
+]
+
+WORKOUT_TYPES = ["Strength", "Cardio", "Yoga", "HIIT"]
+FOOD_CATEGORIES = [
+    "Condiment", "Vegetable", "Grain", "Beverage", "Fruit", "Protein/Meat",
+    "Protein/Dairy", "Snack", "Dessert", "Soup", "Seafood", "Legume",
+]
+MEAL_TYPES = ["Breakfast", "Lunch", "Dinner", "Snack", "Side"]
+WATER_ML = [0, 250, 500, 240, 355, 473]
+
+# Spellings of a missing value handled by reader.NULL_TOKENS / clean_str
+NULL_TOKENS = ["", "nan", "NaN", "None", "none", "NULL", "null", " "]
+
+# Free-text columns that get stray whitespace
+_TEXT_COLUMNS = {"fitness": ["Gender", "Workout_Type"], "nutrition": ["Category", "Meal_Type"]}
+_KIND_SEED = {"fitness": 1, "nutrition": 2}
+
+
+@dataclass(frozen=True)
+class DirtyRates:
+    """
+    Share of rows (or cells for null_token) made dirty:
+    - null_token   : cell replaced by a missing-value token ("", "none", "NULL"...)
+    - whitespace   : text cell padded with spaces/tabs
+    - out_of_range : fitness Age outside 10-100, nutrition nutrient < 0
+    - zero_calories: fitness session over 15 min with Calories_Burned = 0
+    - duplicate    : row repeated right after itself
+    - malformed    : CSV line with an extra field (ignored for Parquet)
+    """
+
+    null_token: float = 0.01
+    whitespace: float = 0.02
+    out_of_range: float = 0.005
+    zero_calories: float = 0.01
+    duplicate: float = 0.02
+    malformed: float = 0.0005
+
+    @classmethod
+    def clean(cls) -> DirtyRates:
+        return cls(**{f.name: 0.0 for f in fields(cls)})
+
+
+def _format(path: str) -> str:
+    for fmt in sorted(FORMATS, key=len, reverse=True):
+        if path.endswith("." + fmt):
+            return fmt
+    raise ValueError(f"Unknown output format for {path} (expected one of {', '.join(FORMATS)})")
+
+
+# Sources
+# ---------------------------
+def _users(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    """Pool of users, drawn again and again: each one logs several sessions."""
+    gender = rng.choice(["Male", "Female"], n)
+    height = np.clip(rng.normal(np.where(gender == "Male", 1.78, 1.65), 0.09), 1.45, 2.05).round(2)
+    return pd.DataFrame(
+        {
+            "Age": rng.integers(18, 80, n).astype("float64"),
+            "Gender": gender,
+            "Height (m)": height,
+            "Experience_Level": rng.choice([1.0, 2.0, 3.0], n, p=[0.4, 0.4, 0.2]),
+            "Weight (kg)": np.clip(rng.normal(22.5 * height**2 + 5, 12), 40, 130).round(1),
+            "Workout_Frequency (days/week)": rng.integers(2, 6, n).astype("float64"),
+        }
+    )
+
+
+def _fitness_block(rng: np.random.Generator, n: int, users: pd.DataFrame) -> pd.DataFrame:
+    u = users.iloc[rng.integers(0, len(users), n)].reset_index(drop=True)
+    duration = rng.uniform(0.5, 2.0, n).round(2)
+    avg_bpm = rng.integers(120, 170, n).astype("float64")
+    weight = (u["Weight (kg)"] + rng.normal(0, 1.5, n)).round(1)
+    return pd.DataFrame(
+        {
+            "Age": u["Age"],
+            "Gender": u["Gender"],
+            "Weight (kg)": weight,
+            "Height (m)": u["Height (m)"],
+            "Max_BPM": rng.integers(160, 200, n),
+            "Avg_BPM": avg_bpm,
+            "Resting_BPM": rng.integers(50, 75, n).astype("float64"),
+            "Session_Duration (hours)": duration,
+            "Calories_Burned": (duration * avg_bpm * rng.uniform(4.5, 7.5, n)).round(),
+            "Workout_Type": rng.choice(WORKOUT_TYPES, n),
+            "Fat_Percentage": rng.uniform(10, 35, n).round(1),
+            "Water_Intake (liters)": rng.uniform(1.5, 3.7, n).round(1),
+            "Workout_Frequency (days/week)": u["Workout_Frequency (days/week)"],
+            "Experience_Level": u["Experience_Level"],
+            "BMI": (weight / u["Height (m)"] ** 2).round(2),
+        }
+    )
+
+
+def _foods(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    """Food catalog: the nutrients of a food are the same on every row."""
+    protein = rng.gamma(1.2, 5, n).round(1)
+    carbs = rng.gamma(1.1, 15, n).round(1)
+    fat = rng.gamma(1.0, 5, n).round(1)
+    return pd.DataFrame(
+        {
+            "Food_Item": [f"Synthetic Food {k:06d}" for k in range(n)],
+            "Category": rng.choice(FOOD_CATEGORIES, n),
+            "Calories (kcal)": (4 * protein + 4 * carbs + 9 * fat).round().astype("int64"),
+            "Protein (g)": protein,
+            "Carbohydrates (g)": carbs,
+            "Fat (g)": fat,
+            "Fiber (g)": rng.gamma(0.8, 2, n).round(1),
+            "Sugars (g)": rng.gamma(0.8, 5, n).round(1),
+            "Sodium (mg)": rng.gamma(0.7, 200, n).round().astype("int64"),
+            "Cholesterol (mg)": np.where(rng.random(n) < 0.6, 0, rng.gamma(1, 40, n)).round().astype("int64"),
+        }
+    )
+
+
+def _nutrition_block(rng: np.random.Generator, n: int, foods: pd.DataFrame, popularity: np.ndarray) -> pd.DataFrame:
+    df = foods.iloc[rng.choice(len(foods), n, p=popularity)].reset_index(drop=True)
+    df["Meal_Type"] = rng.choice(MEAL_TYPES, n)
+    # Half the logs use a standard glass/bottle size, the rest any amount
+    df["Water_Intake (ml)"] = np.where(rng.random(n) < 0.5, rng.choice(WATER_ML, n), rng.integers(0, 3000, n))
+    return df
+
+
+# Dirty values
+# ---------------------------
+def _make_dirty(kind: str, rng: np.random.Generator, df: pd.DataFrame, dirty: DirtyRates) -> dict[str, np.ndarray]:
+    """Apply the value-level rates in place; return the cells to null, per column."""
+    n = len(df)
+    rows = rng.random(n) < dirty.out_of_range
+    if kind == "fitness":
+        df.loc[rows, "Age"] = rng.choice([5.0, 8.0, 9.0, 101.0, 110.0, 120.0], int(rows.sum()))
+        rows = rng.random(n) < dirty.zero_calories
+        df.loc[rows, "Session_Duration (hours)"] = rng.uniform(0.5, 2.0, int(rows.sum())).round(2)
+        df.loc[rows, "Calories_Burned"] = 0.0
+    else:
+        df.loc[rows, "Protein (g)"] = -df.loc[rows, "Protein (g)"] - 1
+
+    for col in _TEXT_COLUMNS[kind]:
+        cells = rng.random(n) < dirty.whitespace
+        pads = rng.choice(["  {}", "{}  ", "\t{} "], int(cells.sum()))
+        values = df.loc[cells, col].astype(str).to_numpy()
+        df[col] = df[col].astype(object)
+        df.loc[cells, col] = [p.format(v) for p, v in zip(pads, values)]
+
+    return {col: rng.random(n) < dirty.null_token for col in df.columns}
+
+
+def _repeat_rows(rng: np.random.Generator, n: int, rate: float) -> np.ndarray:
+    """Row order where a `rate` share of rows is a copy of the row before."""
+    idx = np.arange(n)
+    dup = rng.random(n) < rate
+    dup[0] = False
+    idx[dup] -= 1
+    return idx
+
+
+def iter_blocks(
+    kind: str,
+    rows: int,
+    seed: int = 0,
+    dirty: Optional[DirtyRates] = None,
+    block_rows: int = 500_000,
+    n_entities: Optional[int] = None,
+    food_skew: float = 1.1,
+) -> Iterator[tuple[pd.DataFrame, dict[str, np.ndarray]]]:
+    """
+    Yield (frame, null cells per column) blocks totalling `rows` rows.
+    n_entities: users (fitness, default one per row, up to 10^6) or foods
+    (nutrition, default 5000), foods being picked with Zipf(food_skew) popularity.
+    Users repeat anyway: the natural key (age, gender, height, level) has
+    ~22k values, so sessions of the same day add up per key.
+    """
+    if kind not in _KIND_SEED:
+        raise ValueError(f"Unknown source kind {kind!r} (expected fitness or nutrition)")
+    dirty = dirty or DirtyRates()
+    base = np.random.default_rng([seed, _KIND_SEED[kind]])
+
+    if kind == "fitness":
+        pool = _users(base, n_entities or int(np.clip(rows, 1, 1_000_000)))
+    else:
+        pool = _foods(base, n_entities or 5000)
+        weights = 1.0 / np.arange(1, len(pool) + 1) ** food_skew
+        popularity = weights / weights.sum()
+
+    for block, start in enumerate(range(0, rows, block_rows)):
+        n = min(block_rows, rows - start)
+        rng = np.random.default_rng([seed, _KIND_SEED[kind], block])
+        if kind == "fitness":
+            df = _fitness_block(rng, n, pool)
+        else:
+            df = _nutrition_block(rng, n, pool, popularity)
+        nulls = _make_dirty(kind, rng, df, dirty)
+        if dirty.duplicate:
+            idx = _repeat_rows(rng, n, dirty.duplicate)
+            df = df.iloc[idx].reset_index(drop=True)
+            nulls = {c: m[idx] for c, m in nulls.items()}
+        yield df, nulls
+
+
+# Writers
+# ---------------------------
+def _to_csv(df: pd.DataFrame, nulls: dict[str, np.ndarray], rng: np.random.Generator, dirty: DirtyRates, header: bool) -> str:
+    out = df.copy()
+    for col, cells in nulls.items():
+        if cells.any():
+            out[col] = out[col].astype(object)
+            out.loc[cells, col] = rng.choice(NULL_TOKENS, int(cells.sum()))
+    text = out.to_csv(index=False, header=header, lineterminator="\n")
+    if not dirty.malformed:
+        return text
+
+    lines = text.split("\n")
+    first = 1 if header else 0
+    bad = np.flatnonzero(rng.random(len(df)) < dirty.malformed) + first
+    for i in bad:
+        lines[i] += ",extra"
+    return "\n".join(lines)
+
+
+def _to_arrow(df: pd.DataFrame, nulls: dict[str, np.ndarray]) -> pa.Table:
+    out = df.copy()
+    for col, cells in nulls.items():
+        if cells.any():
+            out[col] = out[col].astype(object).where(~cells, None)
+    # Text columns stay text even where dirty values made them mixed
+    return pa.Table.from_pandas(out.infer_objects(), preserve_index=False)
+
+
+def write_source(
+    kind: str,
+    path: str,
+    rows: int,
+    seed: int = 0,
+    dirty: Optional[DirtyRates] = None,
+    block_rows: int = 500_000,
+    **kwargs,
+) -> int:
+    """
+    Write a synthetic source; the format comes from the extension
+    (.csv, .csv.gz, .parquet). Returns the number of rows written.
+    """
+    fmt = _format(path)
+    dirty = dirty or DirtyRates()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    blocks = iter_blocks(kind, rows, seed, dirty, block_rows, **kwargs)
+    written = 0
+
+    if fmt == "parquet":
+        writer: Optional[pq.ParquetWriter] = None
+        try:
+            for df, nulls in blocks:
+                table = _to_arrow(df, nulls)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+                writer.write_table(table.cast(writer.schema))
+                written += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    # gzip level 6 (the gzip CLI default): level 9 is much slower for ~2% smaller files
+    opener = (lambda: gzip.open(path, "wt", encoding="utf-8", compresslevel=6, newline="")) if fmt == "csv.gz" else (
+        lambda: open(path, "w", encoding="utf-8", newline="")
+    )
+    with opener() as f:
+        for block, (df, nulls) in enumerate(blocks):
+            rng = np.random.default_rng([seed, _KIND_SEED[kind], block, 2])
+            f.write(_to_csv(df, nulls, rng, dirty, header=(block == 0)))
+            written += len(df)
+    return written
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m healthai.etl.synthetic",
+        description="Write a synthetic fitness or nutrition source with the columns of data/raw.",
+    )
+    parser.add_argument("kind", choices=sorted(_KIND_SEED))
+    parser.add_argument("path", help=f"output file ({', '.join('.' + f for f in FORMATS)})")
+    parser.add_argument("--rows", type=lambda v: int(float(v)), default=100_000, help="rows to write (1e5 - 1e8)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--block-rows", type=int, default=500_000, help="rows generated at a time (memory bound)")
+    parser.add_argument("--entities", type=int, default=None, help="users (fitness) or foods (nutrition)")
+    parser.add_argument("--clean", action="store_true", help="no dirty values at all")
+    for f in fields(DirtyRates):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=float, default=None, help=f"dirty rate (default {f.default})")
+    args = parser.parse_args(argv)
+
+    base = DirtyRates.clean() if args.clean else DirtyRates()
+    overrides = {f.name: getattr(args, f.name) for f in fields(DirtyRates) if getattr(args, f.name) is not None}
+    dirty = DirtyRates(**{**{f.name: getattr(base, f.name) for f in fields(DirtyRates)}, **overrides})
+
+    written = write_source(
+        args.kind, args.path, args.rows, args.seed, dirty, args.block_rows, n_entities=args.entities
+    )
+    print(f"[synthetic] {args.kind}: {written} rows -> {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from collections import Counter
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from healthai.models.rules import Rule
 
 @dataclass(frozen=True)
 class ValidationResult:
@@ -9,4 +13,72 @@ class ValidationResult:
 def validate_columns(actual_cols: list[str], required_cols: list[str]) -> ValidationResult:
     actual = {c.strip() for c in actual_cols}
     missing = [c for c in required_cols if c not in actual]
-    return ValidationResult(ok=(len(missing) == 0), missing_columns=missing)
\ No newline at end of file
+    return ValidationResult(ok=(len(missing) == 0), missing_columns=missing)
+
+@dataclass
+class RuleReport:
+    """
+    Rejections per rule (a row breaking two rules counts in both) and rows rejected.
+    `reasons` (rejected row index -> "rule[,rule...]") is per chunk, add() ignores it.
+    """
+
+    by_rule: Counter = field(default_factory=Counter)
+    rows_rejected: int = 0
+    reasons: pd.Series = field(default_factory=lambda: pd.Series(dtype=object))
+
+    def add(self, other: RuleReport) -> None:
+        self.by_rule.update(other.by_rule)
+        self.rows_rejected += other.rows_rejected
+
+    def as_dict(self) -> dict[str, int]:
+        return {name: n for name, n in self.by_rule.items() if n}
+
+class RuleSet:
+    """
+    Rules compiled once into bound/nullability vectors, so a frame is checked
+    in a single vectorized pass over a (rows x rules) matrix.
+    `columns` maps each rule's database column to the frame column.
+    """
+
+    def __init__(self, rules: list[Rule], columns: dict[str, str]):
+        self.rules = rules
+        self.frame_columns = [columns[r.column] for r in rules]
+        self._min = np.array([-np.inf if r.min is None else r.min for r in rules], dtype="float64")
+        self._max = np.array([np.inf if r.max is None else r.max for r in rules], dtype="float64")
+        self._nullable = np.array([r.nullable for r in rules], dtype=bool)
+        self._ranged = np.array([r.min is not None or r.max is not None for r in rules], dtype=bool)
+
+    def _matrix(self, df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """Values as float64 (NaN for non-numeric columns, only checked for nulls) and the missing mask."""
+        values = np.full((len(df), len(self.rules)), np.nan)
+        missing = np.empty((len(df), len(self.rules)), dtype=bool)
+        for j, col in enumerate(self.frame_columns):
+            s = df[col]
+            missing[:, j] = s.isna().to_numpy()
+            if self._ranged[j]:
+                values[:, j] = s.to_numpy(dtype="float64", na_value=np.nan)
+        return values, missing
+
+    def evaluate(self, df: pd.DataFrame) -> tuple[pd.DataFrame, RuleReport]:
+        """Return the rows breaking no rule and the rejection counts."""
+        if df.empty:
+            return df, RuleReport()
+
+        values, missing = self._matrix(df)
+        with np.errstate(invalid="ignore"):
+            out_of_range = (values < self._min) | (values > self._max)
+        failed = (missing & ~self._nullable) | (~missing & out_of_range)
+
+        counts = failed.sum(axis=0)
+        rejected = failed.any(axis=1)
+        names = np.array([r.name for r in self.rules], dtype=object)
+        report = RuleReport(
+            by_rule=Counter({r.name: int(n) for r, n in zip(self.rules, counts)}),
+            rows_rejected=int(rejected.sum()),
+            reasons=pd.Series(
+                [",".join(names[row]) for row in failed[rejected]],
+                index=df.index[rejected],
+                dtype=object,
+            ),
+        )
+        return df[~rejected], report
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import argparse
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+from healthai.etl import fitness_ingest, nutrition_ingest
+from healthai.etl.dag import Dag, Task
+from healthai.etl.partitions import list_sources
+
+# Ingest stages run on arrival, with the env setting and default of their source.
+# Exports stay with the nightly run_pipeline.
+WATCHED = [
+    ("nutrition_ingest", "NUTRITION_CSV", nutrition_ingest.DEFAULT_SOURCE),
+    ("fitness_ingest", "FITNESS_CSV", fitness_ingest.DEFAULT_SOURCE),
+]
+
+# Own DAG name: micro-batches keep their own checkpoints, a failed nightly batch is still resumed
+WATCH_DAG = Dag(
+    "watch",
+    [
+        Task("nutrition_ingest", nutrition_ingest.run_nutrition_ingest),
+        Task("fitness_ingest", fitness_ingest.run_fitness_ingest),
+    ],
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)) or default)
+
+
+@dataclass(frozen=True)
+class _Pending:
+    signature: tuple[int, int]  # size, mtime_ns
+    since: float  # when this signature was first seen
+    first_seen: float  # when the file first differed from the handled state
+
+
+class SourceWatcher:
+    """
+    Polls the files of one source setting (file, directory or glob) and reports
+    a micro-batch once the changed files have settled: no change for
+    `debounce` seconds, or `max_wait` seconds after the first change, so a
+    file appended to without pause is still picked up. A burst of arrivals
+    gives one batch. The ingest reads only what its registry has not seen, so
+    the first scan (every file new to the watcher) is a cheap catch-up.
+    """
+
+    def __init__(self, stage: str, spec: str, debounce: float, max_wait: float):
+        self.stage = stage
+        self.spec = spec
+        self.debounce = debounce
+        self.max_wait = max_wait
+        # state of each file when its last batch was started
+        self.handled: dict[str, tuple[int, int]] = {}
+        self.pending: dict[str, _Pending] = {}
+
+    def poll(self, now: float) -> list[str]:
+        """Files of the batch to run now (empty: nothing settled yet)."""
+        for path in list_sources(self.spec):
+            try:
+                st = os.stat(path)
+            except OSError:  # removed or renamed meanwhile
+                self.pending.pop(path, None)
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if self.handled.get(path) == signature:
+                self.pending.pop(path, None)
+                continue
+            seen = self.pending.get(path)
+            if seen is None:
+                self.pending[path] = _Pending(signature, now, now)
+            elif seen.signature != signature:
+                self.pending[path] = _Pending(signature, now, seen.first_seen)
+
+        if not self.pending:
+            return []
+        quiet = all(now - p.since >= self.debounce for p in self.pending.values())
+        overdue = any(now - p.first_seen >= self.max_wait for p in self.pending.values())
+        if not (quiet or overdue):
+            return []
+
+        batch = sorted(self.pending)
+        for path in batch:
+            self.handled[path] = self.pending.pop(path).signature
+        return batch
+
+
+def run_forever(
+    watchers: list[SourceWatcher],
+    poll_seconds: float,
+    stop: threading.Event,
+    run_batch: Optional[Callable[[list[str]], None]] = None,
+) -> None:
+    """
+    Poll until `stop` is set; each settled source runs its ingest stage. A failed
+    batch is logged and left to the next change of its files (or the nightly run).
+    """
+    run_batch = run_batch or (lambda stages: WATCH_DAG.run(stages, resume=False))
+    while not stop.is_set():
+        now = time.monotonic()
+        stages = []
+        for w in watchers:
+            batch = w.poll(now)
+            if batch:
+                print(f"[watch] {w.stage}: {len(batch)} file(s) settled: {', '.join(os.path.basename(p) for p in batch)}")
+                stages.append(w.stage)
+        if stages:
+            started = time.perf_counter()
+            try:
+                run_batch(stages)
+                print(f"[watch] micro-batch {', '.join(stages)} done in {time.perf_counter() - started:.1f}s")
+            except Exception as e:  # StageError, or the database down while recording checkpoints: keep watching
+                print(f"[watch] micro-batch failed: {type(e).__name__}: {e}")
+        stop.wait(poll_seconds)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m healthai.etl.watch",
+        description="Ingest new or appended source files a few seconds after they land.",
+    )
+    parser.add_argument("--poll", type=float, default=_env_float("WATCH_POLL_SECONDS", 2), help="seconds between scans")
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=_env_float("WATCH_DEBOUNCE_SECONDS", 5),
+        help="seconds without change before a file is ingested",
+    )
+    parser.add_argument(
+        "--max-wait",
+        type=float,
+        default=_env_float("WATCH_MAX_WAIT_SECONDS", 60),
+        help="ingest a file still changing after this many seconds",
+    )
+    args = parser.parse_args(argv)
+
+    watchers = [SourceWatcher(stage, os.getenv(env, default), args.debounce, args.max_wait) for stage, env, default in WATCHED]
+    for w in watchers:
+        print(f"[watch] {w.stage}: watching {w.spec}")
+
+    # docker stop: finish the running micro-batch, then exit
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run_forever(watchers, args.poll, stop)
+    print("[watch] stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,4 +2,11 @@ from .utilisateur import Utilisateur
 from .aliment import Aliment
 from .nutrition_log import NutritionLog
 from .session_sport import SessionSport
-from .qualite_run import QualiteDonneesRun
\ No newline at end of file
+from .qualite_run import QualiteDonneesRun
+from .source_file import SourceFile
+from .qualite_profil import QualiteColonneProfil
+from .qualite_metrique import QualiteEtapeMetrique
+from .pipeline_checkpoint import PipelineCheckpoint
+from .qualite_fichier import QualiteRunFichier
+from .ingest_checkpoint import IngestCheckpoint
+from .ingest_checkpoint_segment import IngestCheckpointSegment
@@ -1,6 +1,7 @@
-from sqlalchemy import String, Numeric, CheckConstraint
+from sqlalchemy import String, Numeric, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from ..db import Base
+from .rules import FOOD_RULES, check_constraints
 
 class Aliment(Base):
     __tablename__ = "aliment"
@@ -21,12 +22,6 @@ class Aliment(Base):
     source: Mapped[str | None] = mapped_column(String(100), nullable=True)
 
     __table_args__ = (
-        CheckConstraint("calories_kcal IS NULL OR calories_kcal >= 0", name="ck_food_cal"),
-        CheckConstraint("protein_g IS NULL OR protein_g >= 0", name="ck_food_prot"),
-        CheckConstraint("carbohydrates_g IS NULL OR carbohydrates_g >= 0", name="ck_food_carbs"),
-        CheckConstraint("fat_g IS NULL OR fat_g >= 0", name="ck_food_fat"),
-        CheckConstraint("fiber_g IS NULL OR fiber_g >= 0", name="ck_food_fiber"),
-        CheckConstraint("sugars_g IS NULL OR sugars_g >= 0", name="ck_food_sugars"),
-        CheckConstraint("sodium_mg IS NULL OR sodium_mg >= 0", name="ck_food_sodium"),
-        CheckConstraint("cholesterol_mg IS NULL OR cholesterol_mg >= 0", name="ck_food_chol"),
+        UniqueConstraint("food_item", name="uq_food_item"),
+        *check_constraints(FOOD_RULES),
     )
\ No newline at end of file
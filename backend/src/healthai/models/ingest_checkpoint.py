@@ -0,0 +1,31 @@
+from sqlalchemy import String, Integer, Text, BigInteger, JSON, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db import Base
+from datetime import datetime
+
+class IngestCheckpoint(Base):
+    __tablename__ = "ingest_checkpoint"
+
+    id_checkpoint: Mapped[int] = mapped_column(primary_key=True)
+    pipeline_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    path: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # Source range being read: a checkpoint only resumes the same content, range and chunking
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    start_byte: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    chunk_size: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # Chunks whose results are saved, and their parsed records
+    chunks_done: Mapped[int] = mapped_column(Integer, nullable=False)
+    rows_done: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # Small running state of the ingest (counters, quarantine parts...), rewritten at each checkpoint;
+    # what grows with the file is appended to ingest_checkpoint_segment
+    state: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    id_run: Mapped[int | None] = mapped_column(ForeignKey("qualite_donnees_run.id_run", ondelete="SET NULL"), nullable=True)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("pipeline_name", "path", name="uq_ingest_checkpoint_pipeline_path"),
+    )
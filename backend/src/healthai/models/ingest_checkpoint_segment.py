@@ -0,0 +1,20 @@
+from sqlalchemy import String, Integer, LargeBinary, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db import Base
+
+class IngestCheckpointSegment(Base):
+    __tablename__ = "ingest_checkpoint_segment"
+
+    id_segment: Mapped[int] = mapped_column(primary_key=True)
+    id_checkpoint: Mapped[int] = mapped_column(
+        ForeignKey("ingest_checkpoint.id_checkpoint", ondelete="CASCADE"), nullable=False
+    )
+    # Frame of the ingest state (e.g. seen keys, partial aggregates) for the chunks since the previous checkpoint
+    name: Mapped[str] = mapped_column(String(50), nullable=False)
+    chunks_done: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Arrow IPC stream
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("idx_checkpoint_segment", "id_checkpoint", "id_segment"),
+    )
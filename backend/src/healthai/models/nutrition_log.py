@@ -1,6 +1,7 @@
-from sqlalchemy import Integer, String, Date, ForeignKey, CheckConstraint, Index
+from sqlalchemy import Integer, String, Date, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from ..db import Base
+from .rules import NUTRITION_LOG_RULES, check_constraints
 
 class NutritionLog(Base):
     __tablename__ = "nutrition_log"
@@ -14,7 +15,11 @@ class NutritionLog(Base):
     meal_type: Mapped[str | None] = mapped_column(String(50), nullable=True)
     water_intake_ml: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
+    # sha256 of the source CSV row (ETL only): a reload of the same row is a no-op
+    row_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
     __table_args__ = (
-        CheckConstraint("water_intake_ml IS NULL OR water_intake_ml >= 0", name="ck_nut_water"),
+        *check_constraints(NUTRITION_LOG_RULES),
+        UniqueConstraint("row_hash", name="uq_nutrition_row_hash"),
         Index("idx_nutrition_user_date", "id_user", "log_date"),
     )
\ No newline at end of file
@@ -0,0 +1,27 @@
+from sqlalchemy import String, Integer, Float, Text, DateTime, UniqueConstraint, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db import Base
+from datetime import datetime
+
+class PipelineCheckpoint(Base):
+    __tablename__ = "pipeline_checkpoint"
+
+    id_checkpoint: Mapped[int] = mapped_column(primary_key=True)
+    # One batch = one execution of the DAG (a resumed batch keeps its id)
+    batch_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    dag_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    stage: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    # PENDING, SUCCESS, FAILED, BLOCKED (an upstream stage failed)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
+    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("batch_id", "stage", name="uq_checkpoint_batch_stage"),
+        Index("idx_checkpoint_dag_created", "dag_name", "created_at"),
+    )
@@ -0,0 +1,25 @@
+from sqlalchemy import String, Integer, Float, Text, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db import Base
+
+class QualiteRunFichier(Base):
+    __tablename__ = "qualite_run_fichier"
+
+    id_fichier: Mapped[int] = mapped_column(primary_key=True)
+    id_run: Mapped[int] = mapped_column(ForeignKey("qualite_donnees_run.id_run", ondelete="CASCADE"), nullable=False)
+    path: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # SUCCESS, FAILED (file left out of the run, retried next time) or SKIPPED (unchanged)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    ingest_mode: Mapped[str | None] = mapped_column(String(10), nullable=True)
+
+    rows_read: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rows_rejected: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duplicates_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # parse + clean time of the file
+    seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
+    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("idx_fichier_run", "id_run"),
+    )
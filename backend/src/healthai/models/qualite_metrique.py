@@ -0,0 +1,22 @@
+from sqlalchemy import String, Integer, BigInteger, Float, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db import Base
+
+class QualiteEtapeMetrique(Base):
+    __tablename__ = "qualite_etape_metrique"
+
+    id_metrique: Mapped[int] = mapped_column(primary_key=True)
+    id_run: Mapped[int] = mapped_column(ForeignKey("qualite_donnees_run.id_run", ondelete="CASCADE"), nullable=False)
+    stage: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    # totals over all the calls of the stage (one per chunk)
+    calls: Mapped[int] = mapped_column(Integer, nullable=False)
+    wall_seconds: Mapped[float] = mapped_column(Float, nullable=False)
+    cpu_seconds: Mapped[float] = mapped_column(Float, nullable=False)
+    rows_in: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    rows_out: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    peak_rss_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("id_run", "stage", name="uq_metrique_run_stage"),
+    )
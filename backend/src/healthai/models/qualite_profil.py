@@ -0,0 +1,25 @@
+from sqlalchemy import String, BigInteger, Float, JSON, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db import Base
+
+class QualiteColonneProfil(Base):
+    __tablename__ = "qualite_colonne_profil"
+
+    id_profil: Mapped[int] = mapped_column(primary_key=True)
+    id_run: Mapped[int] = mapped_column(ForeignKey("qualite_donnees_run.id_run", ondelete="CASCADE"), nullable=False)
+    column_name: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    row_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    null_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    distinct_estimate: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
+    # numeric columns only
+    min_value: Mapped[float | None] = mapped_column(Float, nullable=True)
+    max_value: Mapped[float | None] = mapped_column(Float, nullable=True)
+    mean_value: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # {"lo", "hi", "counts": [...], "under", "over"} : fixed bins, comparable between runs
+    histogram: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    __table_args__ = (
+        Index("idx_profil_run", "id_run"),
+    )
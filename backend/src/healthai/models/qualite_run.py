@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, Text, DateTime
+from sqlalchemy import String, Integer, Float, Text, DateTime, JSON
 from sqlalchemy.orm import Mapped, mapped_column
 from ..db import Base
 from datetime import datetime
@@ -11,11 +11,16 @@ class QualiteDonneesRun(Base):
     started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     ended_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     status: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    ingest_mode: Mapped[str | None] = mapped_column(String(10), nullable=True)
 
     rows_read: Mapped[int | None] = mapped_column(Integer, nullable=True)
     rows_inserted: Mapped[int | None] = mapped_column(Integer, nullable=True)
     rows_rejected: Mapped[int | None] = mapped_column(Integer, nullable=True)
     missing_values_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
     duplicates_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # rule name -> rows rejected by that rule (see models.rules)
+    rejections_by_rule: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # seconds spent queueing behind a concurrent run on the same dataset (see etl.locks)
+    lock_wait_seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
 
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
\ No newline at end of file
@@ -0,0 +1,75 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import CheckConstraint
+
+# Constraint definitions only (no pandas / numpy): the models build their
+# CheckConstraints from them, healthai.etl.validators evaluates them on frames
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One rule on one database column:
+    - min / max : inclusive bounds (None = unbounded)
+    - nullable  : False rejects missing values
+    Rules named ck_* are also the CheckConstraint of the model (see check_constraints),
+    so the ETL and the database cannot drift apart.
+    """
+
+    name: str
+    column: str
+    min: Optional[float] = None
+    max: Optional[float] = None
+    nullable: bool = True
+
+    def sql(self) -> str:
+        c = self.column
+        if self.min is not None and self.max is not None:
+            cond = f"({c} BETWEEN {self.min:g} AND {self.max:g})"
+        elif self.min is not None:
+            cond = f"{c} >= {self.min:g}"
+        elif self.max is not None:
+            cond = f"{c} <= {self.max:g}"
+        else:
+            return f"{c} IS NOT NULL"
+
+        if self.nullable:
+            return f"{c} IS NULL OR {cond}"
+        return cond.strip("()")
+
+def check_constraints(rules: list[Rule]) -> list[CheckConstraint]:
+    return [CheckConstraint(r.sql(), name=r.name) for r in rules]
+
+# Rules of the tables loaded by the ETL (the models build their CheckConstraints from them)
+USER_RULES = [
+    Rule("ck_user_age", "age", 10, 100, nullable=False),
+    Rule("ck_user_height", "height_m", 1.00, 2.50),
+]
+
+SESSION_RULES = [
+    Rule("ck_s_weight", "weight_kg", 30, 250),
+    Rule("ck_s_maxbpm", "max_bpm", 40, 220),
+    Rule("ck_s_avgbpm", "avg_bpm", 40, 220),
+    Rule("ck_s_restbpm", "resting_bpm", 30, 150),
+    Rule("ck_s_fatpct", "fat_percentage", 0, 70),
+    Rule("ck_s_freq", "workout_frequency_days_per_week", 0, 7),
+    Rule("ck_s_bmi", "bmi", 10, 60),
+    Rule("ck_s_duration", "session_duration_hours", min=0),
+    Rule("ck_s_calburn", "calories_burned", min=0),
+    Rule("ck_s_water", "water_intake_liters", min=0),
+]
+
+FOOD_RULES = [
+    Rule("ck_food_cal", "calories_kcal", min=0),
+    Rule("ck_food_prot", "protein_g", min=0),
+    Rule("ck_food_carbs", "carbohydrates_g", min=0),
+    Rule("ck_food_fat", "fat_g", min=0),
+    Rule("ck_food_fiber", "fiber_g", min=0),
+    Rule("ck_food_sugars", "sugars_g", min=0),
+    Rule("ck_food_sodium", "sodium_mg", min=0),
+    Rule("ck_food_chol", "cholesterol_mg", min=0),
+]
+
+NUTRITION_LOG_RULES = [
+    Rule("ck_nut_water", "water_intake_ml", min=0),
+]
@@ -1,6 +1,7 @@
-from sqlalchemy import Integer, String, Date, Numeric, ForeignKey, CheckConstraint, UniqueConstraint, Index
+from sqlalchemy import Integer, String, Date, Numeric, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from ..db import Base
+from .rules import SESSION_RULES, check_constraints
 
 class SessionSport(Base):
     __tablename__ = "session_sport"
@@ -29,14 +30,5 @@ class SessionSport(Base):
         UniqueConstraint("id_user", "session_date", name="uq_user_session_date"),
         Index("idx_session_user", "id_user"),
 
-        CheckConstraint("weight_kg IS NULL OR (weight_kg BETWEEN 30 AND 250)", name="ck_s_weight"),
-        CheckConstraint("max_bpm IS NULL OR (max_bpm BETWEEN 40 AND 220)", name="ck_s_maxbpm"),
-        CheckConstraint("avg_bpm IS NULL OR (avg_bpm BETWEEN 40 AND 220)", name="ck_s_avgbpm"),
-        CheckConstraint("resting_bpm IS NULL OR (resting_bpm BETWEEN 30 AND 150)", name="ck_s_restbpm"),
-        CheckConstraint("fat_percentage IS NULL OR (fat_percentage BETWEEN 0 AND 70)", name="ck_s_fatpct"),
-        CheckConstraint("workout_frequency_days_per_week IS NULL OR (workout_frequency_days_per_week BETWEEN 0 AND 7)", name="ck_s_freq"),
-        CheckConstraint("bmi IS NULL OR (bmi BETWEEN 10 AND 60)", name="ck_s_bmi"),
-        CheckConstraint("session_duration_hours IS NULL OR session_duration_hours >= 0", name="ck_s_duration"),
-        CheckConstraint("calories_burned IS NULL OR calories_burned >= 0", name="ck_s_calburn"),
-        CheckConstraint("water_intake_liters IS NULL OR water_intake_liters >= 0", name="ck_s_water"),
+        *check_constraints(SESSION_RULES),
     )
\ No newline at end of file
@@ -0,0 +1,33 @@
+from sqlalchemy import String, Text, BigInteger, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db import Base
+from datetime import date, datetime
+
+class SourceFile(Base):
+    __tablename__ = "source_file"
+
+    id_source: Mapped[int] = mapped_column(primary_key=True)
+    pipeline_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    path: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # Fingerprint of the file at the last ingest
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    # Part of the file already loaded (append-only growth resumes from there)
+    ingested_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ingested_rows: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    # Import date (local) of the last ingest and where that day's reading started: the day's
+    # later batches re-read from there what is aggregated per day (session_sport)
+    ingest_date: Mapped[date | None] = mapped_column(Date, nullable=True)
+    day_start_byte: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    day_start_row: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
+    id_run: Mapped[int | None] = mapped_column(ForeignKey("qualite_donnees_run.id_run", ondelete="SET NULL"), nullable=True)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("pipeline_name", "path", name="uq_source_pipeline_path"),
+    )
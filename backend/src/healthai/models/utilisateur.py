@@ -1,6 +1,7 @@
-from sqlalchemy import String, Integer, Numeric, CheckConstraint
+from sqlalchemy import String, Integer, Numeric, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from ..db import Base
+from .rules import USER_RULES, check_constraints
 
 class Utilisateur(Base):
     __tablename__ = "utilisateur"
@@ -11,7 +12,10 @@ class Utilisateur(Base):
     height_m: Mapped[float | None] = mapped_column(Numeric(4,2), nullable=True)
     experience_level: Mapped[str | None] = mapped_column(String(50), nullable=True)
 
+    # sha256 of the natural key (age, gender, height_m, experience_level), set by the ETL
+    user_key_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
     __table_args__ = (
-        CheckConstraint("age BETWEEN 10 AND 100", name="ck_user_age"),
-        CheckConstraint("height_m IS NULL OR (height_m BETWEEN 1.00 AND 2.50)", name="ck_user_height"),
+        UniqueConstraint("user_key_hash", name="uq_user_key_hash"),
+        *check_constraints(USER_RULES),
     )
\ No newline at end of file
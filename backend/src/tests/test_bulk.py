@@ -0,0 +1,84 @@
+"""Tests unitaires pour le module bulk (chargement par dichotomie des lots refusés)."""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pandas as pd
+from sqlalchemy.exc import DataError, IntegrityError, OperationalError
+
+from healthai.etl.bulk import describe_row_error, load_rows
+
+
+def _refused(constraint="ck_s_bmi", pgcode="23514", message='violates check constraint "ck_s_bmi"'):
+    orig = SimpleNamespace(pgcode=pgcode, diag=SimpleNamespace(constraint_name=constraint, message_primary=message))
+    return IntegrityError("INSERT ...", {}, orig)
+
+
+class TestLoadRows(unittest.TestCase):
+    """Tests de l'isolement des lignes refusées par la base."""
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.frame = pd.DataFrame({"bmi": [20, 99, 22, 23, 98, 25, 26]}, index=range(10, 17))
+        self.loaded = []
+        self.rejected = []
+        self.calls = 0
+
+    def load(self, part):
+        self.calls += 1
+        if (part["bmi"] > 60).any():
+            raise _refused()
+        self.loaded.extend(part.index)
+        return len(part)
+
+    def reject(self, rows, reason, message):
+        self.rejected.extend((i, reason, message) for i in rows.index)
+
+    def test_bad_rows_isolated_good_rows_loaded(self):
+        """Seules les lignes fautives sont écartées, avec la contrainte et le message."""
+        n = load_rows(self.db, self.frame, self.load, self.reject)
+
+        self.assertEqual(n, 5)
+        self.assertEqual(sorted(self.loaded), [10, 12, 13, 15, 16])
+        self.assertEqual([r[0] for r in self.rejected], [11, 14])
+        self.assertEqual(self.rejected[0][1:], ("ck_s_bmi", 'violates check constraint "ck_s_bmi"'))
+        # un SAVEPOINT par tentative
+        self.assertEqual(self.db.begin_nested.call_count, self.calls)
+
+    def test_clean_batch_loaded_in_one_call(self):
+        """Un lot sans erreur : une seule tentative."""
+        n = load_rows(self.db, self.frame[self.frame["bmi"] < 60], self.load, self.reject)
+
+        self.assertEqual((n, self.calls, self.rejected), (5, 1, []))
+
+    def test_fail_policy_raises(self):
+        """ETL_ROW_ERRORS=fail : l'erreur remonte, sans savepoint."""
+        with self.assertRaises(IntegrityError):
+            load_rows(self.db, self.frame, self.load, self.reject, policy="fail")
+        self.db.begin_nested.assert_not_called()
+
+    def test_connection_errors_are_not_bisected(self):
+        """Une erreur de connexion n'est pas une erreur de ligne : elle remonte."""
+        def load(part):
+            raise OperationalError("INSERT ...", {}, Exception("server closed the connection"))
+
+        with self.assertRaises(OperationalError):
+            load_rows(self.db, self.frame, load, self.reject)
+
+
+class TestDescribeRowError(unittest.TestCase):
+    """Tests du motif et du message d'une ligne refusée."""
+
+    def test_constraint_name_or_error_code(self):
+        """La contrainte violée sert de motif ; à défaut, le nom du code d'erreur."""
+        self.assertEqual(describe_row_error(_refused())[0], "ck_s_bmi")
+
+        overflow = DataError(
+            "INSERT ...", {}, SimpleNamespace(pgcode="22003", diag=SimpleNamespace(constraint_name=None, message_primary="numeric field overflow"))
+        )
+        self.assertEqual(describe_row_error(overflow), ("numeric_value_out_of_range", "numeric field overflow"))
+
+
+if __name__ == "__main__":
+    unittest.main()
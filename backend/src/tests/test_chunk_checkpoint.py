@@ -0,0 +1,104 @@
+"""Tests unitaires pour le module chunk_checkpoint (reprise d'une lecture par chunks)."""
+
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+import pandas as pd  # pylint: disable=wrong-import-position
+
+from healthai.etl.chunk_checkpoint import ChunkCheckpoint, _from_ipc, _to_ipc  # pylint: disable=wrong-import-position
+from healthai.etl.sources import Fingerprint, IngestPlan  # pylint: disable=wrong-import-position
+
+PLAN = IngestPlan("full", "fitness_ingest", "/data/fitness.csv", Fingerprint(1000, 1, "abc"))
+
+
+def _db(row, segments=()):
+    """Session factice : la ligne de checkpoint, puis ses segments (nom, données)."""
+    db = MagicMock()
+    db.execute.return_value.scalar_one_or_none.return_value = row
+    db.execute.return_value.all.return_value = list(segments)
+    return db
+
+
+def _row(**changes):
+    values = {
+        "size_bytes": 1000,
+        "content_hash": "abc",
+        "start_byte": 0,
+        "chunk_size": 100,
+        "chunks_done": 3,
+        "rows_done": 300,
+        "id_checkpoint": 1,
+        "id_run": 7,
+        "state": {"state": {"rows_rejected": 12}, "quarantine_parts": ["part-1-00000.parquet"]},
+    }
+    values.update(changes)
+    return SimpleNamespace(**values)
+
+
+class TestChunkCheckpoint(unittest.TestCase):
+    """Tests de la reprise et de la détection des checkpoints périmés."""
+
+    def setUp(self):
+        # Modèles construits sur la base mockée : les requêtes SQL ne sont pas compilées
+        for name in ("select", "delete", "insert", "pg_insert", "IngestCheckpoint", "IngestCheckpointSegment"):
+            patcher = patch(f"healthai.etl.chunk_checkpoint.{name}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_same_range_resumes_state_segments_and_quarantine(self):
+        """Même contenu, même plage, même taille de chunk : état, segments (dans l'ordre) et rejets repris."""
+        first, second = pd.DataFrame({"hash": [3, 1]}, dtype="uint64"), pd.DataFrame({"hash": [2]}, dtype="uint64")
+        segments = [("seen", _to_ipc(first)), ("stats", _to_ipc(pd.DataFrame({"n": [1]}))), ("seen", _to_ipc(second))]
+        quarantine = MagicMock()
+        checkpoint = ChunkCheckpoint(_db(_row(), segments), PLAN, 100, id_run=8)
+
+        chunks_done, state, saved = checkpoint.resume(quarantine)
+
+        self.assertEqual((chunks_done, state), (3, {"rows_rejected": 12}))
+        self.assertEqual([df["hash"].tolist() for df in saved["seen"]], [[3, 1], [2]])
+        self.assertEqual(str(saved["seen"][0]["hash"].dtype), "uint64")
+        self.assertEqual(len(saved["stats"]), 1)
+        quarantine.adopt.assert_called_once_with(7, ["part-1-00000.parquet"])
+
+    def test_stale_checkpoint_is_dropped(self):
+        """Fichier réécrit, autre taille de chunk ou état d'une autre version : on repart de zéro."""
+        for row in (_row(content_hash="def"), _row(chunk_size=50), _row(state={"rows_rejected": 12})):
+            db = _db(row)
+            quarantine = MagicMock()
+            self.assertIsNone(ChunkCheckpoint(db, PLAN, 100, id_run=8).resume(quarantine))
+            db.delete.assert_called_once_with(row)
+            quarantine.adopt.assert_not_called()
+
+    def test_disabled_without_chunks(self):
+        """Lecture du fichier entier : pas de checkpoint, la table n'est pas lue."""
+        db = _db(_row())
+        checkpoint = ChunkCheckpoint(db, PLAN, None, id_run=8, every_seconds=0)
+
+        self.assertIsNone(checkpoint.resume(MagicMock()))
+        self.assertFalse(checkpoint.due())
+        db.execute.assert_not_called()
+
+    def test_save_flushes_quarantine_and_commits(self):
+        """Le checkpoint écrit d'abord les rejets, l'état en JSON et les nouveaux segments, puis valide la transaction."""
+        db = _db(None)
+        db.execute.return_value.scalar_one.return_value = 4
+        quarantine = MagicMock(parts=["part-1-00000.parquet"])
+        checkpoint = ChunkCheckpoint(db, PLAN, 100, id_run=8, every_seconds=0)
+
+        self.assertTrue(checkpoint.due())
+        checkpoint.save(2, 200, {"rows_rejected": 5}, {"seen": pd.DataFrame({"hash": [7]}, dtype="uint64")}, quarantine)
+        quarantine.flush.assert_called_once()
+        db.commit.assert_called_once()
+        records = db.execute.call_args_list[-1].args[1]
+        self.assertEqual([(r["id_checkpoint"], r["name"], r["chunks_done"]) for r in records], [(4, "seen", 2)])
+        self.assertEqual(_from_ipc(records[0]["data"])["hash"].tolist(), [7])
+        self.assertFalse(ChunkCheckpoint(db, PLAN, 100, id_run=8, every_seconds=60).due())
+
+
+if __name__ == "__main__":
+    unittest.main()
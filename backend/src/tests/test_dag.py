@@ -0,0 +1,122 @@
+"""Tests unitaires pour le module dag."""
+
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+from sqlalchemy.exc import OperationalError
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+from healthai.etl.dag import Dag, Task  # pylint: disable=wrong-import-position
+from healthai.etl.parallel import StageError  # pylint: disable=wrong-import-position
+
+
+class MemoryStore:
+    """Checkpoints en mémoire, même interface que CheckpointStore."""
+
+    def __init__(self):
+        self.batches = {}
+
+    def resume(self, dag_name, stages):
+        if not self.batches:
+            return None
+        batch_id, statuses = list(self.batches.items())[-1]
+        done = {s for s, st in statuses.items() if st == "SUCCESS"}
+        if set(statuses) != set(stages) or done == set(stages):
+            return None
+        return batch_id, done
+
+    def start(self, dag_name, stages):
+        batch_id = f"b{len(self.batches)}"
+        self.batches[batch_id] = {s: "PENDING" for s in stages}
+        return batch_id
+
+    def record(self, batch_id, result, status):
+        self.batches[batch_id][result.name] = status
+
+    def discard(self, batch_id):
+        statuses = self.batches[batch_id]
+        statuses.update({s: "DISCARDED" for s, st in statuses.items() if st == "SUCCESS"})
+
+
+class TestDag(unittest.TestCase):
+    """Tests de l'ordonnancement, des reprises et des relances."""
+
+    def setUp(self):
+        self.calls = []
+
+    def _task(self, name, deps=(), fail=(), retries=0):
+        fail = list(fail)
+        def fn():
+            self.calls.append(name)
+            if fail:
+                raise fail.pop(0)
+
+        return Task(name, fn, deps=deps, retries=retries, backoff_seconds=0)
+
+    def test_order_and_subset(self):
+        """Ordre topologique ; un sous-ensemble n'ajoute ses dépendances qu'avec with_deps."""
+        dag = Dag("t", [self._task("export", deps=("a", "b")), self._task("a"), self._task("b")])
+        self.assertEqual(dag.order, ["a", "b", "export"])
+        self.assertEqual(dag.select(["export"]), ["export"])
+        self.assertEqual(dag.select(["export"], with_deps=True), ["a", "b", "export"])
+        with self.assertRaises(ValueError):
+            dag.select(["unknown"])
+
+    def test_cycle_rejected(self):
+        """Un cycle de dépendances est refusé à la déclaration."""
+        with self.assertRaises(ValueError):
+            Dag("t", [self._task("a", deps=("b",)), self._task("b", deps=("a",))])
+
+    def test_failure_blocks_downstream_and_resume_skips_done(self):
+        """Une étape en échec bloque l'aval ; la relance reprend après les étapes réussies."""
+        store = MemoryStore()
+        failing = [ValueError("bad file")]
+        dag = Dag("t", [self._task("a"), self._task("b", fail=failing), self._task("c", deps=("b",))])
+
+        with self.assertRaises(StageError) as ctx:
+            dag.run(store=store, workers=1)
+        self.assertEqual([r.name for r in ctx.exception.failed], ["b", "c"])
+        self.assertEqual(store.batches["b0"], {"a": "SUCCESS", "b": "FAILED", "c": "BLOCKED"})
+
+        self.calls.clear()
+        dag.run(store=store, workers=1)
+        self.assertEqual(self.calls, ["b", "c"])
+        self.assertEqual(set(store.batches["b0"].values()), {"SUCCESS"})
+
+    def test_undone_batch_is_run_again_from_the_start(self):
+        """on_failure qui annule le travail du lot : la relance refait aussi les étapes réussies."""
+        store = MemoryStore()
+        tasks = [self._task("a"), self._task("b", fail=[ValueError("bad file")])]
+
+        with self.assertRaises(StageError):
+            Dag("t", tasks, on_failure=lambda: False).run(store=store, workers=1)
+        self.assertEqual(store.batches["b0"]["a"], "SUCCESS")
+
+        store = MemoryStore()
+        tasks = [self._task("a"), self._task("b", fail=[ValueError("bad file")])]
+        with self.assertRaises(StageError):
+            Dag("t", tasks, on_failure=lambda: True).run(store=store, workers=1)
+        self.assertEqual(store.batches["b0"], {"a": "DISCARDED", "b": "FAILED"})
+
+        self.calls.clear()
+        Dag("t", tasks).run(store=store, workers=1)
+        self.assertEqual(self.calls, ["a", "b"])
+
+    def test_transient_errors_are_retried(self):
+        """Les erreurs de connexion sont relancées, les autres échouent tout de suite."""
+        transient = [OperationalError("SELECT 1", {}, Exception("server closed the connection"))]
+        dag = Dag("t", [self._task("a", fail=transient, retries=2)])
+        results = dag.run(store=MemoryStore(), workers=1)
+        self.assertEqual(results[0].value, 2)
+
+        dag = Dag("t", [self._task("a", fail=[ValueError("bad")], retries=2)])
+        with self.assertRaises(StageError):
+            dag.run(store=MemoryStore(), workers=1)
+        self.assertEqual(self.calls.count("a"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Tests unitaires pour le module dedupe."""
+
+import unittest
+
+import pandas as pd
+
+from healthai.etl.dedupe import KeyHashDeduper, content_hashes
+
+
+class TestKeyHashDeduper(unittest.TestCase):
+    """Tests du dédoublonnage par hash conservé entre chunks."""
+
+    def test_drops_duplicates_within_and_across_chunks(self):
+        """Une clé déjà vue dans un chunk précédent doit être écartée."""
+        deduper = KeyHashDeduper(["Food_Item", "Water_Intake (ml)"])
+
+        first = pd.DataFrame(
+            {"Food_Item": ["Banana", "Banana", "Rice"], "Water_Intake (ml)": [0, 0, 250]}
+        )
+        second = pd.DataFrame(
+            {"Food_Item": ["Rice", "Apple"], "Water_Intake (ml)": [250.0, None]}
+        )
+
+        kept_first = deduper.drop_duplicates(first)
+        kept_second = deduper.drop_duplicates(second)
+
+        self.assertEqual(kept_first["Food_Item"].tolist(), ["Banana", "Rice"])
+        self.assertEqual(kept_second["Food_Item"].tolist(), ["Apple"])
+        self.assertEqual(len(deduper), 3)
+
+    def test_matches_pandas_drop_duplicates_on_whole_frame(self):
+        """Par chunks, le résultat doit être identique à drop_duplicates."""
+        df = pd.DataFrame(
+            {
+                "Gender": ["Male", "Female", "Male", None, None, "Female", "Male"],
+                "Age": [30, 40, 30, 25, 25, 41, 30],
+            }
+        )
+        deduper = KeyHashDeduper(["Gender", "Age"])
+
+        kept = pd.concat(
+            [deduper.drop_duplicates(df.iloc[i : i + 2]) for i in range(0, len(df), 2)]
+        )
+
+        pd.testing.assert_frame_equal(kept, df.drop_duplicates(subset=["Gender", "Age"]))
+
+    def test_state_stays_a_few_sorted_runs(self):
+        """Beaucoup de petits chunks : peu de runs triés, aucune clé perdue ni comptée deux fois."""
+        deduper = KeyHashDeduper(["Id"])
+        kept = 0
+        for start in range(0, 5000, 50):
+            # chaque chunk répète la moitié du précédent
+            chunk = pd.DataFrame({"Id": range(max(start - 25, 0), start + 50)})
+            kept += len(deduper.drop_duplicates(chunk))
+
+        self.assertEqual(kept, 5000)
+        self.assertEqual(len(deduper), 5000)
+        runs = deduper._runs  # pylint: disable=protected-access
+        self.assertLessEqual(len(runs), 13)
+        for run in runs:
+            self.assertTrue((run[1:] > run[:-1]).all())
+        self.assertTrue(all(len(a) > 2 * len(b) for a, b in zip(runs, runs[1:])))
+
+
+class TestContentHashes(unittest.TestCase):
+    """Tests du hash de contenu stocké en base."""
+
+    def test_hash_does_not_depend_on_dtype(self):
+        """float32 / float64 / catégorie : même ligne, même hash."""
+        a = pd.DataFrame({"Food_Item": ["Banana"], "Category": ["Fruit"], "Fat (g)": [14.31]})
+        b = a.astype({"Category": "category", "Fat (g)": "float32"})
+
+        self.assertEqual(content_hashes(a, list(a.columns)).tolist(), content_hashes(b, list(b.columns)).tolist())
+
+    def test_hash_changes_with_content_and_handles_missing(self):
+        """Une valeur différente ou manquante change le hash."""
+        df = pd.DataFrame({"Food_Item": ["Banana", "Banana", "Banana"], "Fat (g)": [1.0, 2.0, None]})
+        hashes = content_hashes(df, ["Food_Item", "Fat (g)"])
+
+        self.assertEqual(hashes.nunique(), 3)
+        self.assertEqual(len(hashes.iloc[0]), 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
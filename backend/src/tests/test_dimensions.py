@@ -0,0 +1,155 @@
+"""Tests unitaires pour le module dimensions (résolution des utilisateurs et aliments)."""
+
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Mock de la base et des modèles AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+sys.modules.setdefault("healthai.models.utilisateur", MagicMock())
+sys.modules.setdefault("healthai.models.aliment", MagicMock())
+
+import pandas as pd  # pylint: disable=wrong-import-position
+
+from healthai.etl import dimensions  # pylint: disable=wrong-import-position
+from healthai.etl.dimensions import (  # pylint: disable=wrong-import-position
+    load_user_key_map,
+    resolve_food_ids,
+    resolve_user_ids,
+    user_key_hashes,
+)
+
+
+def _users(rows):
+    return pd.DataFrame(rows, columns=["age", "gender", "height_m", "experience_level"])
+
+
+def _result(rows):
+    """Résultat factice d'un db.execute : .all() et .tuples().all() renvoient `rows`."""
+    result = MagicMock()
+    result.all.return_value = rows
+    result.tuples.return_value.all.return_value = rows
+    return result
+
+
+def _db(*results):
+    db = MagicMock()
+    db.execute.side_effect = [_result(r) for r in results]
+    return db
+
+
+@patch.multiple(dimensions, select=MagicMock(), update=MagicMock(), pg_insert=MagicMock(), Utilisateur=MagicMock())
+class TestUserKeys(unittest.TestCase):
+    """Tests de la clé naturelle des utilisateurs."""
+
+    def test_hash_normalizes_spaces_types_and_height(self):
+        """Espaces, âge flottant et taille au-delà du centimètre : même clé."""
+        a = _users([(30, "Male", 1.7, "2")])
+        b = _users([(30.0, " Male ", 1.7000001, "2 ")])
+        c = _users([(30, "Male", 1.71, "2")])
+
+        self.assertEqual(user_key_hashes(a).iloc[0], user_key_hashes(b).iloc[0])
+        self.assertNotEqual(user_key_hashes(a).iloc[0], user_key_hashes(c).iloc[0])
+
+    def test_missing_parts_hash_as_empty(self):
+        """Taille ou niveau manquant : hash stable, différent d'une valeur renseignée."""
+        users = _users([(30, "Male", None, None), (30, "Male", None, None), (30, "Male", 1.7, None)])
+        hashes = user_key_hashes(users)
+
+        self.assertEqual(hashes.iloc[0], hashes.iloc[1])
+        self.assertNotEqual(hashes.iloc[0], hashes.iloc[2])
+
+    def test_key_map_repairs_stale_and_shared_hashes(self):
+        """Hash absent ou périmé corrigé ; clé partagée : le plus ancien utilisateur garde le hash."""
+        key = user_key_hashes(_users([(30, "Male", 1.7, "2")])).iloc[0]
+        other = user_key_hashes(_users([(45, "Female", 1.65, "1")])).iloc[0]
+        db = _db(
+            [
+                (1, key, 30, "Male", 1.7, "2"),  # à jour
+                (2, "stale", 45, "Female", 1.65, "1"),  # modifié via l'API
+                (3, None, 30, "Male", 1.7, "2"),  # même clé que 1, sans hash : inchangé
+            ],
+            [],
+            [],
+        )
+
+        known = load_user_key_map(db)
+
+        self.assertEqual(known, {key: 1, other: 2})
+        cleared, fixed = (c.args[1] for c in db.execute.call_args_list[1:])
+        self.assertEqual(cleared, [{"id_user": 2, "user_key_hash": None}])
+        self.assertEqual(fixed, [{"id_user": 2, "user_key_hash": other}])
+
+    def test_key_map_without_users_runs_one_query(self):
+        """Table vide : une seule requête, aucune mise à jour."""
+        db = _db([])
+        self.assertEqual(load_user_key_map(db), {})
+        self.assertEqual(db.execute.call_count, 1)
+
+    def test_resolve_inserts_missing_users_once_and_reselects_raced_keys(self):
+        """Clés nouvelles insérées une fois ; clé créée entre-temps par un autre run relue."""
+        users = _users(
+            [(30, "Male", 1.7, "2"), (45, "Female", 1.65, "1"), (45, "Female", 1.65, "1"), (50, "Male", 1.8, "3")]
+        )
+        hashes = user_key_hashes(users)
+        known, new, raced = hashes.iloc[0], hashes.iloc[1], hashes.iloc[3]
+        db = _db([(known, 1)], [(new, 11)], [(raced, 12)])
+
+        with patch.object(dimensions, "load_user_key_map") as key_map:
+            ids = resolve_user_ids(db, users)
+
+        # Seules les clés des lignes sont relues, pas toute la table
+        key_map.assert_not_called()
+        self.assertEqual(db.execute.call_args_list[0].args[1], {"hashes": [known, new, raced]})
+        self.assertEqual(ids.tolist(), [1, 11, 11, 12])
+        self.assertEqual(str(ids.dtype), "int64")
+        records = db.execute.call_args_list[1].args[1]
+        self.assertEqual([r["user_key_hash"] for r in records], [new, raced])
+        self.assertEqual(records[0]["age"], 45)
+
+    def test_resolve_known_users_only_reads(self):
+        """Tous les utilisateurs connus : aucune insertion."""
+        users = _users([(30, "Male", 1.7, "2")])
+        db = _db([(user_key_hashes(users).iloc[0], 7)])
+
+        ids = resolve_user_ids(db, users)
+
+        self.assertEqual(ids.tolist(), [7])
+        self.assertEqual(db.execute.call_count, 1)
+
+
+@patch.multiple(dimensions, select=MagicMock(), pg_insert=MagicMock(), Aliment=MagicMock())
+class TestResolveFoodIds(unittest.TestCase):
+    """Tests de la résolution des aliments."""
+
+    @staticmethod
+    def _foods(names, calories):
+        foods = pd.DataFrame({c: [None] * len(names) for c in dimensions.FOOD_COLUMNS})
+        foods["food_item"] = names
+        foods["calories_kcal"] = calories
+        return foods
+
+    def test_existing_new_and_raced_foods(self):
+        """Aliments existants lus, nouveaux créés depuis leur première ligne, concurrents relus."""
+        foods = self._foods(["Apple", "Rice", "Rice", "Bread"], [52.0, 130.0, 999.0, 265.0])
+        db = _db([("Apple", 1)], [("Rice", 2)], [("Bread", 3)])
+
+        ids = resolve_food_ids(db, foods, source="kaggle")
+
+        self.assertEqual(ids, {"Apple": 1, "Rice": 2, "Bread": 3})
+        self.assertEqual(db.execute.call_args_list[0].args[1], {"names": ["Apple", "Rice", "Bread"]})
+        records = db.execute.call_args_list[1].args[1]
+        self.assertEqual([r["food_item"] for r in records], ["Rice", "Bread"])
+        self.assertEqual(records[0]["calories_kcal"], 130.0)
+        self.assertEqual({r["source"] for r in records}, {"kaggle"})
+        self.assertEqual(db.execute.call_count, 3)
+
+    def test_no_food_no_query(self):
+        """Frame vide : aucune requête."""
+        db = MagicMock()
+        self.assertEqual(resolve_food_ids(db, self._foods([], []), source="kaggle"), {})
+        db.execute.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
 """Tests unitaires pour le module fitness_ingest."""
 
+import json
 import sys
 import unittest
+from datetime import date
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 # Mock des dépendances externes AVANT import du module testé.
@@ -11,11 +14,27 @@ sys.modules["healthai.models.utilisateur"] = MagicMock()
 
 import pandas as pd  # pylint: disable=wrong-import-position
 
+from healthai.etl.chunk_checkpoint import _from_ipc, _to_ipc  # pylint: disable=wrong-import-position
+from healthai.etl.dimensions import USER_COLUMNS, user_key_hashes  # pylint: disable=wrong-import-position
+from healthai.etl.metrics import RunMetrics  # pylint: disable=wrong-import-position
+from healthai.etl.reader import ReadStats  # pylint: disable=wrong-import-position
+from healthai.etl.sources import IngestPlan  # pylint: disable=wrong-import-position
 from healthai.etl.fitness_ingest import (  # pylint: disable=wrong-import-position
+    REQUIRED_COLS,
+    SESSION_COLUMNS,
+    _ChunkState,
+    _aggregate_sessions,
+    _clean_frame,
     _clean_str,
+    _consume_chunk,
+    _finalize_sessions,
+    _load_sessions_copy,
     _mean_or_none,
     _mode_or_none,
+    _same_day_plans,
+    _shard_keys,
     _to_num,
+    _user_keys,
     run_fitness_ingest,
 )
 
@@ -78,6 +97,235 @@ class TestFitnessHelpers(unittest.TestCase):
         result = _mode_or_none(df, "Workout_Type")
         self.assertIsNone(result)
 
+    def test_aggregate_sessions_builds_one_row_per_user_key(self):
+        """_aggregate_sessions doit agréger chaque clé utilisateur en une seule ligne."""
+        df = pd.DataFrame(
+            {
+                "Age": [30.0, 30.0, 30.0, 45.0],
+                "Gender": ["Male", "Male", "Male", "Female"],
+                "Height (m)": [1.80, 1.80, 1.80, 1.65],
+                "Experience_Level": ["2.0", "2.0", "2.0", "UNKNOWN"],
+                "Weight (kg)": [80.0, 82.0, 84.0, 60.0],
+                "Max_BPM": [170.0, 180.0, None, 160.0],
+                "Avg_BPM": [140.0, 151.0, None, 130.0],
+                "Resting_BPM": [60.0, 61.0, 62.0, None],
+                "Session_Duration (hours)": [1.0, 0.5, 1.5, 1.0],
+                "Calories_Burned": [500.0, None, 700.0, 400.0],
+                "Workout_Type": ["Yoga", "Cardio", "Cardio", None],
+                "Fat_Percentage": [20.0, 22.0, 24.0, 30.0],
+                "Water_Intake (liters)": [2.0, 2.5, 3.0, 1.5],
+                "Workout_Frequency (days/week)": [3.0, 4.2, 4.0, None],
+                "BMI": [24.0, 25.0, 26.0, 22.0],
+            }
+        )
+
+        result = _aggregate_sessions(df).set_index("Age")
+
+        self.assertEqual(len(result), 2)
+        male = result.loc[30.0]
+        self.assertEqual(male["weight_kg"], 82.0)
+        self.assertEqual(male["max_bpm"], 180)
+        self.assertEqual(male["avg_bpm"], 145)
+        self.assertEqual(male["session_duration_hours"], 3.0)
+        self.assertEqual(male["calories_burned"], 1200.0)
+        self.assertEqual(male["workout_type"], "Cardio")
+        self.assertEqual(male["workout_frequency_days_per_week"], 4)
+
+        female = result.loc[45.0]
+        self.assertTrue(pd.isna(female["resting_bpm"]))
+        self.assertTrue(pd.isna(female["workout_type"]))
+        self.assertTrue(pd.isna(female["workout_frequency_days_per_week"]))
+
+    def test_raw_keys_of_one_user_give_one_session(self):
+        """Âge et taille bruts différents mais même utilisateur en base : une seule session agrégée."""
+        raw = pd.DataFrame({c: ["1"] * 3 for c in REQUIRED_COLS})
+        raw["Age"] = ["30", "30.4", "31"]
+        raw["Gender"] = ["Male", "Male", "Male"]
+        raw["Height (m)"] = ["1.701", "1.704", "1.701"]
+        raw["Experience_Level"] = ["2", "2", "2"]
+        raw["Calories_Burned"] = ["300", "500", "400"]
+        raw["Session_Duration (hours)"] = ["0.5", "1.0", "1.0"]
+
+        sessions = _aggregate_sessions(_clean_frame(raw))
+        hashes = user_key_hashes(_user_keys(sessions))
+
+        # Une ligne par id_user : jamais deux fois le même utilisateur dans un INSERT ... ON CONFLICT
+        self.assertEqual(len(sessions), 2)
+        self.assertTrue(hashes.is_unique)
+        first = sessions.set_index("Age").loc[30.0]
+        self.assertAlmostEqual(first["Height (m)"], 1.70, places=5)
+        self.assertEqual(first["calories_burned"], 800.0)
+        self.assertEqual(first["session_duration_hours"], 1.5)
+
+    def test_shard_keys_match_the_loaded_user_keys(self):
+        """La clé de shard des lignes brutes est celle de l'utilisateur chargé après nettoyage."""
+        raw = pd.DataFrame({c: ["1"] * 4 for c in REQUIRED_COLS})
+        raw["Age"] = ["30", "30.0", "30", "abc"]
+        raw["Gender"] = ["Male", " Male ", "Male", "Male"]
+        raw["Height (m)"] = ["1.701", "1.704", "1.80", "1.70"]
+        raw["Experience_Level"] = ["2", "2", "2", None]
+
+        shard_hashes = user_key_hashes(_shard_keys(raw.copy()))
+        cleaned = _clean_frame(raw.copy())
+        loaded_hashes = user_key_hashes(_user_keys(cleaned.iloc[:3]))
+
+        # Même utilisateur après arrondi de la taille et nettoyage des espaces : même shard
+        self.assertEqual(shard_hashes.iloc[0], shard_hashes.iloc[1])
+        self.assertNotEqual(shard_hashes.iloc[0], shard_hashes.iloc[2])
+        self.assertEqual(shard_hashes.iloc[:3].tolist(), loaded_hashes.tolist())
+
+
+class TestChunkStateCheckpoint(unittest.TestCase):
+    """Tests de l'état sauvegardé par checkpoint : JSON + segments Arrow des chunks depuis le précédent."""
+
+    @staticmethod
+    def _chunks():
+        raw = pd.DataFrame({c: ["1"] * 8 for c in REQUIRED_COLS})
+        raw["Age"] = ["30", "30", "45", "30", "45", "52", "30", "200"]
+        raw["Gender"] = ["Male", "Male", "Female", "Male", "Female", "Male", "Male", "Male"]
+        raw["Height (m)"] = ["1.80", "1.80", "1.65", "1.80", "1.65", "1.75", "1.80", "1.80"]
+        raw["Calories_Burned"] = ["500", "500", "400", "300", "350", "600", "200", "100"]
+        raw["Workout_Type"] = ["Yoga", "Yoga", "Cardio", "HIIT", "Cardio", None, "HIIT", "Yoga"]
+        return [_clean_frame(raw.iloc[i:i + 2].copy()) for i in range(0, 8, 2)]
+
+    @staticmethod
+    def _consume(state, chunks):
+        for df in chunks:
+            _consume_chunk(state, df, ReadStats(), RunMetrics("fitness_ingest"), MagicMock(), None)
+
+    def test_resumed_state_gives_the_same_sessions(self):
+        """Reprise après deux checkpoints : mêmes sessions, doublons et rejets qu'une lecture d'une traite."""
+        chunks = self._chunks()
+        straight = _ChunkState()
+        self._consume(straight, chunks)
+
+        crashed = _ChunkState()
+        crashed.track_changes()
+        segments = {}
+        for start, done in ((0, 1), (1, 3)):
+            self._consume(crashed, chunks[start:done])
+            state, new = crashed.checkpoint()
+            state = json.loads(json.dumps(state))
+            for name, df in new.items():
+                segments.setdefault(name, []).append(_from_ipc(_to_ipc(df)))
+
+        resumed = _ChunkState.restore(state, segments)
+        self._consume(resumed, chunks[3:])
+
+        # Chaque checkpoint n'écrit que les clés vues depuis le précédent
+        self.assertEqual([len(df) for df in segments["seen"]], [1, 4])
+        self.assertEqual((resumed.duplicates, resumed.rows_rejected), (straight.duplicates, straight.rows_rejected))
+        self.assertEqual(resumed.rules_report.as_dict(), straight.rules_report.as_dict())
+        self.assertEqual(resumed.profiler.records(), straight.profiler.records())
+        pd.testing.assert_frame_equal(
+            _finalize_sessions(resumed.partials).astype(object),
+            _finalize_sessions(straight.partials).astype(object),
+        )
+
+
+class TestLoadSessionsCopy(unittest.TestCase):
+    """Tests du chargement par COPY vers la table de staging."""
+
+    @patch("healthai.etl.fitness_ingest.merge")
+    @patch("healthai.etl.fitness_ingest.copy_frame")
+    @patch("healthai.etl.fitness_ingest.prepare_staging")
+    @patch("healthai.etl.fitness_ingest.load_user_key_map")
+    def test_staged_frame_and_column_order(self, mock_key_map, mock_prepare, mock_copy, mock_merge):
+        """Une ligne par session : clé utilisateur, hash puis colonnes de session, dans l'ordre du COPY."""
+        raw = pd.DataFrame({c: ["1"] * 2 for c in REQUIRED_COLS})
+        raw["Age"] = ["30", "45"]
+        raw["Gender"] = ["Male", "Female"]
+        raw["Height (m)"] = ["1.80", "1.65"]
+        raw["Experience_Level"] = ["2", None]
+        raw["Calories_Burned"] = ["500", "400"]
+        sessions = _aggregate_sessions(_clean_frame(raw))
+        db = MagicMock()
+        mock_merge.return_value = 2
+
+        loaded = _load_sessions_copy(db, sessions, pd.Timestamp("2026-10-18").date(), private=True)
+
+        self.assertEqual(loaded, 2)
+        # Hashes réparés une fois par run, pas à chaque chargement
+        mock_key_map.assert_not_called()
+        mock_prepare.assert_called_once_with(db, "stg_fitness_session", private=True)
+        _, table, staged, columns = mock_copy.call_args.args
+        self.assertEqual(table, "stg_fitness_session")
+        self.assertEqual(columns, [*USER_COLUMNS, "user_key_hash", *SESSION_COLUMNS])
+        self.assertEqual(len(staged), 2)
+        self.assertEqual(staged["age"].tolist(), [30, 45])
+        self.assertEqual(staged["experience_level"].tolist(), ["2", "UNKNOWN"])
+        self.assertEqual(staged["user_key_hash"].tolist(), user_key_hashes(staged[USER_COLUMNS]).tolist())
+        self.assertEqual(staged["calories_burned"].tolist(), [500.0, 400.0])
+
+        # Utilisateurs d'abord, puis sessions à la date d'import
+        self.assertEqual(len(mock_merge.call_args_list), 2)
+        self.assertIn("INSERT INTO utilisateur", mock_merge.call_args_list[0].args[1])
+        self.assertIn("INSERT INTO session_sport", mock_merge.call_args_list[1].args[1])
+        self.assertEqual(str(mock_merge.call_args_list[1].kwargs["session_date"]), "2026-10-18")
+
+
+class TestSameDayPlans(unittest.TestCase):
+    """Tests de la relecture des fichiers déjà chargés le jour même."""
+
+    TODAY = date(2026, 10, 18)
+
+    def _plan(self, path, mode, loaded_on=None, day_start=(0, 0)):
+        previous = None
+        if loaded_on is not None:
+            previous = SimpleNamespace(
+                size_bytes=100,
+                mtime_ns=1,
+                content_hash="h",
+                ingest_date=loaded_on,
+                day_start_byte=day_start[0],
+                day_start_row=day_start[1],
+            )
+        return IngestPlan(mode, "fitness_ingest", path, previous=previous)
+
+    def test_second_micro_batch_of_the_day_reads_the_first_again(self):
+        """Deux micro-batchs le même jour : le fichier du premier est relu avec le nouveau."""
+        first = _same_day_plans([self._plan("a.csv", "full")], self.TODAY)
+        self.assertEqual([p.mode for p in first], ["full"])
+
+        second = _same_day_plans(
+            [
+                self._plan("a.csv", "skip", loaded_on=self.TODAY),
+                self._plan("b.csv", "full"),
+                self._plan("old.csv", "skip", loaded_on=date(2026, 10, 17)),
+            ],
+            self.TODAY,
+        )
+
+        # Sessions du jour agrégées sur a et b ; old.csv appartient aux sessions de la veille
+        self.assertEqual([(p.path, p.mode) for p in second], [("a.csv", "full"), ("b.csv", "full"), ("old.csv", "skip")])
+
+    def test_tail_of_the_day_is_read_in_full(self):
+        """Fin ajoutée le jour même : fichier relu en entier ; la veille : seule la fin est lue."""
+        plans = _same_day_plans(
+            [self._plan("a.csv", "tail", loaded_on=self.TODAY), self._plan("b.csv", "tail", loaded_on=date(2026, 10, 17))],
+            self.TODAY,
+        )
+        self.assertEqual([p.mode for p in plans], ["full", "tail"])
+
+    def test_file_of_yesterday_is_read_from_the_first_byte_of_the_day(self):
+        """Fichier chargé la veille puis prolongé aujourd'hui : relu depuis le premier octet du jour."""
+        plans = _same_day_plans(
+            [
+                self._plan("a.csv", "tail", loaded_on=self.TODAY, day_start=(40, 2)),
+                self._plan("b.csv", "skip", loaded_on=self.TODAY, day_start=(60, 3)),
+                self._plan("c.csv", "full", loaded_on=self.TODAY, day_start=(60, 3)),
+            ],
+            self.TODAY,
+        )
+        self.assertEqual([(p.mode, p.start_byte, p.start_row) for p in plans], [("tail", 40, 2), ("tail", 60, 3), ("full", 0, 0)])
+        # Plan skip sans empreinte : celle du registre est reprise
+        self.assertEqual(plans[1].fingerprint.size_bytes, 100)
+
+    def test_nothing_changed_reads_nothing(self):
+        """Aucun fichier modifié : rien n'est relu, même chargé le jour même."""
+        plans = _same_day_plans([self._plan("a.csv", "skip", loaded_on=self.TODAY)], self.TODAY)
+        self.assertEqual([p.mode for p in plans], ["skip"])
+
 
 class TestRunFitnessIngest(unittest.TestCase):
     """Tests unitaires de la fonction principale run_fitness_ingest."""
@@ -87,9 +335,11 @@ class TestRunFitnessIngest(unittest.TestCase):
     @patch("healthai.etl.fitness_ingest.validate_columns")
     @patch("healthai.etl.fitness_ingest.pd.read_csv")
     @patch("healthai.etl.fitness_ingest.SessionLocal")
+    @patch("healthai.etl.fitness_ingest.load_user_key_map")
     # pylint: disable=too-many-arguments
     def test_run_fitness_ingest_fails_when_columns_are_missing(
         self,
+        _mock_key_map,
         mock_session_local,
         mock_read_csv,
         mock_validate_columns,
@@ -0,0 +1,101 @@
+"""Tests unitaires pour le module locks (verrous consultatifs PostgreSQL)."""
+
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+from healthai.etl.locks import DatasetLocks, LockTimeout, lock_key  # pylint: disable=wrong-import-position
+
+
+def _engine(granted):
+    """Moteur factice : pg_try_advisory_lock* renvoie les valeurs de `granted` dans l'ordre."""
+    conn = MagicMock()
+    answers = iter(granted)
+
+    def execute(statement, params=None):
+        result = MagicMock()
+        if "pg_try_advisory_lock" in str(statement):
+            result.scalar.return_value = next(answers)
+        return result
+
+    conn.execute.side_effect = execute
+    engine = MagicMock()
+    engine.connect.return_value.execution_options.return_value = conn
+    return engine, conn
+
+
+def _statements(conn):
+    return [str(c.args[0]) for c in conn.execute.call_args_list]
+
+
+class TestLockKey(unittest.TestCase):
+    """Tests des clés de verrou."""
+
+    def test_key_is_stable_signed_int64(self):
+        """Même jeu, même clé ; clés distinctes et dans l'intervalle bigint."""
+        self.assertEqual(lock_key("fitness"), lock_key("fitness"))
+        self.assertNotEqual(lock_key("fitness"), lock_key("nutrition"))
+        for name in ("fitness", "nutrition"):
+            self.assertTrue(-(2**63) <= lock_key(name) < 2**63)
+
+    def test_unknown_dataset_is_refused(self):
+        """Un jeu inconnu est une erreur de configuration."""
+        with self.assertRaises(ValueError):
+            DatasetLocks("stage", exclusive=["sessions"])
+
+
+class TestDatasetLocks(unittest.TestCase):
+    """Tests de la prise et de la libération des verrous."""
+
+    def test_locks_taken_in_key_order_and_released(self):
+        """Verrous pris par clé croissante (pas d'interblocage), tous libérés à la fin."""
+        engine, conn = _engine([True, True])
+        with patch("healthai.etl.locks.engine", engine):
+            with DatasetLocks("export_data", shared=["nutrition", "fitness"], wait_seconds=5) as locks:
+                self.assertGreaterEqual(locks.waited, 0)
+
+        keys = [c.args[1]["k"] for c in conn.execute.call_args_list if "pg_try" in str(c.args[0])]
+        self.assertEqual(keys, sorted([lock_key("nutrition"), lock_key("fitness")]))
+        statements = _statements(conn)
+        self.assertTrue(all("pg_try_advisory_lock_shared" in s for s in statements[:2]))
+        self.assertIn("pg_advisory_unlock_all", statements[2])
+        conn.close.assert_called_once()
+
+    def test_exclusive_wins_over_shared(self):
+        """Un jeu déclaré exclusif et partagé est verrouillé en exclusif."""
+        locks = DatasetLocks("stage", exclusive=["fitness"], shared=["fitness", "nutrition"], wait_seconds=0)
+        self.assertEqual(locks.modes, {"fitness": "exclusive", "nutrition": "shared"})
+
+    def test_fail_fast_raises_and_releases(self):
+        """Attente 0 : un jeu déjà verrouillé lève LockTimeout sans appel bloquant."""
+        engine, conn = _engine([False])
+        with patch("healthai.etl.locks.engine", engine):
+            locks = DatasetLocks("fitness_ingest", exclusive=["fitness"], wait_seconds=0)
+            with self.assertRaises(LockTimeout):
+                locks.acquire()
+
+        statements = _statements(conn)
+        self.assertFalse(any("pg_advisory_lock(" in s for s in statements))
+        self.assertIn("pg_advisory_unlock_all", statements[-2])
+        conn.close.assert_called_once()
+        self.assertIsInstance(LockTimeout("x"), TimeoutError)
+
+    def test_busy_dataset_is_waited_for_with_timeout(self):
+        """Jeu occupé : lock_timeout posé puis verrou bloquant."""
+        engine, conn = _engine([False])
+        with patch("healthai.etl.locks.engine", engine):
+            locks = DatasetLocks("fitness_ingest", exclusive=["fitness"], wait_seconds=30)
+            locks.acquire()
+            locks.release()
+
+        statements = _statements(conn)
+        self.assertIn("SET lock_timeout", statements[1])
+        self.assertIn("pg_advisory_lock(", statements[2])
+        self.assertIn("RESET lock_timeout", statements[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
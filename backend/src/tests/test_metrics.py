@@ -0,0 +1,74 @@
+"""Tests unitaires pour le module metrics."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+from healthai.etl.metrics import RunMetrics, StageMetrics  # pylint: disable=wrong-import-position
+
+
+class TestRunMetrics(unittest.TestCase):
+    """Tests de l'instrumentation par étape."""
+
+    def test_stage_accumulates_over_calls(self):
+        """Chaque appel (un par chunk) s'ajoute aux totaux de l'étape."""
+        metrics = RunMetrics("test")
+        for n in (10, 5):
+            with metrics.stage("clean", n) as step:
+                step.rows_out = n - 1
+
+        m = metrics.stages["clean"]
+        self.assertEqual(m.calls, 2)
+        self.assertEqual((m.rows_in, m.rows_out), (15, 13))
+        self.assertGreaterEqual(m.wall_seconds, 0)
+        self.assertGreater(m.peak_rss_bytes, 0)
+
+    def test_stage_recorded_when_block_raises(self):
+        """Une étape en échec apparaît quand même dans le journal du run."""
+        metrics = RunMetrics("test")
+        with self.assertRaises(ValueError):
+            with metrics.stage("load", 3):
+                raise ValueError("boom")
+        self.assertEqual(metrics.stages["load"].calls, 1)
+
+    def test_iter_counts_rows_read(self):
+        """Le temps d'attente du lecteur est mesuré, les frames passent inchangés."""
+        metrics = RunMetrics("test")
+        frames = [pd.DataFrame({"a": range(4)}), pd.DataFrame({"a": range(2)})]
+        self.assertEqual([len(df) for df in metrics.iter("read", frames)], [4, 2])
+        self.assertEqual(metrics.stages["read"].rows_out, 6)
+
+    def test_add_merges_worker_metrics(self):
+        """Les mesures d'un worker s'ajoutent à celles du run."""
+        metrics = RunMetrics("export_data")
+        metrics.add(StageMetrics("foods:query", calls=1, wall_seconds=0.5, rows_out=10))
+        metrics.add(StageMetrics("foods:query", calls=1, wall_seconds=0.25, rows_out=5))
+        m = metrics.stages["foods:query"]
+        self.assertEqual(m.calls, 2)
+        self.assertAlmostEqual(m.wall_seconds, 0.75)
+        self.assertEqual(m.rows_out, 15)
+        self.assertIn("foods:query", metrics.summary())
+
+    def test_write_textfile(self):
+        """Fichier Prometheus : une série par étape, étiquetée pipeline/stage."""
+        metrics = RunMetrics("fitness_ingest")
+        with metrics.stage("clean", 7):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = metrics.write_textfile(42, tmp)
+            self.assertEqual(os.listdir(tmp), ["healthai_etl_fitness_ingest.prom"])
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        self.assertIn('healthai_etl_last_run_id{pipeline="fitness_ingest"} 42', text)
+        self.assertIn('healthai_etl_stage_rows_in{pipeline="fitness_ingest",stage="clean"} 7', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Tests unitaires pour le module nutrition_ingest."""
+
+import sys
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+import pandas as pd  # pylint: disable=wrong-import-position
+
+from healthai.etl.nutrition_ingest import REQUIRED_COLS, _row_hashes  # pylint: disable=wrong-import-position
+
+
+def _logs(rows):
+    return pd.DataFrame(rows, columns=REQUIRED_COLS)
+
+
+class TestRowHashes(unittest.TestCase):
+    """Tests du hash de contenu stocké dans nutrition_log.row_hash."""
+
+    ROW = ("Banana", "Fruit", 89.0, 1.1, 22.8, 0.3, 2.6, 12.2, 1.0, 0.0, "Breakfast", 250.0)
+
+    def test_same_row_on_another_day_is_a_new_log(self):
+        """Ligne identique : même hash le même jour, hash différent un autre jour."""
+        df = _logs([self.ROW])
+        day = _row_hashes(df, date(2026, 10, 17)).iloc[0]
+
+        self.assertEqual(_row_hashes(df, date(2026, 10, 17)).iloc[0], day)
+        self.assertNotEqual(_row_hashes(df, date(2026, 10, 18)).iloc[0], day)
+
+    def test_extra_columns_are_not_hashed(self):
+        """Seules les colonnes du CSV et la date entrent dans le hash."""
+        df = _logs([self.ROW])
+        extra = df.assign(row_hash="old", other=1)
+
+        self.assertEqual(_row_hashes(extra, date(2026, 10, 18)).tolist(), _row_hashes(df, date(2026, 10, 18)).tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+"""Tests unitaires pour le module parallel."""
+
+import unittest
+from functools import partial
+
+from healthai.etl.parallel import StageError, get_workers, run_stages
+
+
+def _fail():
+    raise ValueError("boom")
+
+
+class TestRunStages(unittest.TestCase):
+    """Tests de l'exécution des étapes indépendantes."""
+
+    def test_results_keep_stage_order_in_process_pool(self):
+        """Les résultats sont rendus dans l'ordre des étapes, quel que soit le worker."""
+        stages = [(f"pow_{i}", partial(pow, 2, i)) for i in range(4)]
+        results = run_stages(stages, workers=2)
+
+        self.assertEqual([r.name for r in results], ["pow_0", "pow_1", "pow_2", "pow_3"])
+        self.assertEqual([r.value for r in results], [1, 2, 4, 8])
+
+    def test_failure_does_not_stop_other_stages(self):
+        """Une étape en échec n'empêche pas les autres ; l'erreur est levée à la fin."""
+        stages = [("fail", _fail), ("ok", partial(pow, 2, 3))]
+
+        with self.assertRaises(StageError) as ctx:
+            run_stages(stages, workers=1)
+
+        self.assertEqual([r.name for r in ctx.exception.failed], ["fail"])
+        self.assertIn("boom", ctx.exception.failed[0].error)
+
+    def test_workers_capped_by_stage_count(self):
+        """Jamais plus de workers que d'étapes."""
+        self.assertEqual(get_workers(1), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
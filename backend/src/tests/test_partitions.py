@@ -0,0 +1,97 @@
+"""Tests unitaires pour l'ingestion multi-fichiers."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+from healthai.etl.partitions import (  # pylint: disable=wrong-import-position
+    FileOutcome,
+    list_sources,
+    read_partitions,
+    run_outcome,
+)
+from healthai.etl.reader import CsvSchema  # pylint: disable=wrong-import-position
+from healthai.etl.sources import IngestPlan  # pylint: disable=wrong-import-position
+
+SCHEMA = CsvSchema(columns=["a", "b"], numeric={"a": "float64"})
+
+
+def _clean(df):
+    if "a" not in df.columns:
+        raise ValueError("Missing columns: ['a']")
+    df["a"] = pd.to_numeric(df["a"], errors="coerce")
+    return df
+
+
+class TestPartitions(unittest.TestCase):
+    """Tests de la découverte et de la lecture des partitions."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self._write("day_2.csv", "a,b\n3,z\n")
+        self._write("day_1.csv", "a,b\n1,x\n2,y,extra\n2,y\n")
+        self._write("notes.txt", "not a source")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        with open(os.path.join(self.dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_list_sources(self):
+        """Fichier, dossier ou glob : toujours triés, seuls les CSV d'un dossier."""
+        day1, day2 = (os.path.join(self.dir, f"day_{i}.csv") for i in (1, 2))
+        self.assertEqual(list_sources(self.dir), [day1, day2])
+        self.assertEqual(list_sources(os.path.join(self.dir, "day_*.csv")), [day1, day2])
+        self.assertEqual(list_sources(day2), [day2])
+        self.assertEqual(list_sources(os.path.join(self.dir, "none_*.csv")), [])
+
+    def test_corrupt_file_does_not_stop_the_others(self):
+        """Une partition en erreur est signalée, les autres sont lues, dans l'ordre."""
+        self._write("day_3.csv", "x,y\n1,2\n")
+        plans = [IngestPlan("full", "test", p) for p in list_sources(self.dir)]
+        parts = list(read_partitions(plans, _clean, SCHEMA, workers=1))
+        for part in parts:
+            self.addCleanup(part.discard)
+
+        self.assertEqual([os.path.basename(p.path) for p in parts], ["day_1.csv", "day_2.csv", "day_3.csv"])
+        self.assertIsNone(parts[0].error)
+        self.assertEqual(parts[0].stats.rows_read, 3)
+        self.assertEqual([b.line_number for b in parts[0].stats.bad_lines], [3])
+        self.assertEqual(pd.concat(parts[0].frames())["a"].tolist(), [1.0, 2.0])
+        self.assertIn("ValueError", parts[2].error)
+        self.assertEqual(list(parts[2].frames()), [])
+
+    def test_chunks_come_back_one_at_a_time_from_a_spill(self):
+        """Chunks relus un par un depuis le fichier de débordement, supprimé une fois lu."""
+        self._write("day_3.csv", "a,b\n" + "".join(f"{i},v\n" for i in range(5)))
+        plan = IngestPlan("full", "test", os.path.join(self.dir, "day_3.csv"))
+        with patch.dict(os.environ, {"INGEST_CHUNK_SIZE": "2"}):
+            (part,) = read_partitions([plan], _clean, SCHEMA, workers=1)
+
+        self.assertTrue(os.path.exists(part.spill))
+        spill = part.spill
+        self.assertEqual([len(df) for df in part.frames()], [2, 2, 1])
+        self.assertFalse(os.path.exists(spill))
+        self.assertEqual(list(part.frames()), [])
+
+    def test_run_outcome(self):
+        """PARTIAL dès qu'un fichier échoue ; mode "mixed" si les fichiers diffèrent."""
+        plans = [IngestPlan("full", "t", "a.csv"), IngestPlan("skip", "t", "b.csv")]
+        ok = [FileOutcome("a.csv", "SUCCESS", "full"), FileOutcome("b.csv", "SKIPPED", "skip")]
+        self.assertEqual(run_outcome(ok, plans), ("SUCCESS", "mixed"))
+        failed = [FileOutcome("a.csv", "FAILED", "full")]
+        self.assertEqual(run_outcome(failed, plans[:1]), ("PARTIAL", "full"))
+
+
+if __name__ == "__main__":
+    unittest.main()
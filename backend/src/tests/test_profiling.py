@@ -0,0 +1,79 @@
+"""Tests unitaires pour le module profiling."""
+
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+from healthai.etl.profiling import FrameProfiler  # pylint: disable=wrong-import-position
+
+
+class TestFrameProfiler(unittest.TestCase):
+    """Tests du profilage de colonnes par chunks."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame(
+            {
+                "Age": rng.integers(18, 60, 1000).astype("float64"),
+                "Gender": rng.choice(["Male", "Female"], 1000),
+            }
+        )
+        self.df.loc[::100, "Age"] = np.nan
+
+    def test_chunks_give_same_profile_as_whole_frame(self):
+        """Les statistiques fusionnées chunk par chunk sont celles du frame entier."""
+        whole = FrameProfiler(["Age", "Gender"], {"Age": (10, 100)})
+        whole.update(self.df)
+
+        chunked = FrameProfiler(["Age", "Gender"], {"Age": (10, 100)})
+        for i in range(0, len(self.df), 300):
+            chunked.update(self.df.iloc[i : i + 300])
+
+        self.assertEqual(whole.records(), chunked.records())
+
+    def test_merged_profilers_give_same_profile_as_whole_frame(self):
+        """Deux profils de lignes disjointes (ex. deux shards) fusionnés donnent le profil du tout."""
+        whole = FrameProfiler(["Age", "Gender"], {"Age": (10, 100)})
+        whole.update(self.df)
+
+        even = FrameProfiler(["Age", "Gender"], {"Age": (10, 100)})
+        odd = FrameProfiler(["Age", "Gender"], {"Age": (10, 100)})
+        even.update(self.df.iloc[::2])
+        odd.update(self.df.iloc[1::2])
+        even.merge(odd)
+
+        for merged, expected in zip(even.records(), whole.records()):
+            self.assertAlmostEqual(merged.pop("mean_value") or 0, expected.pop("mean_value") or 0)
+            self.assertEqual(merged, expected)
+
+    def test_numeric_statistics_and_histogram(self):
+        """Nulls, min/max/moyenne et histogramme à bornes fixes."""
+        profiler = FrameProfiler(["Age", "Gender"], {"Age": (10, 100)})
+        profiler.update(self.df)
+        age, gender = profiler.records()
+
+        self.assertEqual(age["null_count"], 10)
+        self.assertEqual(age["min_value"], self.df["Age"].min())
+        self.assertEqual(age["max_value"], self.df["Age"].max())
+        self.assertAlmostEqual(age["mean_value"], self.df["Age"].mean())
+        self.assertEqual(sum(age["histogram"]["counts"]), 990)
+        self.assertIsNone(gender["histogram"])
+
+    def test_distinct_estimate_is_close(self):
+        """L'estimation du nombre de valeurs distinctes reste proche du compte exact."""
+        profiler = FrameProfiler(["Age", "Gender"])
+        profiler.update(self.df)
+        age, gender = profiler.records()
+
+        self.assertEqual(gender["distinct_estimate"], 2)
+        self.assertAlmostEqual(age["distinct_estimate"], self.df["Age"].nunique(), delta=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
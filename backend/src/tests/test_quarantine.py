@@ -0,0 +1,107 @@
+"""Tests unitaires pour le module quarantine."""
+
+import tempfile
+import unittest
+
+import pandas as pd
+
+from healthai.etl.quarantine import QuarantineWriter, read_page
+from healthai.etl.reader import BadLine, ReadStats
+
+
+class TestQuarantine(unittest.TestCase):
+    """Tests de l'écriture bufferisée et de la lecture paginée."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_rows_keep_reason_and_source_line(self):
+        """Chaque ligne garde sa raison et son numéro de ligne dans le fichier."""
+        # ligne 3 malformée : la 3e ligne parsée (position 2) est en ligne 5
+        stats = ReadStats(bad_lines=[BadLine(3, "expected 2 fields, saw 3")])
+        rows = pd.DataFrame({"Food_Item": ["Tea", None]}, index=[0, 2])
+        reasons = pd.Series(["ck_food_cal", "nn_food_item"], index=[0, 2])
+
+        with QuarantineWriter(1, base_dir=self.tmp.name) as quarantine:
+            quarantine.add(rows, reasons, stats)
+            quarantine.add_bad_lines(stats.bad_lines)
+
+        page = read_page(1, base_dir=self.tmp.name)
+        self.assertEqual(page["total"], 3)
+        self.assertEqual([r["line_number"] for r in page["rows"]], [2, 5, 3])
+        self.assertEqual([r["reason"] for r in page["rows"]], ["ck_food_cal", "nn_food_item", "malformed_line"])
+        self.assertIsNone(page["rows"][1]["Food_Item"])
+
+    def test_pages_span_several_parts(self):
+        """La pagination traverse les fichiers écrits à chaque flush."""
+        with QuarantineWriter(2, base_dir=self.tmp.name, buffer_rows=2) as quarantine:
+            for i in range(5):
+                quarantine.add(pd.DataFrame({"Age": [i]}, index=[i]), pd.Series(["ck_user_age"], index=[i]), ReadStats())
+
+        page = read_page(2, offset=1, limit=3, base_dir=self.tmp.name)
+        self.assertEqual(page["total"], 5)
+        self.assertEqual([r["Age"] for r in page["rows"]], ["1", "2", "3"])
+
+    def test_writers_of_one_process_keep_their_parts(self):
+        """Deux shards traités par le même worker : aucune part écrasée."""
+        for ages in ([1, 2], [3]):
+            with QuarantineWriter(3, base_dir=self.tmp.name) as quarantine:
+                index = list(range(len(ages)))
+                quarantine.add(pd.DataFrame({"Age": ages}, index=index), pd.Series("ck_user_age", index=index), ReadStats())
+
+        page = read_page(3, base_dir=self.tmp.name)
+        self.assertEqual(page["total"], 3)
+        self.assertEqual(sorted(r["Age"] for r in page["rows"]), ["1", "2", "3"])
+
+    def test_pages_follow_flush_order_across_writers(self):
+        """Deux writers du même run (shards) : les pages suivent l'ordre des flushs, stable d'une lecture à l'autre."""
+        first = QuarantineWriter(6, base_dir=self.tmp.name)
+        second = QuarantineWriter(6, base_dir=self.tmp.name)
+        for quarantine, age in ((first, 1), (second, 2), (first, 3), (second, 4), (second, 5)):
+            quarantine.add(pd.DataFrame({"Age": [age]}, index=[0]), pd.Series("ck_user_age", index=[0]), ReadStats())
+            quarantine.flush()
+
+        pages = [read_page(6, offset=offset, limit=2, base_dir=self.tmp.name) for offset in (0, 2, 4)]
+        self.assertEqual([[r["Age"] for r in page["rows"]] for page in pages], [["1", "2"], ["3", "4"], ["5"]])
+
+    def test_adopted_parts_come_first(self):
+        """Reprise : les parts sauvegardées du run interrompu passent avant celles du nouveau run."""
+        def reject(quarantine, ages):
+            index = list(range(len(ages)))
+            quarantine.add(pd.DataFrame({"Age": ages}, index=index), pd.Series("ck_user_age", index=index), ReadStats())
+
+        crashed = QuarantineWriter(4, base_dir=self.tmp.name)
+        reject(crashed, [1, 2])
+        crashed.flush()
+        saved = list(crashed.parts)
+        reject(crashed, [3])  # après le checkpoint : refait par la reprise
+        crashed.close()
+
+        with QuarantineWriter(5, base_dir=self.tmp.name) as resumed:
+            resumed.adopt(4, saved)
+            reject(resumed, [3, 4])
+
+        page = read_page(5, base_dir=self.tmp.name)
+        self.assertEqual([r["Age"] for r in page["rows"]], ["1", "2", "3", "4"])
+        self.assertEqual(resumed.rows_written, 4)
+
+    def test_rows_without_source_line_keep_db_message(self):
+        """Agrégat refusé par la base : pas de numéro de ligne, message de l'erreur conservé."""
+        sessions = pd.DataFrame({"session_duration_hours": [150.0]}, index=[0])
+
+        with QuarantineWriter(6, base_dir=self.tmp.name) as quarantine:
+            quarantine.add(sessions, pd.Series("numeric_value_out_of_range", index=[0]), None, message="numeric field overflow")
+
+        row = read_page(6, base_dir=self.tmp.name)["rows"][0]
+        self.assertIsNone(row["line_number"])
+        self.assertEqual((row["reason"], row["message"]), ("numeric_value_out_of_range", "numeric field overflow"))
+
+    def test_clean_run_writes_nothing(self):
+        """Sans rejet, aucun fichier n'est créé."""
+        QuarantineWriter(3, base_dir=self.tmp.name).close()
+        self.assertEqual(read_page(3, base_dir=self.tmp.name)["total"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
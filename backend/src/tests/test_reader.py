@@ -0,0 +1,196 @@
+"""Tests unitaires pour le module reader."""
+
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import warnings
+from unittest.mock import patch
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from healthai.etl.reader import (
+    CsvSchema,
+    ReadStats,
+    SourceFormat,
+    clean_str,
+    detect_format,
+    iter_columnar,
+    iter_csv,
+    open_csv,
+)
+
+CSV = (
+    "Food_Item,Category,Water_Intake (ml)\n"
+    "Banana,Fruit,0\n"
+    "Rice,Grain,250,extra\n"
+    "Apple,Fruit,100\n"
+    "Coffee,Beverage,0\n"
+    "Tea,Beverage,0,extra,extra\n"
+    "Bread,Grain,0\n"
+)
+
+
+class TestIterCsv(unittest.TestCase):
+    """Tests de la lecture en une passe avec capture des lignes malformées."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(CSV)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_whole_file_counts_and_captures_bad_lines(self):
+        """Les lignes malformées doivent être comptées avec leur numéro de ligne."""
+        stats = ReadStats()
+        frames = list(iter_csv(self.path, None, stats))
+
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0]["Food_Item"].tolist(), ["Banana", "Apple", "Coffee", "Bread"])
+        self.assertEqual(stats.rows_parsed, 4)
+        self.assertEqual(stats.rows_read, 6)
+        self.assertEqual([b.line_number for b in stats.bad_lines], [3, 6])
+
+    def test_chunks_give_same_result_as_whole_file(self):
+        """La lecture par chunks doit donner les mêmes lignes et les mêmes rejets."""
+        stats = ReadStats()
+        frames = list(iter_csv(self.path, 2, stats))
+
+        rows = [item for df in frames for item in df["Food_Item"]]
+        self.assertEqual(rows, ["Banana", "Apple", "Coffee", "Bread"])
+        self.assertEqual(stats.rows_read, 6)
+        self.assertEqual([b.line_number for b in stats.bad_lines], [3, 6])
+
+    def test_early_stop_waits_for_the_prefetch_thread(self):
+        """Arrêt en cours de lecture (erreur d'un chunk) : le thread de lecture est terminé au retour."""
+        before = threading.active_count()
+        frames = iter_csv(self.path, 1, ReadStats())
+        next(frames)
+        frames.close()
+
+        self.assertEqual(threading.active_count(), before)
+
+    def test_bad_lines_are_captured_on_the_consuming_thread(self):
+        """Par chunks, l'état global des warnings n'est modifié que par le thread qui consomme."""
+        threads = []
+        catch_warnings = warnings.catch_warnings
+
+        def recording(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return catch_warnings(*args, **kwargs)
+
+        stats = ReadStats()
+        with patch("healthai.etl.reader.warnings.catch_warnings", recording):
+            list(iter_csv(self.path, 2, stats))
+
+        self.assertTrue(threads)
+        self.assertEqual(set(threads), {threading.current_thread()})
+        self.assertEqual([b.line_number for b in stats.bad_lines], [3, 6])
+
+    def test_schema_types_columns_and_keeps_bad_line_detection(self):
+        """Le schéma type les colonnes sans masquer les lignes malformées."""
+        schema = CsvSchema(columns=["Food_Item", "Category", "Water_Intake (ml)"], categorical=["Category"])
+        stats = ReadStats()
+        df = next(iter_csv(self.path, None, stats, **schema.read_kwargs(self.path)))
+
+        self.assertIsInstance(df["Category"].dtype, pd.CategoricalDtype)
+        self.assertEqual([b.line_number for b in stats.bad_lines], [3, 6])
+
+    def test_schema_skips_extra_columns(self):
+        """Seules les colonnes déclarées sont lues."""
+        schema = CsvSchema(columns=["Food_Item"])
+        df = next(iter_csv(self.path, None, None, **schema.read_kwargs(self.path)))
+
+        self.assertEqual(list(df.columns), ["Food_Item"])
+
+
+class TestSourceFormats(unittest.TestCase):
+    """Tests des formats compressés et colonnaires."""
+
+    SCHEMA = CsvSchema(columns=["Food_Item", "Category"], categorical=["Category"])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.frame = pd.DataFrame(
+            {"Food_Item": ["Banana", "Apple", "Tea"], "Category": ["Fruit", "Fruit", "Beverage"], "Other": [1, 2, 3]}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def test_detect_format_prefers_magic_bytes(self):
+        """Le contenu prime sur l'extension ; l'extension sert pour un fichier vide."""
+        misnamed = self._path("export.csv")
+        self.frame.to_parquet(misnamed, index=False)
+        with gzip.open(self._path("data.bin"), "wt") as f:
+            f.write(CSV)
+        open(self._path("empty.csv.zst"), "wb").close()
+
+        self.assertEqual(detect_format(misnamed), SourceFormat("parquet"))
+        self.assertEqual(detect_format(self._path("data.bin")), SourceFormat("csv", "gzip"))
+        self.assertEqual(detect_format(self._path("empty.csv.zst")), SourceFormat("csv", "zstd"))
+        self.assertTrue(detect_format(self._path("missing.csv")).plain_csv)
+
+    def test_compressed_csv_reads_like_plain_csv(self):
+        """gzip et zstd : mêmes lignes et mêmes lignes malformées, par chunks."""
+        for compression, name in (("gzip", "data.csv.gz"), ("zstd", "data.csv.zst")):
+            path = self._path(name)
+            with pa.output_stream(path, compression=compression) as f:
+                f.write(CSV.encode())
+            fmt = detect_format(path)
+            stats = ReadStats()
+            with open_csv(path, fmt) as source:
+                frames = list(iter_csv(source, 2, stats))
+
+            rows = [item for df in frames for item in df["Food_Item"]]
+            self.assertEqual(rows, ["Banana", "Apple", "Coffee", "Bread"], compression)
+            self.assertEqual([b.line_number for b in stats.bad_lines], [3, 6], compression)
+
+    def test_columnar_reads_schema_columns_only(self):
+        """Parquet et Arrow IPC : projection sur le schéma, catégories, découpage en chunks."""
+        table = pa.Table.from_pandas(self.frame, preserve_index=False)
+        self.frame.to_parquet(self._path("data.parquet"), index=False)
+        with ipc.new_file(self._path("data.arrow"), table.schema) as w:
+            w.write_table(table)
+        with ipc.new_stream(self._path("data.arrows"), table.schema) as w:
+            w.write_table(table)
+
+        for name in ("data.parquet", "data.arrow", "data.arrows"):
+            path = self._path(name)
+            stats = ReadStats()
+            frames = list(iter_columnar(path, detect_format(path), self.SCHEMA, 2, stats))
+
+            self.assertEqual([len(df) for df in frames], [2, 1], name)
+            df = pd.concat(frames)
+            self.assertEqual(list(df.columns), ["Food_Item", "Category"], name)
+            self.assertIsInstance(frames[0]["Category"].dtype, pd.CategoricalDtype, name)
+            self.assertEqual(df["Food_Item"].tolist(), ["Banana", "Apple", "Tea"], name)
+            self.assertEqual(df.index.tolist(), [0, 1, 2], name)
+            self.assertEqual(stats.rows_read, 3, name)
+
+
+class TestCleanStr(unittest.TestCase):
+    """Tests du nettoyage des chaînes, y compris catégorielles."""
+
+    def test_categorical_is_cleaned_on_categories(self):
+        """Les catégories sont nettoyées et les valeurs nulles deviennent NA."""
+        s = pd.Series([" Fruit", "Fruit ", "none", None, "Grain"], dtype="category")
+        cleaned = clean_str(s)
+
+        self.assertIsInstance(cleaned.dtype, pd.CategoricalDtype)
+        self.assertEqual(sorted(cleaned.cat.categories), ["Fruit", "Grain"])
+        self.assertEqual(cleaned.isna().tolist(), [False, False, True, True, False])
+        self.assertEqual(cleaned.dropna().tolist(), ["Fruit", "Fruit", "Grain"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,258 @@
+"""Tests unitaires pour le module shadow (chargement dans des copies puis bascule)."""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+from fastapi import HTTPException  # pylint: disable=wrong-import-position
+from sqlalchemy import Column, Index, Integer, MetaData, Table  # pylint: disable=wrong-import-position
+
+from healthai.api import deps  # pylint: disable=wrong-import-position
+from healthai.etl import run_pipeline, shadow  # pylint: disable=wrong-import-position
+from healthai.etl.parallel import StageError  # pylint: disable=wrong-import-position
+from healthai.etl.run_pipeline import build_pipeline  # pylint: disable=wrong-import-position
+
+
+def _db(outside_fks=(), views=(), shadow_tables_found=0):
+    """
+    Session factice : renvoie les clés étrangères externes, les vues dépendantes
+    et le nombre de copies shadow données ; journalise requêtes et commits dans l'ordre.
+    """
+    db = MagicMock()
+    db.log = []
+
+    def execute(statement, params=None):
+        result = MagicMock()
+        sql = str(statement)
+        db.log.append(sql)
+        if "contype = 'f'" in sql:
+            result.scalars.return_value.all.return_value = list(outside_fks)
+        elif "pg_rewrite" in sql:
+            result.all.return_value = list(views)
+        elif "FROM pg_tables" in sql:
+            result.scalar.return_value = shadow_tables_found
+        elif "pg_get_serial_sequence(:t, :c)" in sql and "setval" not in sql:
+            result.scalar.return_value = None
+        return result
+
+    db.execute.side_effect = execute
+    db.commit.side_effect = lambda: db.log.append("COMMIT")
+    return db
+
+
+def _statements(db):
+    return [str(c.args[0]) for c in db.execute.call_args_list]
+
+
+def _tables():
+    """Copies déclarées des tables du swap (une table avec un index secondaire)."""
+    metadata = MetaData()
+    return [
+        Table(
+            name,
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("value", Integer),
+            Index(f"idx_{name}_value", "value"),
+            schema=shadow.SHADOW_SCHEMA,
+        )
+        for name in shadow.SHADOW_TABLES
+    ]
+
+
+class TestLoadTarget(unittest.TestCase):
+    """Tests du choix de la cible de chargement."""
+
+    def test_default_is_live_and_unknown_is_refused(self):
+        """Sans variable : live ; valeur inconnue : erreur de configuration."""
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("ETL_LOAD_TARGET", None)
+            self.assertEqual(shadow.get_load_target(), "live")
+        with patch.dict(os.environ, {"ETL_LOAD_TARGET": "Shadow "}):
+            self.assertEqual(shadow.get_load_target(), "shadow")
+        with patch.dict(os.environ, {"ETL_LOAD_TARGET": "green"}):
+            with self.assertRaises(ValueError):
+                shadow.get_load_target()
+
+    def test_live_target_uses_the_given_sessions(self):
+        """Cible live : session ordinaire, aucune vérification du schéma shadow."""
+        sessions = MagicMock()
+        with patch.dict(os.environ, {"ETL_LOAD_TARGET": "live"}):
+            self.assertIs(shadow.load_session(sessions), sessions.return_value)
+
+    def test_shadow_target_requires_prepared_copies(self):
+        """Cible shadow sans copies préparées : erreur plutôt que repli silencieux sur les tables live."""
+        db = MagicMock()
+        db.execute.return_value.scalar.return_value = 2
+        with (
+            patch.dict(os.environ, {"ETL_LOAD_TARGET": "shadow"}),
+            patch.object(shadow, "_shadow_sessions", MagicMock(return_value=db)),
+        ):
+            with self.assertRaises(RuntimeError):
+                shadow.load_session(MagicMock())
+        db.close.assert_called_once()
+
+
+class TestShadowWindow(unittest.TestCase):
+    """Tests du refus des écritures de l'API entre la préparation et la bascule."""
+
+    def test_prepare_commits_the_empty_copies_before_copying(self):
+        """Verrou exclusif, copies vides validées (fenêtre ouverte), puis copie des lignes."""
+        db = _db()
+        with patch.object(shadow, "shadow_tables", _tables):
+            shadow.prepare_shadow(db)
+
+        self.assertEqual(db.log[0], "SELECT pg_advisory_xact_lock(:key)")
+        opened = db.log.index("COMMIT")
+        self.assertEqual(sum(s.strip().startswith("CREATE TABLE") for s in db.log[:opened]), len(shadow.SHADOW_TABLES))
+        self.assertFalse(any(s.startswith("INSERT INTO") for s in db.log[:opened]))
+        self.assertTrue(any(s.startswith("INSERT INTO") for s in db.log[opened:]))
+
+    def test_write_refused_while_copies_exist(self):
+        """Copies shadow présentes : ShadowWindowOpen après le verrou partagé ; absentes : écriture permise."""
+        db = _db(shadow_tables_found=2)
+        with self.assertRaises(shadow.ShadowWindowOpen):
+            shadow.guard_live_write(db)
+        self.assertEqual(db.log[0], "SELECT pg_advisory_xact_lock_shared(:key)")
+
+        shadow.guard_live_write(_db(shadow_tables_found=0))
+
+    def test_api_write_session_answers_503(self):
+        """Route d'écriture pendant la fenêtre : 503 avec Retry-After, session fermée."""
+        db = _db(shadow_tables_found=len(shadow.SHADOW_TABLES))
+        with patch.object(deps, "SessionLocal", MagicMock(return_value=db)):
+            sessions = deps.get_write_db()
+            with self.assertRaises(HTTPException) as raised:
+                next(sessions)
+
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertIn("Retry-After", raised.exception.headers)
+        db.close.assert_called_once()
+
+
+class TestSwapShadow(unittest.TestCase):
+    """Tests de la bascule atomique."""
+
+    def test_swap_locks_first_then_moves_tables_and_recreates_views(self):
+        """Verrous bornés par lock_timeout, anciennes tables sorties avant l'entrée des copies, vues recréées."""
+        view = MagicMock(relkind="v", definition=" SELECT age FROM utilisateur;")
+        view.name = "healthai.v_users_age_groups"
+        db = _db(views=[view])
+
+        shadow.swap_shadow(db, lock_timeout=1.5)
+
+        statements = _statements(db)
+        self.assertEqual(statements[0], "SET LOCAL lock_timeout = '1500ms'")
+        self.assertIn("IN ACCESS EXCLUSIVE MODE", statements[1])
+        for name in shadow.SHADOW_TABLES:
+            self.assertIn(f"healthai.{name}", statements[1])
+            out = statements.index(f"ALTER TABLE healthai.{name} SET SCHEMA healthai_old")
+            self.assertEqual(statements[out + 1], f"ALTER TABLE healthai_shadow.{name} SET SCHEMA healthai")
+        self.assertEqual(
+            statements[-1], "CREATE OR REPLACE VIEW healthai.v_users_age_groups AS  SELECT age FROM utilisateur;"
+        )
+        db.commit.assert_called_once()
+
+    def test_run_swap_sequence(self):
+        """Index et statistiques validés, puis bascule (vues recréées) validée, puis anciennes tables supprimées."""
+        view = MagicMock(relkind="v", definition=" SELECT age FROM utilisateur;")
+        view.name = "healthai.v_users_age_groups"
+        db = _db(views=[view])
+        locks = MagicMock()
+        with (
+            patch.dict(os.environ, {"ETL_SWAP_LOCK_TIMEOUT_SECONDS": "2"}),
+            patch.object(shadow, "SessionLocal", MagicMock(return_value=db)),
+            patch.object(shadow, "DatasetLocks", MagicMock(return_value=locks)) as dataset_locks,
+            patch.object(shadow, "shadow_tables", _tables),
+        ):
+            shadow.run_shadow_swap()
+
+        dataset_locks.assert_called_once_with("shadow_swap", exclusive=shadow.DATASETS)
+        locks.acquire.assert_called_once()
+        locks.release.assert_called_once()
+        log = db.log
+        built, swapped, dropped = (i for i, s in enumerate(log) if s == "COMMIT")
+        self.assertTrue(all(s.strip().startswith(("CREATE INDEX", "ANALYZE")) for s in log[:built]))
+        self.assertEqual(log[built + 1], "SET LOCAL lock_timeout = '2000ms'")
+        self.assertTrue(log[built + 2].startswith("LOCK TABLE"))
+        moves = [s for s in log[built:swapped] if "SET SCHEMA" in s]
+        self.assertEqual(len(moves), 2 * len(shadow.SHADOW_TABLES))
+        self.assertEqual(
+            log[swapped - 1], "CREATE OR REPLACE VIEW healthai.v_users_age_groups AS  SELECT age FROM utilisateur;"
+        )
+        self.assertEqual(
+            log[swapped + 1:dropped],
+            ["DROP SCHEMA IF EXISTS healthai_old CASCADE", "DROP SCHEMA IF EXISTS healthai_shadow CASCADE"],
+        )
+        db.close.assert_called_once()
+
+    def test_swap_refuses_objects_left_on_old_tables(self):
+        """Clé étrangère externe ou vue matérialisée : aucune table déplacée, rien de validé."""
+        matview = MagicMock(relkind="m", definition="SELECT 1")
+        matview.name = "healthai.mv_sessions"
+        for db in (_db(outside_fks=["healthai.user_profile.user_profile_id_user_fkey"]), _db(views=[matview])):
+            with self.assertRaises(RuntimeError):
+                shadow.swap_shadow(db, lock_timeout=1)
+            self.assertFalse(any("SET SCHEMA" in s for s in _statements(db)))
+            db.commit.assert_not_called()
+
+
+class TestShadowPipeline(unittest.TestCase):
+    """Tests du DAG en mode shadow."""
+
+    def test_swap_between_ingests_and_exports(self):
+        """Préparation avant les ingestions, bascule après les deux, exports sur les tables publiées."""
+        dag = build_pipeline("shadow")
+        self.assertEqual(dag.tasks["nutrition_ingest"].deps, ("shadow_prepare",))
+        self.assertEqual(dag.tasks["fitness_ingest"].deps, ("shadow_prepare",))
+        self.assertEqual(set(dag.tasks["shadow_swap"].deps), {"nutrition_ingest", "fitness_ingest"})
+        self.assertEqual(dag.tasks["export"].deps, ("shadow_swap",))
+        self.assertNotIn("shadow_swap", build_pipeline("live").tasks)
+
+    def test_failed_ingest_reopens_api_writes(self):
+        """Ingestion en échec après shadow_prepare : copies supprimées, l'API écrit de nouveau, le lot repart de zéro."""
+        copies = {"found": len(shadow.SHADOW_TABLES)}
+
+        def session():
+            db = _db(shadow_tables_found=copies["found"])
+            execute = db.execute.side_effect
+
+            def dropping(statement, params=None):
+                if str(statement).startswith(f"DROP SCHEMA IF EXISTS {shadow.SHADOW_SCHEMA}"):
+                    copies["found"] = 0
+                return execute(statement, params)
+
+            db.execute.side_effect = dropping
+            return db
+
+        def failing_ingest():
+            raise ValueError("bad file")
+
+        store = MagicMock()
+        store.resume.return_value = None
+        store.start.return_value = "b0"
+        with (
+            patch.object(run_pipeline, "run_shadow_prepare", MagicMock()),
+            patch.object(run_pipeline, "run_nutrition_ingest", MagicMock()),
+            patch.object(run_pipeline, "run_fitness_ingest", failing_ingest),
+            patch.object(shadow, "SessionLocal", MagicMock(side_effect=session)),
+            patch.object(shadow, "DatasetLocks"),
+        ):
+            dag = build_pipeline("shadow")
+            with self.assertRaises(StageError):
+                dag.run(store=store, workers=1)
+
+        self.assertEqual(copies["found"], 0)
+        store.discard.assert_called_once_with("b0")
+
+        db = session()
+        with patch.object(deps, "SessionLocal", MagicMock(return_value=db)):
+            self.assertIs(next(deps.get_write_db()), db)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Tests unitaires pour le module shards."""
+
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from healthai.etl.shards import ShardSpill, iter_spill, shard_ids
+
+
+class TestShards(unittest.TestCase):
+    """Tests du routage des lignes vers les shards et de leur relecture."""
+
+    def test_shard_ids_are_stable_and_in_range(self):
+        """Une même clé va toujours dans le même shard."""
+        hashes = pd.Series(["ff" * 32, "00" * 32, "0123456789abcdef" * 4, "ff" * 32])
+        ids = shard_ids(hashes, 3)
+
+        self.assertTrue(((ids >= 0) & (ids < 3)).all())
+        self.assertEqual(ids[0], ids[3])
+        self.assertEqual(ids[1], 0)
+
+    def test_spill_keeps_rows_labels_and_order_per_shard(self):
+        """Chaque shard relit ses lignes dans l'ordre du fichier, avec leurs étiquettes."""
+        with ShardSpill(2) as spill:
+            for start in (0, 4):
+                chunk = pd.DataFrame({"v": range(start, start + 4)}, index=range(10 + start, 14 + start))
+                spill.add(chunk, np.array([0, 1, 0, 0]))
+            spill.close()
+
+            shard0 = pd.concat(iter_spill(spill.paths[0]))
+            shard1 = pd.concat(iter_spill(spill.paths[1]))
+            self.assertEqual(shard0["v"].tolist(), [0, 2, 3, 4, 6, 7])
+            self.assertEqual(shard0.index.tolist(), [10, 12, 13, 14, 16, 17])
+            self.assertEqual(shard1["v"].tolist(), [1, 5])
+            self.assertEqual(spill.rows, [6, 2])
+            directory = spill.directory
+
+        self.assertFalse(os.path.exists(directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Tests unitaires pour le module sources (ingestion incrémentale)."""
+
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+from healthai.etl.reader import CsvSchema, ReadStats, iter_csv  # pylint: disable=wrong-import-position
+from healthai.etl.sources import compare_with_registry, fingerprint, registry_values  # pylint: disable=wrong-import-position
+
+HEADER = "Food_Item,Water_Intake (ml)\n"
+ROWS = "Banana,0\nRice,250\n"
+APPENDED = "Apple,100\nTea,0,extra\nBread,0\n"
+
+
+class TestPlanIngest(unittest.TestCase):
+    """Tests du choix full / tail / skip à partir de l'empreinte du fichier."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(HEADER + ROWS)
+
+        fp = fingerprint(self.path)
+        self.previous = SimpleNamespace(
+            size_bytes=fp.size_bytes,
+            mtime_ns=fp.mtime_ns,
+            content_hash=fp.content_hash,
+            ingested_bytes=fp.size_bytes,
+            ingested_rows=2,
+            id_run=1,
+            ingest_date=None,
+            day_start_byte=None,
+            day_start_row=None,
+        )
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_first_ingest_is_full(self):
+        """Sans entrée dans le registre, le fichier est lu en entier."""
+        plan = compare_with_registry("nutrition_ingest", self.path, None)
+        self.assertEqual(plan.mode, "full")
+
+    def test_unchanged_file_is_skipped(self):
+        """Même taille et même mtime : aucune lecture."""
+        plan = compare_with_registry("nutrition_ingest", self.path, self.previous)
+        self.assertEqual(plan.mode, "skip")
+
+    def test_appended_rows_are_read_as_tail(self):
+        """Seules les lignes ajoutées sont lues, avec les numéros de ligne du fichier."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(APPENDED)
+
+        plan = compare_with_registry("nutrition_ingest", self.path, self.previous)
+        self.assertEqual(plan.mode, "tail")
+
+        stats = ReadStats(line_offset=plan.line_offset)
+        with plan.open() as source:
+            frames = list(iter_csv(source, None, stats, **plan.read_kwargs()))
+
+        self.assertEqual(frames[0]["Food_Item"].tolist(), ["Apple", "Bread"])
+        self.assertEqual([b.line_number for b in stats.bad_lines], [5])
+
+    def test_file_of_yesterday_tailed_twice_today_rereads_only_today(self):
+        """Chargé la veille, prolongé deux fois aujourd'hui : la relecture part du premier octet du jour."""
+        today = date(2026, 10, 18)
+        self.previous.ingest_date = date(2026, 10, 17)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(APPENDED)
+
+        first = compare_with_registry("nutrition_ingest", self.path, self.previous)
+        self.assertEqual(first.mode, "tail")
+        previous = SimpleNamespace(id_run=2, **registry_values(first, 2, today))
+        self.assertEqual((previous.day_start_byte, previous.day_start_row), (first.start_byte, 2))
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("Egg,0\n")
+
+        second = compare_with_registry("nutrition_ingest", self.path, previous)
+        self.assertEqual((second.mode, second.previous_date), ("tail", today))
+        plan = second.from_day_start()
+
+        stats = ReadStats(line_offset=plan.line_offset)
+        with plan.open() as source:
+            frames = list(iter_csv(source, None, stats, **plan.read_kwargs()))
+
+        # Les lignes de la veille (Banana, Rice) ne sont pas relues
+        self.assertEqual(frames[0]["Food_Item"].tolist(), ["Apple", "Bread", "Egg"])
+        self.assertEqual([b.line_number for b in stats.bad_lines], [5])
+        self.assertEqual(registry_values(plan, 4, today)["day_start_byte"], first.start_byte)
+
+    def test_rewritten_file_is_full(self):
+        """Un contenu réécrit (ancien contenu non préfixe) force un rechargement complet."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(HEADER + "Apple,100\n" + ROWS)
+
+        plan = compare_with_registry("nutrition_ingest", self.path, self.previous)
+        self.assertEqual(plan.mode, "full")
+
+    def test_appended_compressed_file_is_full(self):
+        """Un CSV compressé modifié est relu en entier : un offset d'octets n'y est pas une ligne."""
+        path = self.path + ".gz"
+        self.addCleanup(os.remove, path)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(HEADER + ROWS)
+        fp = fingerprint(path)
+        previous = SimpleNamespace(**vars(self.previous))
+        previous.size_bytes = previous.ingested_bytes = fp.size_bytes
+        previous.mtime_ns, previous.content_hash = fp.mtime_ns, fp.content_hash
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            f.write(APPENDED)
+
+        plan = compare_with_registry("nutrition_ingest", path, previous)
+        self.assertEqual(plan.mode, "full")
+        stats = ReadStats(line_offset=plan.line_offset, first_line=plan.first_line)
+        df = pd.concat(plan.frames(CsvSchema(columns=["Food_Item", "Water_Intake (ml)"]), 2, stats))
+        self.assertEqual(df["Food_Item"].tolist(), ["Banana", "Rice", "Apple", "Bread"])
+        self.assertEqual([b.line_number for b in stats.bad_lines], [5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Tests unitaires pour le module staging (COPY vers les tables de staging)."""
+
+import unittest
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from healthai.etl.staging import copy_frame, prepare_staging
+
+
+def _statements(db):
+    return [" ".join(str(c.args[0]).split()) for c in db.execute.call_args_list]
+
+
+class TestPrepareStaging(unittest.TestCase):
+    """Tests de la préparation des tables de staging."""
+
+    def test_shared_table_is_created_then_emptied(self):
+        """Table partagée : créée si besoin (UNLOGGED) puis vidée dans la transaction."""
+        db = MagicMock()
+        prepare_staging(db, "stg_nutrition")
+
+        statements = _statements(db)
+        self.assertTrue(statements[0].startswith("CREATE UNLOGGED TABLE IF NOT EXISTS stg_nutrition"))
+        self.assertEqual(statements[1], "TRUNCATE stg_nutrition")
+
+    def test_private_table_is_a_temporary_copy(self):
+        """Table privée : copie temporaire du même nom, supprimée au commit."""
+        db = MagicMock()
+        prepare_staging(db, "stg_fitness_session", private=True)
+
+        statements = _statements(db)
+        self.assertEqual(
+            statements[0],
+            "CREATE TEMP TABLE IF NOT EXISTS stg_fitness_session "
+            "(LIKE stg_fitness_session INCLUDING DEFAULTS) ON COMMIT DROP",
+        )
+        self.assertEqual(statements[1], "TRUNCATE stg_fitness_session")
+
+
+class TestCopyFrame(unittest.TestCase):
+    """Tests de l'envoi COPY FROM STDIN."""
+
+    def test_csv_follows_the_column_order_and_writes_null_as_empty(self):
+        """Colonnes dans l'ordre demandé, valeurs manquantes en champ vide non quoté (NULL)."""
+        sent = {}
+        cursor = MagicMock()
+        cursor.copy_expert.side_effect = lambda sql, buf: sent.update(sql=sql, data=buf.read())
+        db = MagicMock()
+        db.connection.return_value.connection.cursor.return_value = cursor
+
+        df = pd.DataFrame({"b": [1.5, None], "a": ["x", "y, z"], "ignored": [0, 0]})
+        result = copy_frame(db, "stg_test", df, ["a", "b"])
+
+        self.assertEqual(sent["sql"], "COPY stg_test (a, b) FROM STDIN WITH (FORMAT csv)")
+        self.assertEqual(sent["data"], 'x,1.5\n"y, z",\n')
+        self.assertEqual(result.rows, 2)
+        cursor.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Tests unitaires pour le générateur de données synthétiques."""
+
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+# Mock de la base AVANT import des modules d'ingestion (colonnes attendues).
+sys.modules.setdefault("healthai.db", MagicMock())
+
+from healthai.etl import fitness_ingest, nutrition_ingest  # pylint: disable=wrong-import-position
+from healthai.etl.synthetic import DirtyRates, write_source  # pylint: disable=wrong-import-position
+
+
+class TestSynthetic(unittest.TestCase):
+    """Tests du générateur (schéma, déterminisme, valeurs sales)."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_same_seed_same_bytes(self):
+        """Même graine, même fichier ; autre graine, autre fichier."""
+        a, b, c = self._path("a.csv"), self._path("b.csv"), self._path("c.csv")
+        write_source("fitness", a, 5000, seed=3, block_rows=2000)
+        write_source("fitness", b, 5000, seed=3, block_rows=2000)
+        write_source("fitness", c, 5000, seed=4, block_rows=2000)
+        with open(a, "rb") as fa, open(b, "rb") as fb, open(c, "rb") as fc:
+            data = fa.read()
+            self.assertEqual(data, fb.read())
+            self.assertNotEqual(data, fc.read())
+
+    def test_columns_match_ingest(self):
+        """Les en-têtes sont ceux attendus par les ingestions, dans tous les formats."""
+        write_source("fitness", self._path("f.csv.gz"), 1000)
+        write_source("nutrition", self._path("n.parquet"), 1000)
+        with gzip.open(self._path("f.csv.gz"), "rt") as f:
+            self.assertEqual(f.readline().rstrip("\n").split(","), fitness_ingest.REQUIRED_COLS)
+        df = pd.read_parquet(self._path("n.parquet"))
+        self.assertEqual(list(df.columns), nutrition_ingest.REQUIRED_COLS)
+        self.assertEqual(len(df), 1000)
+
+    def test_dirty_values(self):
+        """Jetons nuls, âges hors bornes et calories nulles sur séances longues."""
+        path = self._path("f.csv")
+        dirty = DirtyRates(null_token=0.02, out_of_range=0.05, zero_calories=0.05, malformed=0.0)
+        write_source("fitness", path, 20_000, dirty=dirty)
+        raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+
+        age = pd.to_numeric(raw["Age"], errors="coerce")
+        self.assertAlmostEqual(((age < 10) | (age > 100)).mean(), 0.05, delta=0.01)
+        self.assertIn("none", set(raw["Gender"]))
+
+        duration = pd.to_numeric(raw["Session_Duration (hours)"], errors="coerce")
+        calories = pd.to_numeric(raw["Calories_Burned"], errors="coerce")
+        self.assertGreater(((duration > 0.25) & (calories == 0)).mean(), 0.03)
+
+    def test_clean_rates_and_skewed_foods(self):
+        """Sans saleté : aucune valeur manquante ; quelques aliments dominent."""
+        path = self._path("n.csv")
+        write_source("nutrition", path, 20_000, dirty=DirtyRates.clean())
+        df = pd.read_csv(path)
+        self.assertFalse(df.isna().any().any())
+        counts = df["Food_Item"].value_counts()
+        self.assertGreater(counts.iloc[:50].sum() / len(df), 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Tests unitaires pour le moteur de règles de validation."""
+
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# Mock de la base AVANT import des modèles.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+import numpy as np  # pylint: disable=wrong-import-position
+import pandas as pd  # pylint: disable=wrong-import-position
+
+from healthai.etl.validators import RuleReport, RuleSet  # pylint: disable=wrong-import-position
+from healthai.models.rules import SESSION_RULES, USER_RULES, Rule  # pylint: disable=wrong-import-position
+
+
+class TestRule(unittest.TestCase):
+    """Tests de la génération des contraintes SQL."""
+
+    def test_sql_matches_model_constraint_forms(self):
+        """Même forme que les CheckConstraint historiques des modèles."""
+        self.assertEqual(USER_RULES[0].sql(), "age BETWEEN 10 AND 100")
+        self.assertEqual(SESSION_RULES[0].sql(), "weight_kg IS NULL OR (weight_kg BETWEEN 30 AND 250)")
+        self.assertEqual(
+            Rule("ck_s_water", "water_intake_liters", min=0).sql(),
+            "water_intake_liters IS NULL OR water_intake_liters >= 0",
+        )
+
+    def test_models_do_not_load_the_etl(self):
+        """Les modèles (et leurs contraintes) s'importent sans pandas, numpy ni l'ETL."""
+        code = (
+            "import sys, healthai.models; "
+            "print(sorted(m for m in ('pandas', 'numpy', 'healthai.etl.validators') if m in sys.modules))"
+        )
+        env = {**os.environ, "DATABASE_URL": "postgresql+psycopg2://user@localhost/healthai"}
+        src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=src, check=True)
+        self.assertEqual(out.stdout.strip(), "[]")
+
+
+class TestRuleSet(unittest.TestCase):
+    """Tests de l'évaluation vectorisée des règles."""
+
+    def setUp(self):
+        self.rules = RuleSet(
+            [
+                Rule("ck_age", "age", 10, 100, nullable=False),
+                Rule("ck_bmi", "bmi", 10, 60),
+                Rule("nn_gender", "gender", nullable=False),
+            ],
+            {"age": "Age", "bmi": "BMI", "gender": "Gender"},
+        )
+
+    def test_rejects_rows_and_counts_per_rule(self):
+        """Une ligne est rejetée si une règle échoue ; chaque règle compte ses rejets."""
+        df = pd.DataFrame(
+            {
+                "Age": [30, 5, np.nan, 40, 200],
+                "BMI": [22.0, 22.0, 25.0, np.nan, 80.0],
+                "Gender": ["Male", "Female", "Male", "Female", None],
+            }
+        ).astype({"Gender": "category"})
+
+        valid, report = self.rules.evaluate(df)
+
+        self.assertEqual(valid.index.tolist(), [0, 3])
+        self.assertEqual(report.rows_rejected, 3)
+        self.assertEqual(report.as_dict(), {"ck_age": 3, "ck_bmi": 1, "nn_gender": 1})
+
+    def test_reports_add_up_across_chunks(self):
+        """Les rapports de plusieurs chunks s'additionnent."""
+        total = RuleReport()
+        for ages in ([5, 30], [7]):
+            _, report = self.rules.evaluate(pd.DataFrame({"Age": ages, "BMI": 20.0, "Gender": "Male"}))
+            total.add(report)
+
+        self.assertEqual(total.rows_rejected, 2)
+        self.assertEqual(total.as_dict(), {"ck_age": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
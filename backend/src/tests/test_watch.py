@@ -0,0 +1,80 @@
+"""Tests unitaires pour le démon de micro-batchs (watch)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+# Mock de la base AVANT import du module testé.
+sys.modules.setdefault("healthai.db", MagicMock())
+
+from healthai.etl.watch import SourceWatcher, run_forever  # pylint: disable=wrong-import-position
+
+
+class TestSourceWatcher(unittest.TestCase):
+    """Tests de l'anti-rebond des arrivées de fichiers (horloge simulée)."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.watcher = SourceWatcher("fitness_ingest", self.dir, debounce=5, max_wait=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _write(self, name, text, mode="a"):
+        path = os.path.join(self.dir, name)
+        with open(path, mode, encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_burst_of_files_gives_one_batch_once_settled(self):
+        """Les fichiers arrivés ensemble forment un seul micro-batch, après le délai de calme."""
+        a = self._write("day_1.csv", "a\n1\n")
+        self.assertEqual(self.watcher.poll(0), [])
+        b = self._write("day_2.csv", "a\n2\n")
+        self.assertEqual(self.watcher.poll(3), [])
+        self.assertEqual(self.watcher.poll(7), [])
+        self.assertEqual(self.watcher.poll(8), [a, b])
+        self.assertEqual(self.watcher.poll(20), [])
+
+    def test_appended_file_is_a_new_batch(self):
+        """Un fichier complété après son ingestion revient dans un nouveau micro-batch."""
+        a = self._write("day_1.csv", "a\n1\n")
+        self.watcher.poll(0)
+        self.assertEqual(self.watcher.poll(5), [a])
+
+        self._write("day_1.csv", "2\n")
+        self.assertEqual(self.watcher.poll(10), [])
+        self.assertEqual(self.watcher.poll(15), [a])
+
+    def test_file_still_growing_is_taken_after_max_wait(self):
+        """Un fichier qui change sans arrêt est tout de même ingéré après max_wait."""
+        a = self._write("day_1.csv", "a\n")
+        batches = []
+        for now in range(0, 70, 2):
+            self._write("day_1.csv", f"{now}\n")
+            batches.append((now, self.watcher.poll(now)))
+        fired = [now for now, batch in batches if batch == [a]]
+        self.assertEqual(fired, [60])
+
+    def test_run_forever_runs_the_settled_stages(self):
+        """La boucle lance l'ingestion des sources prêtes et s'arrête sur demande."""
+        self._write("day_1.csv", "a\n1\n")
+        watcher = SourceWatcher("fitness_ingest", self.dir, debounce=0, max_wait=60)
+        idle = SourceWatcher("nutrition_ingest", os.path.join(self.dir, "none_*.csv"), debounce=0, max_wait=60)
+        stop = threading.Event()
+        runs = []
+
+        def run_batch(stages):
+            runs.append(stages)
+            stop.set()
+
+        run_forever([idle, watcher], 0, stop, run_batch)
+        self.assertEqual(runs, [["fitness_ingest"]])
+
+
+if __name__ == "__main__":
+    unittest.main()